@@ -1,17 +1,23 @@
 import copy
+import math
 import time
 import random
-from typing import List
+from functools import partial
+from typing import Any, Callable, List
 
-from scheduling_upm.utils.evaluation import objective_function
-from scheduling_upm.utils.entities import Schedule
-from scheduling_upm.utils.operations import generate_schedule
+from scheduling_upm.utils.evaluation import objective_function, evaluate_batch
+from scheduling_upm.utils.entities import Schedule, ProblemInstance, FlatSchedule
+from scheduling_upm.utils.cache import FitnessCache
+from scheduling_upm.utils.population import PopulationIndex, fresh_schedules
+from scheduling_upm.utils.budget import SearchBudget, ImprovementCallback
+from scheduling_upm.utils.operator_selection import OperatorSelector, clock
+from scheduling_upm.utils.profiling import PROFILER
 from scheduling_upm.strategies.woa_strategy import (
-    random_explore as woa_random_explore,
+    explore_move as woa_explore_move,
     discrete_spiral_update,
     discrete_shrinking_mechanism,
 )
-from scheduling_upm.strategies.sa_strategy import exploit as sa_exploit
+from scheduling_upm.strategies.sa_strategy import exploit_move as sa_exploit_move
 
 
 # Mình sẽ dùng WOA để khám phá toàn cục, SA để khai thác cục bộ
@@ -23,25 +29,57 @@ def initialize_population(  # tạo dữ liệu ban đầu - điểm xuất phá
     precedences,
     energy_constraint: dict | None = None,
     total_resource: int | None = None,
+    instance: ProblemInstance | None = None,
 ) -> List[Schedule]:
-    pop = []
-    for _ in range(n_schedules):
-        sched = generate_schedule(tasks=tasks, n_machines=n_machines)
-        cost_dict = objective_function(
-            schedule=sched,
+    if instance is None:
+        instance = ProblemInstance(
             tasks=tasks,
             setups=setups,
+            n_machines=n_machines,
             precedences=precedences,
             energy_constraint=energy_constraint,
             total_resource=total_resource,
         )
-        pop.append(Schedule(schedule=sched, cost=cost_dict))
+
+    # Các cá voi ban đầu đều khác nhau
+    schedules = fresh_schedules(n_schedules=n_schedules, tasks=tasks, n_machines=n_machines)
+    # Đánh giá cả quần thể trong 1 lần gọi
+    costs = evaluate_batch(schedules=schedules, instance=instance)
+
+    pop = []
+    for sched, cost in zip(schedules, costs.tolist()):
+        pop.append(Schedule(schedule=sched, cost=cost))
     return pop
 
 
-def linearly_decrement(iter: int, n_iterations: int):
-    # khởi tạo giá trị quyết định tính khám phá
-    return 2 - 2 * (iter / max(1, n_iterations))
+def restart_population(
+    population: List[Schedule],
+    index: PopulationIndex,
+    restart_fraction: float,
+    tasks,
+    n_machines: int,
+    instance: ProblemInstance,
+) -> int:
+    # Khởi tạo lại restart_fraction cá voi tệ nhất (luôn giữ cá voi tốt nhất), trả về số cá voi đã thay
+    n_restarted = min(len(population) - 1, math.ceil(restart_fraction * len(population)))
+    if n_restarted <= 0:
+        return 0
+    ranking = sorted(range(len(population)), key=lambda i: population[i].cost)
+    slots = ranking[-n_restarted:]
+
+    schedules = fresh_schedules(
+        n_schedules=n_restarted, tasks=tasks, n_machines=n_machines, index=index
+    )
+    costs = evaluate_batch(schedules=schedules, instance=instance)
+    for i, sched, cost in zip(slots, schedules, costs.tolist()):
+        population[i].update(new_schedule=sched, new_cost=cost)
+        index.set(i, sched)
+    return n_restarted
+
+
+def linearly_decrement(progress: float):
+    # khởi tạo giá trị quyết định tính khám phá, giảm theo tiến độ (số vòng lặp hoặc thời gian)
+    return 2 - 2 * progress
 
 
 def hybrid_woa_sa(
@@ -50,11 +88,60 @@ def hybrid_woa_sa(
     precedences,
     n_machines: int | None = None,
     n_schedules: int = 10,
-    n_iterations: int = 100,
+    n_iterations: int | None = 100,
     sa_local_iters: int = 10,
     energy_constraint: dict | None = None,
     total_resource: int | None = None,
+    cache_size: int = 10_000,
+    time_limit: float | None = None,
+    deadline: float | None = None,
+    patience: int | None = None,
+    on_improvement: ImprovementCallback | None = None,
+    deduplicate: bool = True,
+    min_diversity: float | None = 0.02,
+    restart_fraction: float = 0.5,
+    migration_interval: int | None = 10,
+    emigrate: Callable[[Schedule], Any] | None = None,
+    immigrate: Callable[[], List[Schedule]] | None = None,
+    adaptive_operators: bool = False,
+    verbose: bool = True,
+    return_profile: bool = False,
 ):
+    # Mô hình đảo (xem island_model.py): mỗi migration_interval vòng, gửi cá voi tốt nhất qua emigrate
+    # và nhận các cá voi từ đảo khác qua immigrate (không chờ), thay cho cá voi tệ nhất nếu tốt hơn
+    # migration_interval=None / 0: không di cư
+    # adaptive_operators: chọn toán tử WOA / SA bằng OperatorSelector (mức giảm cost trên mỗi giây CPU)
+    # thay vì chọn đều
+    # Dừng khi hết vòng lặp, hết thời gian (time_limit giây / deadline) hoặc sau patience vòng không cải thiện
+    # n_iterations=None: chỉ dừng theo thời gian / patience (chế độ anytime, xem SearchBudget)
+    if migration_interval is not None and migration_interval < 0:
+        raise ValueError("migration_interval must be positive, None / 0 to disable migration")
+    budget = SearchBudget(
+        n_iterations=n_iterations,
+        time_limit=time_limit,
+        deadline=deadline,
+        patience=patience,
+        on_improvement=on_improvement,
+    ).start()
+    # Profiler (nếu bật): đếm lại từ đầu cho lần chạy này. return_profile=True: trả thêm báo cáo
+    # (PROFILER.report(), None nếu profiler tắt) làm giá trị thứ 3, ví dụ để xuất JSON
+    PROFILER.start_run()
+
+    # Dữ liệu dạng mảng, compile 1 lần cho mọi lần đánh giá
+    instance = ProblemInstance(
+        tasks=tasks,
+        setups=setups,
+        n_machines=n_machines,
+        precedences=precedences,
+        energy_constraint=energy_constraint,
+        total_resource=total_resource,
+    )
+    # Hàm mục tiêu có cache, dùng chung cho WOA, SA và best insertion
+    evaluate = FitnessCache(
+        partial(objective_function, instance=instance, breakdown=False),
+        maxsize=cache_size,
+    )
+
     population = initialize_population(
         n_schedules=n_schedules,
         tasks=tasks,
@@ -63,17 +150,26 @@ def hybrid_woa_sa(
         precedences=precedences,
         energy_constraint=energy_constraint,
         total_resource=total_resource,
+        instance=instance,
     )
 
-    best = copy.deepcopy(min(population, key=lambda s: s.cost["total_cost"]))
+    # Chỉ mục hash của quần thể: phát hiện cá voi trùng nhau, đo độ đa dạng để khởi động lại
+    index = PopulationIndex(n_tasks=instance.n_tasks, n_machines=instance.n_machines)
+    selector = OperatorSelector() if adaptive_operators else None
+    for i, whale in enumerate(population):
+        index.set(i, whale.schedule)
+
+    best = copy.deepcopy(min(population, key=lambda s: s.cost))
+    budget.update(iteration=0, best=best)
 
     start = time.time()
-    for it in range(
-        n_iterations
-    ):  # xét a, lần lượt dùng woa để cập nhập và SA để tinh chỉnh
-        a = linearly_decrement(iter=it, n_iterations=n_iterations)
+    it = 0
+    # xét a, lần lượt dùng woa để cập nhập và SA để tinh chỉnh
+    while not budget.exhausted(it):
+        a = linearly_decrement(progress=budget.progress(it))
 
         for i, whale in enumerate(population):
+            started = clock()
             A = 2 * a * random.random() - a
             p = random.random()
 
@@ -86,69 +182,135 @@ def hybrid_woa_sa(
                     )
                     candidate = discrete_shrinking_mechanism(
                         best_schedule=best.schedule,
-                        obj_function=objective_function,
+                        obj_function=evaluate,
                         tasks=tasks,
                         setups=setups,
                         precedences=precedences,
                         energy_constraint=energy_constraint,
                         total_resource=total_resource,
                         n_moves=n_moves,
+                        selector=selector,
+                        instance=instance,
                     )
                 else:
-                    candidate = woa_random_explore(schedule=whale.schedule, tasks=tasks)
+                    candidate = whale.schedule.copy()
+                    woa_explore_move(
+                        schedule=candidate, tasks=tasks, selector=selector
+                    ).apply(candidate)
             else:
                 candidate = discrete_spiral_update(
                     schedule=whale.schedule, best_schedule=best.schedule
                 )
 
-            candidate_cost = objective_function(
-                schedule=copy.deepcopy(candidate),
-                tasks=tasks,
-                setups=setups,
-                precedences=precedences,
-                energy_constraint=energy_constraint,
-                total_resource=total_resource,
-            )
+            # Ứng viên trùng 1 cá voi đã có: không tốn công đánh giá và tinh chỉnh
+            operators = PROFILER.take_pending() if PROFILER.enabled else None
+            if deduplicate and candidate in index:
+                if operators is not None:
+                    PROFILER.outcome(operators, accepted=False, improved=False)
+                if selector is not None:
+                    selector.reward(improvement=0.0, seconds=clock() - started)
+                continue
+
+            candidate_cost = evaluate(schedule=candidate)
+            if selector is not None:
+                selector.reward(
+                    improvement=whale.cost - candidate_cost, seconds=clock() - started
+                )
 
             for _ in range(sa_local_iters):  # SA tinh chỉnh giúp WOA ở đây
-                candidate_schedule = sa_exploit(
-                    schedule=copy.deepcopy(candidate),
+                # Thử move ngay trên candidate, hoàn tác nếu không tốt hơn
+                started = clock()
+                move = sa_exploit_move(
+                    schedule=candidate,
                     tasks=tasks,
-                    obj_function=objective_function,
+                    obj_function=evaluate,
                     precedences=precedences,
                     setups=setups,
                     energy_constraint=energy_constraint,
                     total_resource=total_resource,
+                    selector=selector,
+                    instance=instance,
                 )
 
-                new_cost = objective_function(
-                    schedule=candidate_schedule,
-                    tasks=tasks,
-                    setups=setups,
-                    precedences=precedences,
-                    energy_constraint=energy_constraint,
-                    total_resource=total_resource,
+                # Chỉ cần biết có tốt hơn candidate không, dừng sớm nếu không
+                new_cost = evaluate(
+                    schedule=move.apply(candidate), upper_bound=candidate_cost
                 )
+                if PROFILER.enabled:
+                    PROFILER.outcome(
+                        PROFILER.take_pending(),
+                        accepted=new_cost < candidate_cost,
+                        improved=new_cost < candidate_cost,
+                    )
+                if selector is not None:
+                    selector.reward(
+                        improvement=candidate_cost - new_cost, seconds=clock() - started
+                    )
 
-                if new_cost["total_cost"] < candidate_cost["total_cost"]:
+                if new_cost < candidate_cost:
                     candidate_cost = new_cost
                     break
+                move.undo(candidate)
 
-            # tiến hành cập nhật cá voi nếu tìm được ứng viên tốt hơn
-            if candidate_cost["total_cost"] < whale.cost["total_cost"]:
+            # tiến hành cập nhật cá voi nếu tìm được ứng viên tốt hơn (và không trùng cá voi khác)
+            accepted = candidate_cost < whale.cost and not (
+                deduplicate and candidate in index
+            )
+            if operators is not None:
+                # Ứng viên WOA được tính theo kết quả sau khi SA tinh chỉnh
+                PROFILER.outcome(
+                    operators, accepted=accepted, improved=candidate_cost < whale.cost
+                )
+            if accepted:
                 whale.update(
-                    new_schedule=copy.deepcopy(candidate_schedule),
+                    new_schedule=FlatSchedule.from_schedule(candidate),
                     new_cost=candidate_cost,
                 )
+                index.set(i, whale.schedule)
 
-            if whale.cost["total_cost"] < best.cost["total_cost"]:
+            if whale.cost < best.cost:
                 best = copy.deepcopy(whale)
 
-        if (it + 1) % max(1, n_iterations // 10) == 0:
-            elapsed = time.time() - start
-            print(
-                f"iter {it + 1}/{n_iterations} best_cost={best.cost["total_cost"]:.3f} elapsed={elapsed:.2f}s"
+        it += 1
+        if migration_interval and it % migration_interval == 0:
+            if emigrate is not None:
+                emigrate(copy.deepcopy(best))
+            for migrant in immigrate() if immigrate is not None else []:
+                worst = max(range(len(population)), key=lambda i: population[i].cost)
+                if migrant.cost < population[worst].cost and not (
+                    deduplicate and migrant.schedule in index
+                ):
+                    population[worst].update(
+                        new_schedule=FlatSchedule.from_schedule(migrant.schedule),
+                        new_cost=migrant.cost,
+                    )
+                    index.set(worst, population[worst].schedule)
+                    if migrant.cost < best.cost:
+                        best = copy.deepcopy(population[worst])
+        budget.update(iteration=it, best=best)
+
+        # Quần thể gần như hội tụ về 1 điểm: khởi động lại phần tệ nhất
+        if min_diversity is not None and index.diversity() < min_diversity:
+            restart_population(
+                population=population,
+                index=index,
+                restart_fraction=restart_fraction,
+                tasks=tasks,
+                n_machines=n_machines,
+                instance=instance,
             )
 
+        report_every = max(1, n_iterations // 10) if n_iterations is not None else 10
+        if verbose and it % report_every == 0:
+            elapsed = time.time() - start
+            total = f"/{n_iterations}" if n_iterations is not None else ""
+            print(f"iter {it}{total} best_cost={best.cost:.3f} elapsed={elapsed:.2f}s")
+
     total_time = time.time() - start
+
+    # Breakdown chỉ tính cho lời giải tốt nhất
+    best.breakdown = objective_function(schedule=best.schedule, instance=instance)
+    profile = PROFILER.end_run()
+    if return_profile:
+        return best, total_time, profile
     return best, total_time
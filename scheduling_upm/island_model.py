@@ -0,0 +1,158 @@
+import copy
+import multiprocessing
+import queue
+import random
+import traceback
+from typing import Dict, Any, List, Tuple
+
+from .hybrid_woa_sa import hybrid_woa_sa
+from .utils.entities import Schedule
+
+
+class IslandModel:
+    """
+    Asynchronous island model of `hybrid_woa_sa`: `n_islands` populations in separate processes, each
+    with its own seed. Every `migration_interval` iterations an island sends its best schedule (if it
+    improved since the last send) to the next island of a ring and takes in whatever its predecessor
+    sent, the migrants replacing its worst whales when better. Queues are bounded (`queue_size`) and
+    only used with `put_nowait` / `get_nowait`: a migrant is dropped rather than waited for, so no
+    island ever blocks on another.
+
+    `hybrid_kwargs` are passed to every island (e.g. n_iterations, time_limit, energy_constraint),
+    `island_configs[k]` overrides them for island k (e.g. {"sa_local_iters": 20}). Islands draw their
+    seeds from `random`, but migration timing depends on process scheduling, so runs are not
+    reproducible.
+    """
+
+    def __init__(
+        self,
+        tasks: Dict[int, Any],
+        setups: Dict[Tuple[int, int], int],
+        precedences: Dict[int, Any],
+        n_machines: int,
+        n_islands: int = 4,
+        migration_interval: int = 10,
+        queue_size: int = 4,
+        island_configs: List[Dict[str, Any]] = None,
+        **hybrid_kwargs,
+    ):
+        if n_islands <= 0 or migration_interval <= 0 or queue_size <= 0:
+            raise ValueError()
+        if island_configs is not None and len(island_configs) != n_islands:
+            raise ValueError("island_configs needs one entry per island")
+
+        self.n_islands = n_islands
+        self.queue_size = queue_size
+        base_kwargs = {
+            "tasks": tasks,
+            "setups": setups,
+            "precedences": precedences,
+            "n_machines": n_machines,
+            "migration_interval": migration_interval,
+            "verbose": False,
+            **hybrid_kwargs,
+        }
+        self.island_kwargs: List[Dict[str, Any]] = [
+            {**base_kwargs, **(island_configs[k] if island_configs is not None else {})}
+            for k in range(n_islands)
+        ]
+        self.best_schedule: Schedule = None
+
+    def optimize(self) -> Tuple[Schedule, Dict[str, Any]]:
+        context = multiprocessing.get_context()
+        # inboxes[k] is written by island k - 1 and read by island k
+        inboxes = [context.Queue(maxsize=self.queue_size) for _ in range(self.n_islands)]
+        results = context.Queue()
+        islands = [
+            context.Process(
+                target=_run_island,
+                args=(
+                    k,
+                    self.island_kwargs[k],
+                    random.getrandbits(64),
+                    inboxes[k],
+                    inboxes[(k + 1) % self.n_islands],
+                    results,
+                ),
+                daemon=True,
+            )
+            for k in range(self.n_islands)
+        ]
+        for island in islands:
+            island.start()
+
+        # Results are collected before joining, a process doesn't exit before its queued data is read
+        reports: List[Dict[str, Any]] = [None] * self.n_islands
+        try:
+            for _ in range(self.n_islands):
+                while True:
+                    try:
+                        report = results.get(timeout=1.0)
+                        break
+                    except queue.Empty:
+                        if not any(island.is_alive() for island in islands):
+                            raise RuntimeError("Islands exited without reporting a result")
+                if "error" in report:
+                    raise RuntimeError(
+                        f"Island {report['island']} failed:\n{report['error']}"
+                    )
+                reports[report["island"]] = report
+        finally:
+            for island in islands:
+                island.join(timeout=1.0)
+                if island.is_alive():
+                    island.terminate()
+
+        best_report = min(reports, key=lambda report: report["best"].cost)
+        self.best_schedule = best_report["best"]
+        stats = {
+            "island_costs": [report["best"].cost for report in reports],
+            "island_times": [report["total_time"] for report in reports],
+            "n_sent": [report["n_sent"] for report in reports],
+            "n_received": [report["n_received"] for report in reports],
+        }
+        return self.best_schedule, stats
+
+
+def _run_island(
+    island: int,
+    kwargs: Dict[str, Any],
+    seed: int,
+    inbox: multiprocessing.Queue,
+    outbox: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+):
+    # Migrants still in the queues when the run ends are simply dropped
+    inbox.cancel_join_thread()
+    outbox.cancel_join_thread()
+    random.seed(seed)
+    counts = {"n_sent": 0, "n_received": 0}
+    last_sent = [float("inf")]
+
+    def emigrate(best: Schedule):
+        if best.cost >= last_sent[0]:
+            return
+        try:
+            outbox.put_nowait((best.schedule, best.cost))
+        except queue.Full:
+            return
+        last_sent[0] = best.cost
+        counts["n_sent"] += 1
+
+    def immigrate() -> List[Schedule]:
+        migrants = []
+        while True:
+            try:
+                schedule, cost = inbox.get_nowait()
+            except queue.Empty:
+                return migrants
+            migrants.append(Schedule(schedule=schedule, cost=cost))
+            counts["n_received"] += 1
+
+    try:
+        best, total_time = hybrid_woa_sa(**kwargs, emigrate=emigrate, immigrate=immigrate)
+        results.put(
+            {"island": island, "best": copy.deepcopy(best), "total_time": total_time, **counts}
+        )
+    except Exception:
+        results.put({"island": island, "error": traceback.format_exc()})
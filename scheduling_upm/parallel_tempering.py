@@ -0,0 +1,288 @@
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Tuple, Set, List, Optional
+
+import numpy as np
+
+from .simulated_annealing import SimulatedAnnealing
+from .utils.operations import generate_schedule
+from .utils.evaluation import objective_function
+from .utils.entities import Schedule, FlatSchedule, ProblemInstance
+from .utils.recorder import HistoryRecorder
+from .utils.budget import SearchBudget, ImprovementCallback
+from .utils.profiling import PROFILER
+
+# Chain of the current worker process, built once by `_init_worker`
+_chain: SimulatedAnnealing = None
+
+
+class ParallelTempering:
+    """
+    Replica-exchange SA: `n_chains` chains at fixed temperatures of a geometric ladder between `t_min`
+    and `t_max`, each running `swap_interval` SA steps per epoch in a process pool. Between epochs,
+    neighbouring temperatures swap states with probability min(1, exp((1/T_i - 1/T_j) * (E_i - E_j))),
+    alternating even and odd pairs. The best schedule found by any chain is returned.
+
+    Missing ends of the ladder are calibrated on the instance's cost scale like SA's temperatures
+    (see `SimulatedAnnealing.estimate_temperatures`): `t_max` accepts a median cost increase half
+    of the time, `t_min` a small one with probability 1e-4. Fixed values apply to any instance as
+    is, so acceptance and swap rates then depend on its size.
+
+    `max_workers=1` runs the chains in the current process. Seed `random` for reproducible runs.
+    `time_limit` / `deadline` / `patience` (in epochs) and `on_improvement` as in `SearchBudget`,
+    checked between epochs. `n_iterations=None` runs epochs until one of them stops the search.
+    """
+
+    def __init__(
+        self,
+        n_machines: int,
+        tasks: Dict[int, Any],
+        setups: Dict[Tuple[int, int], int],
+        precedences: Dict[int, Set] = None,
+        energy_constraint: Dict[str, Any] = None,
+        total_resource: int = None,
+        n_chains: int = 4,
+        t_min: float = None,
+        t_max: float = None,
+        n_iterations: Optional[int] = 1000,
+        swap_interval: int = 50,
+        max_workers: int = None,
+        cache_size: int = 10_000,
+        time_limit: float = None,
+        deadline: float = None,
+        patience: int = None,
+        on_improvement: ImprovementCallback = None,
+    ):
+        if n_chains <= 0 or swap_interval <= 0:
+            raise ValueError()
+        if (t_min is not None and t_min <= 0) or (
+            t_min is not None and t_max is not None and t_min > t_max
+        ):
+            raise ValueError("Temperatures must satisfy 0 < t_min <= t_max")
+
+        self.tasks = tasks
+        self.n_machines = n_machines
+        self.n_chains = n_chains
+        self.n_iterations = n_iterations
+        self.swap_interval = swap_interval
+        self.max_workers = max_workers or min(n_chains, os.cpu_count() or 1)
+        # Everything a worker needs to build its own SimulatedAnnealing
+        self.problem: Dict[str, Any] = {
+            "n_machines": n_machines,
+            "tasks": tasks,
+            "setups": setups,
+            "precedences": precedences,
+            "energy_constraint": energy_constraint,
+            "total_resource": total_resource,
+            # Chains only run `step`, the budget is kept here
+            "n_iterations": 1,
+            "cache_size": cache_size,
+        }
+        self.instance = ProblemInstance(
+            tasks=tasks,
+            setups=setups,
+            n_machines=n_machines,
+            precedences=precedences or None,
+            energy_constraint=energy_constraint or None,
+            total_resource=total_resource or None,
+        )
+        self.t_min = t_min
+        self.t_max = t_max
+        # Ladder of the last run, calibrated when `optimize` starts if an end is missing
+        self.temperatures: List[float] = (
+            geometric_ladder(t_min=t_min, t_max=t_max, n_chains=n_chains)
+            if t_min is not None and t_max is not None
+            else None
+        )
+        self.best_schedule: Schedule = None
+        self.n_epochs = (
+            max(1, math.ceil(n_iterations / swap_interval)) if n_iterations is not None else None
+        )
+        self.budget = SearchBudget(
+            n_iterations=self.n_epochs,
+            time_limit=time_limit,
+            deadline=deadline,
+            patience=patience,
+            on_improvement=on_improvement,
+        )
+
+    def optimize(self) -> Tuple[Schedule, Dict[str, Any]]:
+        budget = self.budget.start()
+        PROFILER.start_run()
+        # states[k]: (schedule, cost) of the chain at temperatures[k], no cost before the first epoch
+        states: List[Tuple[Any, float]] = [
+            (generate_schedule(tasks=self.tasks, n_machines=self.n_machines), None)
+            for _ in range(self.n_chains)
+        ]
+        if self.t_min is None or self.t_max is None:
+            t_min, t_max = self.calibrate_temperatures(schedule=states[0][0])
+            self.temperatures = geometric_ladder(
+                t_min=t_min, t_max=t_max, n_chains=self.n_chains
+            )
+        n_epochs = self.n_epochs
+        swap_attempts = np.zeros(max(0, self.n_chains - 1), dtype=np.int64)
+        swap_accepts = np.zeros(max(0, self.n_chains - 1), dtype=np.int64)
+        best_costs: List[float] = []
+
+        executor = (
+            ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.problem,),
+            )
+            if self.max_workers > 1
+            else None
+        )
+        if executor is None:
+            _init_worker(self.problem)
+
+        try:
+            epoch = 0
+            # At least one epoch, chains have no best schedule before
+            while epoch == 0 or not budget.exhausted(epoch):
+                progress = budget.progress(epoch)
+                n_steps = (
+                    min(self.swap_interval, self.n_iterations - epoch * self.swap_interval)
+                    if self.n_iterations is not None
+                    else self.swap_interval
+                )
+                # Progress reached at the end of the epoch, unknown with a time budget only
+                end_progress = (
+                    min(1.0, progress + 1 / n_epochs) if n_epochs is not None else progress
+                )
+                args = [
+                    (
+                        schedule,
+                        temperature,
+                        max(1, n_steps),
+                        (progress, end_progress),
+                        random.getrandbits(64),
+                    )
+                    for (schedule, _), temperature in zip(states, self.temperatures)
+                ]
+                results = (
+                    list(executor.map(_run_chain, *zip(*args)))
+                    if executor is not None
+                    else [_run_chain(*chain_args) for chain_args in args]
+                )
+
+                states = []
+                for schedule, cost, chain_best, chain_best_cost in results:
+                    states.append((schedule, cost))
+                    if (
+                        self.best_schedule is None
+                        or chain_best_cost < self.best_schedule.cost
+                    ):
+                        self.best_schedule = Schedule(
+                            schedule=chain_best, cost=chain_best_cost
+                        )
+                best_costs.append(self.best_schedule.cost)
+                budget.update(iteration=epoch + 1, best=self.best_schedule)
+
+                # Replica exchange between neighbouring temperatures
+                replica_exchange(
+                    states=states,
+                    temperatures=self.temperatures,
+                    parity=epoch % 2,
+                    swap_attempts=swap_attempts,
+                    swap_accepts=swap_accepts,
+                )
+
+                epoch += 1
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        # Cost breakdown is only computed for the final best solution
+        self.best_schedule.breakdown = objective_function(
+            schedule=self.best_schedule.schedule,
+            instance=self.instance,
+            alpha_load=50.0,
+        )
+        stats = {
+            "temperatures": self.temperatures,
+            "swap_attempts": swap_attempts,
+            "swap_accepts": swap_accepts,
+            "chain_costs": [cost for _, cost in states],
+            "best_costs": best_costs,
+            # Only the chains run in this process (max_workers=1) are profiled
+            "profile": PROFILER.end_run(),
+        }
+        return self.best_schedule, stats
+
+    def calibrate_temperatures(self, schedule: Any) -> Tuple[float, float]:
+        """(t_min, t_max), the missing ones estimated from cost increases around `schedule`"""
+        chain = SimulatedAnnealing(
+            **self.problem,
+            initial_temp=self.t_max,
+            final_temp=self.t_min,
+            recorder=HistoryRecorder(capacity=1),
+        )
+        chain.initialize_schedule(schedule)
+        t_max, t_min = chain.estimate_temperatures()
+        return t_min, t_max
+
+
+def geometric_ladder(t_min: float, t_max: float, n_chains: int) -> List[float]:
+    """`n_chains` temperatures from `t_min` to `t_max` with a constant ratio ([t_max] for one)"""
+    if n_chains == 1:
+        return [t_max]
+    return [t_min * (t_max / t_min) ** (k / (n_chains - 1)) for k in range(n_chains)]
+
+
+def replica_exchange(
+    states: List[Tuple[Any, float]],
+    temperatures: List[float],
+    parity: int,
+    swap_attempts: np.ndarray,
+    swap_accepts: np.ndarray,
+):
+    """
+    Metropolis swaps (in place) of the states of neighbouring temperatures (k, k + 1), k of the same
+    `parity`: accepted with probability min(1, exp((1/T_k - 1/T_k+1) * (E_k - E_k+1))), which keeps
+    every chain at its own Boltzmann distribution
+    """
+    for k in range(parity, len(states) - 1, 2):
+        swap_attempts[k] += 1
+        exponent = (1 / temperatures[k] - 1 / temperatures[k + 1]) * (
+            states[k][1] - states[k + 1][1]
+        )
+        if exponent >= 0 or random.random() < math.exp(exponent):
+            swap_accepts[k] += 1
+            states[k], states[k + 1] = states[k + 1], states[k]
+
+
+def _init_worker(problem: Dict[str, Any]):
+    global _chain
+    _chain = SimulatedAnnealing(**problem, recorder=HistoryRecorder(capacity=1))
+
+
+def _run_chain(
+    schedule: Any,
+    temperature: float,
+    n_steps: int,
+    progress: Tuple[float, float],
+    seed: int,
+) -> Tuple[FlatSchedule, float, FlatSchedule, float]:
+    """`n_steps` SA steps at a fixed temperature from `schedule`: (current, cost, best, best cost)"""
+    # Operators draw from the global `random`, the caller's stream is restored afterwards
+    caller_state = random.getstate()
+    random.seed(seed)
+    try:
+        _chain.initialize_schedule(schedule)
+        start, end = progress
+        for step in range(n_steps):
+            _chain.step(
+                temperature=temperature, progress=start + (end - start) * step / n_steps
+            )
+    finally:
+        random.setstate(caller_state)
+
+    return (
+        _chain.current_schedule.schedule,
+        _chain.current_schedule.cost,
+        _chain.best_schedule.schedule,
+        _chain.best_schedule.cost,
+    )
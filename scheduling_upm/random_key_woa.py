@@ -0,0 +1,192 @@
+import math
+import random
+from array import array
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .utils.evaluation import objective_function, evaluate_batch
+from .utils.entities import Schedule, ProblemInstance, FlatSchedule
+from .utils.recorder import PopulationTelemetry
+from .utils.budget import SearchBudget, ImprovementCallback
+
+
+class RandomKeyWOA:
+    """
+    Continuous Whale Optimization Algorithm over random keys.
+
+    Every whale is a row of `keys`, an (n_schedules, 2 * n_tasks) matrix in [0, 1): the first n_tasks
+    columns pick each task's machine, the last n_tasks its priority on that machine (see `decode_keys`).
+    Encircling, search-for-prey and spiral updates are applied to the whole matrix at once, keys are
+    wrapped back into [0, 1) and each one is redrawn with probability `mutation_rate` (without it the
+    pod collapses onto the best whale within a few dozen iterations). The candidates are decoded and
+    evaluated in one batch and replace their whale when better. Meant for large pods (hundreds of
+    whales), where the list operators of `WhaleOptimizationAlgorithm` are bound by the Python loop.
+
+    Stops after `n_iterations` (None: no iteration limit), `time_limit` seconds, at `deadline` or after
+    `patience` iterations without improvement, `on_improvement(iteration, best)` as in `SearchBudget`.
+    `spiral_shape` is the b constant of the logarithmic spiral. Seed `random` for reproducible runs.
+    """
+
+    def __init__(
+        self,
+        tasks: Dict[int, Any],
+        setups: Dict[Tuple[int, int], int],
+        n_machines: int,
+        n_schedules: int = 200,
+        n_iterations: Optional[int] = 1000,
+        precedences: Dict[int, Set] = None,
+        total_resource: int = None,
+        energy_constraint: Dict[str, Any] = None,
+        spiral_shape: float = 1.0,
+        mutation_rate: float = 0.02,
+        snapshot_every: int = None,
+        time_limit: float = None,
+        deadline: float = None,
+        patience: int = None,
+        on_improvement: ImprovementCallback = None,
+    ):
+        if n_machines <= 0 or n_schedules <= 0:
+            raise ValueError()
+
+        self.tasks = tasks
+        self.n_machines = n_machines
+        self.n_schedules = n_schedules
+        self.n_iterations = n_iterations
+        self.spiral_shape = spiral_shape
+        self.mutation_rate = mutation_rate
+        self.instance = ProblemInstance(
+            tasks=tasks,
+            setups=setups,
+            n_machines=n_machines,
+            precedences=precedences or None,
+            energy_constraint=energy_constraint or None,
+            total_resource=total_resource or None,
+        )
+        self.keys: np.ndarray = None
+        self.costs: np.ndarray = None
+        self.schedules: List[FlatSchedule] = []
+        self.best_keys: np.ndarray = None
+        self.best_schedule: Schedule = None
+        self.history = PopulationTelemetry(
+            n_iterations=n_iterations, snapshot_every=snapshot_every
+        )
+        self.budget = SearchBudget(
+            n_iterations=n_iterations,
+            time_limit=time_limit,
+            deadline=deadline,
+            patience=patience,
+            on_improvement=on_improvement,
+        )
+
+    def initialize_population(self, rng: np.random.Generator):
+        """Uniform random keys"""
+        self.keys = rng.random((self.n_schedules, 2 * self.instance.n_tasks))
+        self.schedules = decode_keys(keys=self.keys, n_machines=self.n_machines)
+        self.costs = evaluate_batch(
+            schedules=self.schedules, instance=self.instance, alpha_load=50.0
+        )
+        self._update_best()
+
+    def optimize(self) -> Tuple[Schedule, PopulationTelemetry]:
+        budget = self.budget.start()
+        # NumPy stream derived from `random`, so seeding `random` is enough
+        rng = np.random.default_rng(random.getrandbits(64))
+        self.initialize_population(rng)
+        budget.update(iteration=0, best=self.best_schedule)
+
+        iter = 0
+        while not budget.exhausted(iter):
+            a = 2 - 2 * budget.progress(iter)
+
+            candidate_keys = self.move_whales(a=a, rng=rng)
+            candidate_schedules = decode_keys(keys=candidate_keys, n_machines=self.n_machines)
+            candidate_costs = evaluate_batch(
+                schedules=candidate_schedules, instance=self.instance, alpha_load=50.0
+            )
+
+            # Greedy replacement, as in the discrete WOA
+            accepted = candidate_costs < self.costs
+            self.keys[accepted] = candidate_keys[accepted]
+            self.costs[accepted] = candidate_costs[accepted]
+            for idx in np.flatnonzero(accepted):
+                self.schedules[idx] = candidate_schedules[idx]
+            self._update_best()
+
+            self.history.record(
+                iteration=iter,
+                costs=self.costs,
+                schedules=self.schedules,
+                n_accepted=int(accepted.sum()),
+            )
+            budget.update(iteration=iter + 1, best=self.best_schedule)
+
+            iter += 1
+            # early stop when a got too small
+            if a < 1e-8:
+                break
+
+        # Cost breakdown is only computed for the final best solution
+        self.best_schedule.breakdown = objective_function(
+            schedule=self.best_schedule.schedule,
+            instance=self.instance,
+            alpha_load=50.0,
+        )
+        return self.best_schedule, self.history
+
+    def move_whales(self, a: float, rng: np.random.Generator) -> np.ndarray:
+        """Candidate keys of every whale, with A, C, p and l drawn per whale"""
+        n_schedules, n_keys = self.keys.shape
+        A = 2 * a * rng.random((n_schedules, 1)) - a
+        C = 2 * rng.random((n_schedules, 1))
+        p = rng.random((n_schedules, 1))
+        l = rng.uniform(-1.0, 1.0, (n_schedules, 1))
+
+        # |A| < 1: encircle the best whale, otherwise a random one (search for prey)
+        leaders = np.where(
+            np.abs(A) < 1,
+            self.best_keys[None, :],
+            self.keys[rng.integers(0, n_schedules, n_schedules)],
+        )
+        encircling = leaders - A * np.abs(C * leaders - self.keys)
+        spiral = (
+            np.abs(self.best_keys[None, :] - self.keys)
+            * np.exp(self.spiral_shape * l)
+            * np.cos(2 * math.pi * l)
+            + self.best_keys[None, :]
+        )
+
+        candidates = np.where(p < 0.5, encircling, spiral)
+        # Wrapped rather than clipped, clipping piles the machine keys up on the first / last machine
+        np.mod(candidates, 1.0, out=candidates)
+        mutated = rng.random(candidates.shape) < self.mutation_rate
+        candidates[mutated] = rng.random(int(mutated.sum()))
+        return candidates
+
+    def _update_best(self):
+        idx = int(np.argmin(self.costs))
+        if self.best_schedule is None or self.costs[idx] < self.best_schedule.cost:
+            self.best_keys = self.keys[idx].copy()
+            self.best_schedule = Schedule(
+                schedule=self.schedules[idx].copy(), cost=float(self.costs[idx])
+            )
+
+
+def decode_keys(keys: np.ndarray, n_machines: int) -> List[FlatSchedule]:
+    """
+    Schedules of an (n_schedules, 2 * n_tasks) random-key matrix in [0, 1): task t goes to machine
+    floor(keys[:, t] * n_machines), tasks of a machine are ordered by their priority keys[:, n_tasks + t]
+    """
+    n_tasks = keys.shape[1] // 2
+    machines = np.minimum((keys[:, :n_tasks] * n_machines).astype(np.int64), n_machines - 1)
+    # Tasks grouped by machine, in priority order
+    order = np.lexsort((keys[:, n_tasks:], machines), axis=1)
+    counts = (machines[:, :, None] == np.arange(n_machines)).sum(axis=1)
+    offsets = np.zeros((len(keys), n_machines + 1), dtype=np.int64)
+    np.cumsum(counts, axis=1, out=offsets[:, 1:])
+
+    order = order.astype(np.int64, copy=False)
+    return [
+        FlatSchedule(array("q", order[row].tobytes()), array("q", offsets[row].tobytes()))
+        for row in range(len(keys))
+    ]
@@ -1,11 +1,25 @@
 import math
 import random
-import copy
-from typing import Dict, Any, Tuple, Set, List
-from .strategies.sa_strategy import random_explore, exploit
-from .utils.operations import generate_schedule
+import numpy as np
+from functools import partial
+from typing import Dict, Any, Tuple, Set, List, Optional
+from .strategies.sa_strategy import explore_move, exploit_move
+from .utils.operations import (
+    generate_schedule,
+    propose_random_move,
+    propose_inter_machine_swap,
+    propose_intra_machine_swap,
+)
 from .utils.evaluation import objective_function
-from .utils.entities import Schedule
+from .utils.entities import Schedule, ProblemInstance, FlatSchedule
+from .utils.cache import FitnessCache
+from .utils.delta_evaluation import EvaluationState
+from .utils.recorder import HistoryRecorder
+from .utils.budget import SearchBudget, ImprovementCallback
+from .utils.operator_selection import OperatorSelector, clock
+from .utils.profiling import PROFILER
+
+COOLING_SCHEDULES = ("exponential", "linear", "fixed")
 
 
 class SimulatedAnnealing:
@@ -17,9 +31,43 @@ class SimulatedAnnealing:
         precedences: Dict[int, Set] = None,
         energy_constraint: Dict[str, Any] = None,
         total_resource: Dict[str, Any] = None,
-        n_iterations: int = 1000,
-        initial_temp: float = 1000.0,
+        n_iterations: Optional[int] = 1000,
+        initial_temp: float = None,
+        cache_size: int = 10_000,
+        recorder: HistoryRecorder = None,
+        final_temp: float = None,
+        cooling: str = "exponential",
+        reheat_after: int = None,
+        reheat_factor: float = 10.0,
+        time_limit: float = None,
+        deadline: float = None,
+        patience: int = None,
+        on_improvement: ImprovementCallback = None,
+        adaptive_operators: bool = False,
     ):
+        """
+        Temperatures go from `initial_temp` to `final_temp` over the iteration budget, both estimated
+        from sampled cost deltas when not given (see `estimate_temperatures`). `cooling`:
+        "exponential" / "linear" in the budget fraction, or "fixed" for the legacy alpha=0.995 decay.
+        After `reheat_after` iterations without improving the best (default: 5% of the iterations, 50
+        without an iteration budget), the temperature is multiplied by `reheat_factor` and decays back
+        over `reheat_after` iterations. `reheat_factor=1` disables reheating.
+
+        `time_limit` (seconds), `deadline` (`time.time()` timestamp) and `patience` (iterations
+        without improvement) stop the search early, with a time budget the cooling follows the elapsed
+        fraction of it. `n_iterations=None` leaves them as the only stopping rules, with `patience`
+        alone the cooling follows the longest stagnation over `patience` (see `SearchBudget.progress`).
+        `on_improvement(iteration, best)` is called on every new best (see `SearchBudget`).
+
+        `adaptive_operators`: operators of the explore / exploit pools are picked by an
+        `OperatorSelector` (`self.selector`) crediting them with the cost decrease of the move per
+        CPU-second, instead of uniformly.
+        """
+        if cooling not in COOLING_SCHEDULES:
+            raise ValueError(
+                f"Unknown cooling {cooling!r}, expected one of {COOLING_SCHEDULES}"
+            )
+
         self.tasks = tasks
         self.setups = setups
         self.n_machines = n_machines
@@ -28,110 +76,211 @@ class SimulatedAnnealing:
         self.energy_constraint = energy_constraint or None
         self.total_resource = total_resource or None
         self.initial_temp = initial_temp
+        self.final_temp = final_temp
+        self.cooling = cooling
+        self.reheat_after = reheat_after or (
+            max(50, n_iterations // 20) if n_iterations is not None else 50
+        )
+        self.reheat_factor = reheat_factor
+        self.instance = ProblemInstance(
+            tasks=tasks,
+            setups=setups,
+            n_machines=n_machines,
+            precedences=self.precedences,
+            energy_constraint=self.energy_constraint,
+            total_resource=self.total_resource,
+        )
+        # Memoised objective, shared with the exploit operators
+        self.fitness_cache = FitnessCache(
+            partial(
+                objective_function,
+                instance=self.instance,
+                alpha_load=50.0,
+                breakdown=False,
+            ),
+            maxsize=cache_size,
+        )
         self.best_schedule = None
         self.current_schedule = None
-        self.history = []
+        # Delta evaluation of moves on the current schedule
+        self.evaluation_state: EvaluationState = None
+        # Bounded by default: only the iterations improving the best are kept
+        self.history = recorder if recorder is not None else HistoryRecorder()
+        self.selector = OperatorSelector() if adaptive_operators else None
+        # Report of the last run when `PROFILER` is enabled
+        self.profile = None
+        self.budget = SearchBudget(
+            n_iterations=n_iterations,
+            time_limit=time_limit,
+            deadline=deadline,
+            patience=patience,
+            on_improvement=on_improvement,
+        )
 
-    def initialize_schedule(self):
-        schedule = generate_schedule(tasks=self.tasks, n_machines=self.n_machines)
-        cost = objective_function(
-            schedule=schedule,
-            tasks=self.tasks,
-            setups=self.setups,
-            precedences=self.precedences,
-            alpha_load=50.0,
-            verbose=True,
-            total_resource=self.total_resource,
+    def initialize_schedule(self, schedule: Dict[int, List[int]] = None):
+        """Starts from `schedule` (copied) or from a random schedule"""
+        if schedule is None:
+            schedule = generate_schedule(tasks=self.tasks, n_machines=self.n_machines)
+        schedule = FlatSchedule.from_schedule(schedule)
+        cost = self.fitness_cache(schedule=schedule)
+
+        self.best_schedule = Schedule(schedule=schedule.copy(), cost=cost)
+        self.reset_current(schedule=schedule, cost=cost)
+        self.history.record(
+            iteration=0,
+            iter_cost=self.current_schedule.cost,
+            iter_schedule=self.current_schedule.schedule,
+            best_schedule=self.best_schedule.schedule,
+            best_cost=self.best_schedule.cost,
         )
 
+    def reset_current(self, schedule: FlatSchedule, cost: float):
+        """Continues the search from `schedule` (not copied)"""
         self.current_schedule = Schedule(schedule=schedule, cost=cost)
-        self.best_schedule = Schedule(schedule=schedule, cost=cost)
-        self.history.append(
-            {
-                "iteration": 0,
-                "iter_cost": self.current_schedule.cost,
-                "iter_schedule": copy.deepcopy(self.current_schedule.schedule),
-                "best_schedule": copy.deepcopy(self.best_schedule.schedule),
-                "best_cost": self.best_schedule.cost,
-            }
+        self.evaluation_state = EvaluationState(
+            schedule=schedule,
+            instance=self.instance,
+            alpha_load=50.0,
+            obj_function=self.fitness_cache,
         )
 
-    def optimize(self) -> Tuple[Schedule, List[Dict]]:
+    def optimize(self) -> Tuple[Schedule, HistoryRecorder]:
+        budget = self.budget.start()
+        PROFILER.start_run()
         self.initialize_schedule()
-        for iter in range(self.n_iterations):
-            temperature: float = self.cooling_down(
-                initial_temp=self.initial_temp, iteration=iter
+        budget.update(iteration=0, best=self.best_schedule)
+        initial_temp, final_temp = self.estimate_temperatures()
+
+        # Reheating: temperature boost, back to 1 after `reheat_after` iterations
+        boost = 1.0
+        boost_decay = self.reheat_factor ** (-1 / self.reheat_after)
+        stagnation = 0
+        iter = 0
+        while not budget.exhausted(iter):
+            # Keep track of budget progess (iterations or elapsed time), affect adjusting behavior
+            progress: float = budget.progress(iter)
+            temperature: float = (
+                self.temperature_at(
+                    progress=progress,
+                    iteration=iter,
+                    initial_temp=initial_temp,
+                    final_temp=final_temp,
+                )
+                * boost
+            )
+
+            self.step(temperature=temperature, progress=progress)
+
+            self.history.record(
+                iteration=iter + 1,
+                iter_cost=self.current_schedule.cost,
+                iter_schedule=self.current_schedule.schedule,
+                best_schedule=self.best_schedule.schedule,
+                best_cost=self.best_schedule.cost,
             )
 
-            # Generate new solution
-            probability: float = random.random()
-            # Keep track of iteration progess, affect adjusting behavior
-            progress: float = iter / self.n_iterations
-
-            # Explore
-            if probability < 0.7 * (1 - progress):
-                candidate_schedule = random_explore(
-                    schedule=copy.deepcopy(self.current_schedule.schedule),
-                    tasks=self.tasks,
-                    n_ops=random.randint(1, 10),
+            improved = budget.update(iteration=iter + 1, best=self.best_schedule)
+            stagnation = 0 if improved else stagnation + 1
+            boost = max(1.0, boost * boost_decay)
+            if self.reheat_factor > 1 and stagnation >= self.reheat_after:
+                # Never hotter than the start temperature
+                boost = max(
+                    1.0, min(self.reheat_factor, initial_temp * boost / temperature)
                 )
-            # Exploit
-            else:
-                candidate_schedule = exploit(
-                    schedule=copy.deepcopy(self.current_schedule.schedule),
-                    tasks=self.tasks,
-                    obj_function=objective_function,
-                    precedences=self.precedences,
-                    setups=self.setups,
-                    energy_constraint=self.energy_constraint,
-                    total_resource=self.total_resource,
-                    n_ops=random.randint(1, 3),
+                stagnation = 0
+                # Reheat from the best schedule rather than wherever the chain drifted to
+                self.reset_current(
+                    schedule=self.best_schedule.schedule.copy(),
+                    cost=self.best_schedule.cost,
                 )
 
-            candidate_cost = objective_function(
-                schedule=candidate_schedule,
+            iter += 1
+            # early stop when temperature got too small
+            if temperature < 1e-8:
+                break
+
+        # Cost breakdown is only computed for the final best solution
+        self.best_schedule.breakdown = objective_function(
+            schedule=self.best_schedule.schedule,
+            instance=self.instance,
+            alpha_load=50.0,
+        )
+        self.history.close()
+        self.profile = PROFILER.end_run()
+        return self.best_schedule, self.history
+
+    def step(self, temperature: float, progress: float) -> float:
+        """
+        One annealing iteration at `temperature` from the current schedule. Returns the candidate cost,
+        `BOUND_EXCEEDED` if it was rejected before being fully evaluated
+        """
+        started = clock() if self.selector is not None else 0.0
+        if PROFILER.enabled:
+            # Operators drawn outside a step (temperature estimation) are not credited
+            PROFILER.take_pending()
+        # Generate new solution
+        probability: float = random.random()
+
+        # Explore
+        if probability < 0.7 * (1 - progress):
+            move = explore_move(
+                schedule=self.current_schedule.schedule,
                 tasks=self.tasks,
-                setups=self.setups,
+                n_ops=random.randint(1, 10),
+                selector=self.selector,
+            )
+        # Exploit
+        else:
+            move = exploit_move(
+                schedule=self.current_schedule.schedule,
+                tasks=self.tasks,
+                obj_function=self.fitness_cache,
                 precedences=self.precedences,
+                setups=self.setups,
                 energy_constraint=self.energy_constraint,
                 total_resource=self.total_resource,
-                alpha_load=50.0,
-                verbose=True
+                n_ops=random.randint(1, 3),
+                selector=self.selector,
+                instance=self.instance,
             )
 
-            acp: float = self.acceptance_probability(
-                old_cost=self.best_schedule.cost["total_cost"],
-                new_cost=candidate_cost["total_cost"],
-                temperature=temperature,
+        # Metropolis: accept iff candidate_cost - current_cost < -T * ln(u). The threshold is drawn
+        # first, so the evaluation can stop as soon as the candidate is known to miss it
+        threshold: float = self.acceptance_threshold(
+            current_cost=self.current_schedule.cost, temperature=temperature
+        )
+        # Scored without touching the current schedule
+        candidate_cost = self.evaluation_state.evaluate(move, upper_bound=threshold)
+        if PROFILER.enabled:
+            PROFILER.outcome(
+                PROFILER.take_pending(),
+                accepted=candidate_cost < threshold,
+                improved=candidate_cost < self.current_schedule.cost,
+            )
+        if self.selector is not None:
+            self.selector.reward(
+                improvement=self.current_schedule.cost - candidate_cost,
+                seconds=clock() - started,
             )
 
-            if random.random() < acp:
-                self.current_schedule.update(
-                    new_schedule=copy.deepcopy(candidate_schedule),
-                    new_cost=copy.deepcopy(candidate_cost),
-                )
+        if candidate_cost < threshold:
+            move.apply(self.current_schedule.schedule)
+            self.evaluation_state.commit(move, cost=candidate_cost)
+            self.current_schedule.cost = candidate_cost
 
-            if candidate_cost["total_cost"] < self.best_schedule.cost["total_cost"]:
+            if candidate_cost < self.best_schedule.cost:
                 self.best_schedule.update(
-                    new_schedule=copy.deepcopy(candidate_schedule),
-                    new_cost=copy.deepcopy(candidate_cost),
+                    new_schedule=self.current_schedule.schedule.copy(),
+                    new_cost=candidate_cost,
                 )
 
-            self.history.append(
-                {
-                    "iteration": iter +1,
-                    "iter_cost": self.current_schedule.cost,
-                    "iter_schedule": copy.deepcopy(self.current_schedule.schedule),
-                    "best_schedule": copy.deepcopy(self.best_schedule.schedule),
-                    "best_cost": self.best_schedule.cost,
-                }
-            )
-
-            # early stop when temperature got too small
-            if temperature < 1e-8:
-                break
+        return candidate_cost
 
-        return self.best_schedule, self.history
+    def acceptance_threshold(self, current_cost: float, temperature: float) -> float:
+        """Random cost below which a candidate is accepted, current_cost - T * ln(u), u ~ U(0, 1]"""
+        if temperature <= 0:
+            return current_cost
+        return current_cost - temperature * math.log(1.0 - random.random())
 
     def acceptance_probability(
         self, old_cost: float, new_cost: float, temperature: float
@@ -141,13 +290,65 @@ class SimulatedAnnealing:
         # avoid division by zero
         if temperature <= 0:
             return 0.0
-        # If worse, accept it with a possibility in attempt to escape local minima
-        try:
-            return math.exp(
-                -(new_cost - old_cost) / temperature
-            )  # probability of accepting
-        except OverflowError:
-            return 0.0
+        # If worse, accept it with a possibility in attempt to escape local minima,
+        # the exponent is never positive here so exp can't overflow
+        return math.exp(-(new_cost - old_cost) / temperature)
+
+    def estimate_temperatures(
+        self,
+        n_samples: int = 200,
+        initial_acceptance: float = 0.5,
+        final_acceptance: float = 1e-4,
+    ) -> Tuple[float, float]:
+        """
+        (initial_temp, final_temp). Missing values are estimated from the cost increase of single
+        relocations / swaps around the current schedule: a median increase is accepted with
+        `initial_acceptance` at the start, a 10th-percentile one with `final_acceptance` at the end.
+        Increases adding a precedence violation are left out, they would only inflate the estimates
+        """
+        initial_temp, final_temp = self.initial_temp, self.final_temp
+        if initial_temp is None or final_temp is None:
+            schedule = self.current_schedule.schedule
+            proposals = [
+                propose_random_move,
+                propose_inter_machine_swap,
+                propose_intra_machine_swap,
+            ]
+            deltas = np.array(
+                [
+                    self.evaluation_state.evaluate(random.choice(proposals)(schedule))
+                    - self.current_schedule.cost
+                    for _ in range(n_samples)
+                ]
+            )
+            # Increases only, rounding noise of equivalent schedules left out
+            deltas = deltas[
+                (deltas > 1e-9 * max(1.0, abs(self.current_schedule.cost)))
+                & (deltas < self.evaluation_state.alpha_precedence)
+            ]
+            if len(deltas) == 0:
+                deltas = np.array([1.0])
+
+            if initial_temp is None:
+                initial_temp = float(
+                    -np.median(deltas) / math.log(initial_acceptance)
+                )
+            if final_temp is None:
+                final_temp = float(
+                    -np.percentile(deltas, 10) / math.log(final_acceptance)
+                )
+
+        return initial_temp, min(final_temp, initial_temp)
+
+    def temperature_at(
+        self, progress: float, iteration: int, initial_temp: float, final_temp: float
+    ) -> float:
+        """Temperature after the `progress` fraction of the budget"""
+        if self.cooling == "exponential":
+            return initial_temp * (final_temp / initial_temp) ** progress
+        if self.cooling == "linear":
+            return initial_temp + (final_temp - initial_temp) * progress
+        return self.cooling_down(initial_temp=initial_temp, iteration=iteration)
 
     def cooling_down(self, initial_temp: float, iteration: int, alpha: float = 0.995):
         """Exponential cooling"""
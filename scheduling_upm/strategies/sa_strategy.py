@@ -1,5 +1,8 @@
 import random
 from typing import Dict, Any, Tuple, List
+from ..utils.operator_selection import OperatorSelector, choose
+from ..utils.moves import Move, CompoundMove
+from ..utils.entities import ProblemInstance
 from ..utils.operations import (
     generate_schedule,
     inter_machine_swap,
@@ -7,13 +10,24 @@ from ..utils.operations import (
     random_move,
     shuffle_machine,
     intra_machine_swap,
-    lookahead_insertion,
+    best_insertion,
     partial_precedence_repair,
+    propose_random_move,
+    propose_block_move,
+    propose_generate_schedule,
+    propose_inter_machine_swap,
+    propose_intra_machine_swap,
+    propose_shuffle_machine,
+    propose_best_insertion,
+    propose_precedence_repair,
 )
 
 
 def random_explore(
-    schedule: Dict[int, List[int]], tasks: Dict[int, Any], n_ops: int = 1
+    schedule: Dict[int, List[int]],
+    tasks: Dict[int, Any],
+    n_ops: int = 1,
+    selector: OperatorSelector = None,
 ):
     # Explore
     operation_pool: List[Tuple[callable, Dict]] = [
@@ -31,7 +45,7 @@ def random_explore(
         ),
     ]
     for _ in range(n_ops):
-        operation, kwargs = random.choice(operation_pool)
+        operation, kwargs = choose(operation_pool, selector)
         new_schedule = operation(**kwargs)
 
     return new_schedule
@@ -46,28 +60,30 @@ def exploit(
     precedences: Dict[int, List[int]] = None,
     setups: List[Tuple[int, int]] = None,
     total_resource: Dict[int, Any] = None,
+    selector: OperatorSelector = None,
+    instance: ProblemInstance = None,
 ):
     # Exploit
     operation_pool: List[Tuple[callable, Dict]] = [
         (intra_machine_swap, {"schedule": schedule}),
         (inter_machine_swap, {"schedule": schedule}),
         (
-            lookahead_insertion,
+            best_insertion,
             {
                 "schedule": schedule,
                 "tasks": tasks,
-                "attempts": random.randint(20, 30),
                 "obj_function": obj_function,
                 "energy_constraint": energy_constraint,
                 "precedences": precedences,
                 "setups": setups,
                 "total_resource": total_resource,
+                "instance": instance,
             },
         ),
     ]
 
     for _ in range(n_ops):
-        operation, kwargs = random.choice(operation_pool)
+        operation, kwargs = choose(operation_pool, selector)
         new_schedule = operation(**kwargs)
 
     
@@ -81,3 +97,88 @@ def exploit(
         )
 
     return new_schedule
+
+
+def explore_move(
+    schedule: Dict[int, List[int]],
+    tasks: Dict[int, Any],
+    n_ops: int = 1,
+    selector: OperatorSelector = None,
+) -> CompoundMove:
+    """
+    Same pool as `random_explore`, as one move chaining `n_ops` operations. `schedule` is left
+    untouched. Operations are drawn uniformly, or by `selector` (the caller credits them)
+    """
+    operation_pool: List[Tuple[callable, Dict]] = [
+        (propose_random_move, {}),
+        (propose_block_move, {}),
+        (propose_generate_schedule, {"tasks": tasks}),
+        (propose_inter_machine_swap, {}),
+        (propose_intra_machine_swap, {}),
+        (
+            propose_shuffle_machine,
+            {"n_machines": random.randint(1, len(schedule.keys()) // 2)},
+        ),
+    ]
+    return _chain_moves(
+        schedule=schedule,
+        operations=[choose(operation_pool, selector) for _ in range(n_ops)],
+    )
+
+
+def exploit_move(
+    schedule: Dict[int, List[int]],
+    tasks: Dict[int, Any],
+    obj_function: callable,
+    n_ops: int = 1,
+    energy_constraint: Dict[str, Any] = None,
+    precedences: Dict[int, List[int]] = None,
+    setups: List[Tuple[int, int]] = None,
+    total_resource: Dict[int, Any] = None,
+    selector: OperatorSelector = None,
+    instance: ProblemInstance = None,
+) -> CompoundMove:
+    """Same pool as `exploit`, as one move chaining `n_ops` operations. `schedule` is left untouched"""
+    operation_pool: List[Tuple[callable, Dict]] = [
+        (propose_intra_machine_swap, {}),
+        (propose_inter_machine_swap, {}),
+        (
+            propose_best_insertion,
+            {
+                "tasks": tasks,
+                "obj_function": obj_function,
+                "energy_constraint": energy_constraint,
+                "precedences": precedences,
+                "setups": setups,
+                "total_resource": total_resource,
+                "instance": instance,
+            },
+        ),
+    ]
+    operations = [choose(operation_pool, selector) for _ in range(n_ops)]
+
+    # Partial fix
+    if precedences is not None:
+        operations.append(
+            (
+                propose_precedence_repair,
+                {"tasks": tasks, "precedences": precedences, "setups": setups},
+            )
+        )
+
+    return _chain_moves(schedule=schedule, operations=operations)
+
+
+def _chain_moves(
+    schedule: Dict[int, List[int]], operations: List[Tuple[callable, Dict]]
+) -> CompoundMove:
+    # Each move is drawn on the schedule left by the previous ones, then everything is rolled back
+    moves: List[Move] = []
+    for operation, kwargs in operations:
+        move = operation(schedule=schedule, **kwargs)
+        move.apply(schedule)
+        moves.append(move)
+
+    move = CompoundMove(tuple(moves))
+    move.undo(schedule)
+    return move
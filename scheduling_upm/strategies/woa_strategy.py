@@ -1,6 +1,9 @@
 import random
 import copy
 from typing import Dict, Any, Tuple, List, Callable
+from ..utils.operator_selection import OperatorSelector, choose
+from ..utils.moves import Move, Rewrite, CompoundMove
+from ..utils.entities import ProblemInstance
 from ..utils.operations import (
     generate_schedule,
     inter_machine_swap,
@@ -8,14 +11,21 @@ from ..utils.operations import (
     random_move,
     shuffle_machine,
     intra_machine_swap,
-    lookahead_insertion,
+    best_insertion,
     partial_precedence_repair,
+    propose_random_move,
+    propose_block_move,
+    propose_generate_schedule,
+    propose_inter_machine_swap,
+    propose_intra_machine_swap,
+    propose_shuffle_machine,
 )
 
 
 def random_explore(
     tasks: Dict[int, Any],
     schedule: Dict[int, List[int]],
+    selector: OperatorSelector = None,
 ) -> Dict[int, List[int]]:
     operation_pool: List[Tuple[Callable, Dict]] = [
         (random_move, {"schedule": schedule}),
@@ -35,11 +45,61 @@ def random_explore(
         ),
     ]
 
-    operation, kwargs = random.choice(operation_pool)
+    operation, kwargs = choose(operation_pool, selector)
     new_schedule = operation(**kwargs)
     return new_schedule
 
 
+def explore_move(
+    tasks: Dict[int, Any],
+    schedule: Dict[int, List[int]],
+    selector: OperatorSelector = None,
+) -> Move:
+    """Same pool as `random_explore`, as a move. `schedule` is left untouched, the operation is
+    drawn uniformly or by `selector`"""
+    operation_pool: List[Tuple[Callable, Dict]] = [
+        (propose_random_move, {}),
+        (propose_block_move, {}),
+        (propose_intra_machine_swap, {}),
+        (propose_inter_machine_swap, {}),
+        (propose_generate_schedule, {"tasks": tasks}),
+        (
+            propose_shuffle_machine,
+            {"n_machines": random.randint(1, max(1, len(schedule.keys()) // 2))},
+        ),
+    ]
+
+    operation, kwargs = choose(operation_pool, selector)
+    return operation(schedule=schedule, **kwargs)
+
+
+def spiral_move(
+    schedule: Dict[int, List[int]],
+    best_schedule: Dict[int, List[int]],
+) -> CompoundMove:
+    """`discrete_spiral_update` as a move. `schedule` is left untouched"""
+    machines_to_update = random.sample(
+        list(schedule.keys()), k=random.randint(1, max(1, len(schedule.keys()) // 2))
+    )
+
+    moves: List[Rewrite] = []
+    for machine in machines_to_update:
+        current_tasks = schedule[machine]
+        best_tasks_on_machine = best_schedule.get(machine, [])
+        priority = {task: idx for idx, task in enumerate(best_tasks_on_machine)}
+        moves.append(
+            Rewrite(
+                machine,
+                tuple(current_tasks),
+                tuple(
+                    sorted(current_tasks, key=lambda task: priority.get(task, float("inf")))
+                ),
+            )
+        )
+
+    return CompoundMove(tuple(moves))
+
+
 def discrete_spiral_update(
     schedule: Dict[int, List[int]],
     best_schedule: Dict[int, List[int]],
@@ -72,18 +132,20 @@ def discrete_shrinking_mechanism(
     energy_constraint: Dict[str, Any],
     total_resource: Dict[str, Any],
     n_moves: int = 2,
+    selector: OperatorSelector = None,
+    instance: ProblemInstance = None,
 ) -> Dict[int, List[int]]:
     """
-    Design specifically for WOA. Creates a new schedule by making small random adjustments to the best schedule
+    Design specifically for WOA. Creates a new schedule by making small random adjustments to the best schedule.
+    Adjustments are drawn uniformly or by `selector`
     """
     new_schedule = copy.deepcopy(best_schedule)
     operation_pool: List[Callable] = [
         (intra_machine_swap, {"schedule": new_schedule}),
         (inter_machine_swap, {"schedule": new_schedule}),
         (
-            lookahead_insertion,
+            best_insertion,
             {
-                "attempts": random.randint(20, 30),
                 "schedule": new_schedule,
                 "obj_function": obj_function,
                 "tasks": tasks,
@@ -91,12 +153,13 @@ def discrete_shrinking_mechanism(
                 "precedences": precedences,
                 "energy_constraint": energy_constraint,
                 "total_resource": total_resource,
+                "instance": instance,
             },
         ),
     ]
 
     for _ in range(n_moves):
-        operation, according_args = random.choice(operation_pool)
+        operation, according_args = choose(operation_pool, selector)
         new_schedule = operation(**according_args)
 
     if precedences is not None:
@@ -0,0 +1,111 @@
+import time
+from typing import Any, Callable, Optional
+
+from .entities import Schedule
+
+ImprovementCallback = Callable[[int, Schedule], Any]
+
+
+class SearchBudget:
+    """
+    Stopping rule shared by the optimisers. The search stops after `n_iterations`, after `time_limit`
+    seconds from `start()`, at `deadline` (a `time.time()` timestamp) or after `patience` iterations
+    without improving the best cost, whichever comes first. With a time budget, `progress` is the
+    elapsed fraction of it (or the iteration fraction if that is further), so progress-driven
+    parameters reach their final values when time runs out. `n_iterations=None` is the anytime mode:
+    only time / deadline / patience stop the search (at least one is required) and `progress` is the
+    elapsed time fraction alone. With patience only, `progress` is the longest stagnation so far over
+    `patience`: it never decreases and reaches 1 when the search stops, so temperatures / WOA's `a`
+    move towards their final values as the search stops improving. `on_improvement(iteration, best)`
+    is called on every improvement of the best schedule, `best` is live and must be copied to be kept.
+    """
+
+    def __init__(
+        self,
+        n_iterations: Optional[int],
+        time_limit: float = None,
+        deadline: float = None,
+        patience: int = None,
+        on_improvement: Optional[ImprovementCallback] = None,
+    ):
+        if n_iterations is not None and n_iterations <= 0:
+            raise ValueError("n_iterations must be positive")
+        if n_iterations is None and time_limit is None and deadline is None and patience is None:
+            raise ValueError(
+                "Without n_iterations, one of time_limit, deadline or patience is needed"
+            )
+        if time_limit is not None and time_limit <= 0:
+            raise ValueError("time_limit must be positive")
+        if patience is not None and patience <= 0:
+            raise ValueError("patience must be positive")
+
+        self.n_iterations = n_iterations
+        self.time_limit = time_limit
+        self.deadline = deadline
+        self.patience = patience
+        self.on_improvement = on_improvement
+
+        self.started: float = None
+        self.duration: float = None
+        self.best_cost = float("inf")
+        self.stagnation = 0
+        # Longest stagnation so far, drives `progress` with patience only
+        self.peak_stagnation = 0
+        self.stop_reason: str = None
+
+    def start(self) -> "SearchBudget":
+        """Starts the clock, the deadline is converted to a duration from now"""
+        self.started = time.perf_counter()
+        self.best_cost = float("inf")
+        self.stagnation = 0
+        self.peak_stagnation = 0
+        self.stop_reason = None
+        durations = [self.time_limit] if self.time_limit is not None else []
+        if self.deadline is not None:
+            durations.append(max(0.0, self.deadline - time.time()))
+        self.duration = min(durations) if len(durations) > 0 else None
+        return self
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def progress(self, iteration: int) -> float:
+        """Fraction of the budget spent before `iteration`, in [0, 1]"""
+        if self.n_iterations is not None:
+            progress = iteration / self.n_iterations
+        elif self.duration is None:
+            progress = self.peak_stagnation / self.patience
+        else:
+            progress = 0.0
+        if self.duration is not None:
+            progress = max(progress, self.elapsed / self.duration if self.duration > 0 else 1.0)
+        return min(1.0, progress)
+
+    def update(self, iteration: int, best: Schedule) -> bool:
+        """Tracks the best cost after `iteration`, returns whether it improved"""
+        if best.cost < self.best_cost:
+            self.best_cost = best.cost
+            self.stagnation = 0
+            if self.on_improvement is not None:
+                self.on_improvement(iteration, best)
+            return True
+        self.stagnation += 1
+        self.peak_stagnation = max(self.peak_stagnation, self.stagnation)
+        return False
+
+    def exhausted(self, iteration: int) -> bool:
+        """Whether the search must stop before `iteration`, the reason is kept in `stop_reason`"""
+        if self.n_iterations is not None and iteration >= self.n_iterations:
+            self.stop_reason = "iterations"
+        elif self.duration is not None and self.elapsed >= self.duration:
+            self.stop_reason = "time"
+        elif self.patience is not None and self.stagnation >= self.patience:
+            self.stop_reason = "stagnation"
+        return self.stop_reason is not None
+
+    def __repr__(self):
+        return (
+            f"SearchBudget(n_iterations={self.n_iterations}, time_limit={self.time_limit}, "
+            f"deadline={self.deadline}, patience={self.patience}, stop_reason={self.stop_reason!r})"
+        )
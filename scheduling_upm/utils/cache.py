@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+from .entities import FlatSchedule
+from .evaluation import BOUND_EXCEEDED
+
+ScheduleKey = bytes
+
+
+def schedule_key(schedule: Dict[int, List[int]]) -> ScheduleKey:
+    """Canonical, hashable key of a schedule: raw bytes of its flat representation"""
+    if not isinstance(schedule, FlatSchedule):
+        schedule = FlatSchedule.from_dict(schedule)
+    return schedule.key()
+
+
+class FitnessCache:
+    """
+    Bounded LRU memoisation in front of an objective function.
+
+    The key is the flat task / offset bytes of the schedule, compared exactly on lookup so a hit can never
+    return the cost of another schedule. Extra keyword arguments are only forwarded on misses: wrap a
+    `functools.partial` of `objective_function` whose parameters are fixed for the cache's lifetime.
+    Bounded evaluations (`upper_bound=`) that return `BOUND_EXCEEDED` are not stored.
+    `maxsize=0` disables caching.
+    """
+
+    def __init__(self, obj_function: Callable, maxsize: int = 10_000):
+        self.obj_function = obj_function
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[ScheduleKey, Any] = OrderedDict()
+
+    def __call__(self, schedule: Dict[int, List[int]], **kwargs) -> Any:
+        key = schedule_key(schedule)
+        cost = self._lookup(key)
+        if cost is None:
+            cost = self.obj_function(schedule=schedule, **kwargs)
+            if cost != BOUND_EXCEEDED:
+                self._store(key, cost)
+        return _copy_cost(cost)
+
+    def get(self, schedule: Dict[int, List[int]]) -> Any:
+        """Cached cost of `schedule`, or None"""
+        cost = self._lookup(schedule_key(schedule))
+        return None if cost is None else _copy_cost(cost)
+
+    def put(self, schedule: Dict[int, List[int]], cost: Any):
+        """Stores an externally computed cost, e.g. from `evaluate_batch`"""
+        self._store(schedule_key(schedule), cost)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key: ScheduleKey) -> Any:
+        cost = self._entries.get(key)
+        if cost is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return cost
+
+    def _store(self, key: ScheduleKey, cost: Any):
+        if self.maxsize <= 0:
+            return
+
+        self._entries[key] = cost
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            # Evict least recently used
+            self._entries.popitem(last=False)
+
+
+def _copy_cost(cost: Any) -> Any:
+    # Breakdown dicts are handed out as copies so callers can't corrupt the cache
+    return dict(cost) if isinstance(cost, dict) else cost
@@ -0,0 +1,219 @@
+import copy
+import math
+from typing import Callable, Dict, List
+
+from .entities import ProblemInstance
+from .evaluation import (
+    objective_function,
+    BOUND_EXCEEDED,
+    compute_base_milestones,
+    calculate_machine_loads,
+    write_machine_milestones,
+    precedence_constraint,
+    energy_consumption_over_time,
+    compute_makespan,
+)
+from .moves import Move
+from .profiling import profiled
+
+
+class EvaluationState:
+    """
+    Cached evaluation of the current solution. Scores a move by recomputing only the affected
+    machines' completion times, machine loads and std_dev are updated in O(1) from running sums.
+
+    - Without precedences / energy / resource: cost = max machine completion + alpha_load * std_dev
+    - With precedences / energy: unaffected machines' base milestones are reused, delays and energy
+      are recomputed on the merged milestones
+    - With resource constraint: tasks interact through the shared pool, fall back to full evaluation
+
+    `obj_function`: used for full evaluations, e.g. a `FitnessCache` with the same alphas. Defaults to
+    `objective_function` on the instance.
+    """
+
+    def __init__(
+        self,
+        schedule: Dict[int, List[int]],
+        instance: ProblemInstance,
+        alpha_precedence: float = 10**6,
+        alpha_load: float = 100.0,
+        alpha_energy: float = 1.0,
+        obj_function: Callable = None,
+    ):
+        self.instance = instance
+        self.obj_function = obj_function
+        self.alpha_precedence = alpha_precedence
+        self.alpha_load = alpha_load
+        self.alpha_energy = alpha_energy
+
+        self.schedule: Dict[int, List[int]] = {
+            machine: list(sequence) for machine, sequence in schedule.items()
+        }
+        self.n_machines = len(self.schedule)
+
+        # Base milestones (without constraint) of every machine
+        self.base_milestones = compute_base_milestones(
+            schedule=self.schedule, instance=instance
+        )
+        self.machine_completion: Dict[int, float] = {
+            machine: (
+                float(self.base_milestones.complete_time[sequence[-1]])
+                if len(sequence) > 0
+                else 0.0
+            )
+            for machine, sequence in self.schedule.items()
+        }
+
+        # Running sums of machine loads for O(1) std_dev
+        self.machine_loads = calculate_machine_loads(
+            self.schedule, self.n_machines, None, instance=instance
+        )
+        self.load_sum = sum(self.machine_loads)
+        self.load_sq_sum = sum(load * load for load in self.machine_loads)
+
+        self.cost: float = self._full_cost(self.schedule)
+
+    @profiled("objective.delta")
+    def evaluate(self, move: Move, upper_bound: float = None) -> float:
+        """
+        Total cost of the schedule after applying `move`, current state is left untouched.
+        With `upper_bound`, returns `BOUND_EXCEEDED` as soon as a lower bound of the cost reaches it:
+        load std_dev first, then the makespan before precedence delays, then after them
+        """
+        sequences = move.sequences(self.schedule)
+        if self.instance.total_resource is not None:
+            return self._full_cost({**self.schedule, **sequences}, upper_bound=upper_bound)
+
+        std_dev = self._std_dev_after(move)
+        lower_bound = self.alpha_load * std_dev
+        if upper_bound is not None and lower_bound >= upper_bound:
+            return BOUND_EXCEEDED
+
+        if self.instance.precedences is None and self.instance.energy_constraint is None:
+            # Only affected machines' completion time changes
+            completion = dict(self.machine_completion)
+            for machine, sequence in sequences.items():
+                completion[machine] = _sequence_completion(
+                    machine=machine, sequence=sequence, instance=self.instance
+                )
+            return _bounded(max(completion.values()) + lower_bound, upper_bound)
+
+        task_milestones = copy.deepcopy(self.base_milestones)
+        for machine, sequence in sequences.items():
+            write_machine_milestones(
+                task_milestones=task_milestones,
+                machine=machine,
+                sequence=sequence,
+                instance=self.instance,
+            )
+        # Precedence delays and energy penalty only add to the cost
+        if (
+            upper_bound is not None
+            and compute_makespan(task_milestones=task_milestones) + lower_bound
+            >= upper_bound
+        ):
+            return BOUND_EXCEEDED
+
+        precedence_penalty = 0
+        if self.instance.precedences is not None:
+            precedence_penalty, task_milestones = precedence_constraint(
+                schedule={**self.schedule, **sequences},
+                task_completion_milestones=task_milestones,
+                instance=self.instance,
+            )
+            lower_bound += self.alpha_precedence * precedence_penalty
+            if (
+                upper_bound is not None
+                and compute_makespan(task_milestones=task_milestones) + lower_bound
+                >= upper_bound
+            ):
+                return BOUND_EXCEEDED
+
+        energy_exceeds_penalty = 0
+        if self.instance.energy_constraint is not None:
+            energy_exceeds_penalty = energy_consumption_over_time(
+                task_milestones=task_milestones, instance=self.instance
+            )
+
+        return _bounded(
+            compute_makespan(task_milestones=task_milestones)
+            + lower_bound
+            + self.alpha_energy * energy_exceeds_penalty,
+            upper_bound,
+        )
+
+    def commit(self, move: Move, cost: float = None):
+        """Applies `move` to the cached solution. `cost` is the value returned by `evaluate`, if known"""
+        if cost is None:
+            cost = self.evaluate(move)
+
+        for machine, delta in move.load_deltas(
+            self.schedule, self.instance.task_loads
+        ).items():
+            old_load = self.machine_loads[machine]
+            new_load = old_load + delta
+            self.machine_loads[machine] = new_load
+            self.load_sum += new_load - old_load
+            self.load_sq_sum += new_load * new_load - old_load * old_load
+
+        for machine, sequence in move.sequences(self.schedule).items():
+            self.schedule[machine] = sequence
+            self.machine_completion[machine] = write_machine_milestones(
+                task_milestones=self.base_milestones,
+                machine=machine,
+                sequence=sequence,
+                instance=self.instance,
+            )
+
+        self.cost = cost
+
+    def _std_dev_after(self, move: Move) -> float:
+        load_sum = self.load_sum
+        load_sq_sum = self.load_sq_sum
+        for machine, delta in move.load_deltas(
+            self.schedule, self.instance.task_loads
+        ).items():
+            old_load = self.machine_loads[machine]
+            new_load = old_load + delta
+            load_sum += new_load - old_load
+            load_sq_sum += new_load * new_load - old_load * old_load
+
+        mean = load_sum / self.n_machines
+        return math.sqrt(max(0.0, load_sq_sum / self.n_machines - mean * mean))
+
+    def _full_cost(
+        self, schedule: Dict[int, List[int]], upper_bound: float = None
+    ) -> float:
+        if self.obj_function is not None:
+            if upper_bound is None:
+                return self.obj_function(schedule=schedule)
+            # Cached costs come back unbounded
+            return _bounded(
+                self.obj_function(schedule=schedule, upper_bound=upper_bound),
+                upper_bound,
+            )
+        return objective_function(
+            schedule=schedule,
+            instance=self.instance,
+            alpha_precedence=self.alpha_precedence,
+            alpha_load=self.alpha_load,
+            alpha_energy=self.alpha_energy,
+            breakdown=False,
+            upper_bound=upper_bound,
+        )
+
+
+def _bounded(cost: float, upper_bound: float) -> float:
+    return BOUND_EXCEEDED if upper_bound is not None and cost >= upper_bound else cost
+
+
+def _sequence_completion(
+    machine: int, sequence: List[int], instance: ProblemInstance
+) -> float:
+    """Completion time of one machine's sequence, without constraint"""
+    if len(sequence) == 0:
+        return 0.0
+    return float(
+        instance.process_times[sequence, machine].sum()
+        + instance.setup_times[sequence[:-1], sequence[1:]].sum()
+    )
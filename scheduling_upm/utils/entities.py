@@ -1,16 +1,233 @@
-from typing import Dict, List
+import numpy as np
+from array import array
+from collections import deque
+from collections.abc import MutableSequence
+from typing import Dict, List, Tuple, Any, Hashable, Iterable, Iterator, Union
 
 class Schedule:
-    """Representation of the solution"""
+    """Representation of the solution. `cost` is the total cost, `breakdown` the per-term costs when requested"""
 
-    def __init__(self, schedule: Dict[int, List[int]], cost: float):
+    def __init__(
+        self,
+        schedule: Dict[int, List[int]],
+        cost: float,
+        breakdown: Dict[str, float] = None,
+    ):
         self.schedule = schedule
         self.cost = cost
+        self.breakdown = breakdown
 
-    def update(self, new_schedule: Dict[int, List[int]], new_cost: float):
+    def update(
+        self,
+        new_schedule: Dict[int, List[int]],
+        new_cost: float,
+        new_breakdown: Dict[str, float] = None,
+    ):
         """Updates whale's schedule and cost"""
         self.schedule = new_schedule
         self.cost = new_cost
+        self.breakdown = new_breakdown
+
+class FlatSchedule:
+    """
+    Compact schedule: one flat array of task ids + machine offsets, tasks of machine m are
+    tasks[offsets[m]:offsets[m + 1]]. Machines are 0..n_machines-1.
+
+    Copies are single buffer copies and `key()` / `hash()` work on the raw bytes. Behaves like the
+    `Dict[int, List[int]]` schedule for the operators: `schedule[m]` is a live, mutable view of
+    machine m, `items()` / `values()` return list snapshots. Don't mutate it while used as a dict key.
+    """
+
+    __slots__ = ("tasks", "offsets")
+
+    def __init__(self, tasks: array = None, offsets: array = None):
+        self.tasks = tasks if tasks is not None else array("q")
+        self.offsets = offsets if offsets is not None else array("q", [0])
+
+    @classmethod
+    def from_dict(cls, schedule: Dict[int, Iterable[int]]) -> "FlatSchedule":
+        machines = sorted(schedule.keys())
+        if machines != list(range(len(machines))):
+            raise ValueError("Machine ids must be consecutive integers starting from 0")
+
+        tasks = array("q")
+        offsets = array("q", [0])
+        for machine in machines:
+            tasks.extend(schedule[machine])
+            offsets.append(len(tasks))
+        return cls(tasks, offsets)
+
+    @classmethod
+    def from_schedule(
+        cls, schedule: Union["FlatSchedule", Dict[int, Iterable[int]]]
+    ) -> "FlatSchedule":
+        """Independent FlatSchedule copy of either schedule representation"""
+        if isinstance(schedule, FlatSchedule):
+            return schedule.copy()
+        return cls.from_dict(schedule)
+
+    def to_dict(self) -> Dict[int, List[int]]:
+        return {machine: self._slice(machine).tolist() for machine in range(len(self))}
+
+    @property
+    def n_machines(self) -> int:
+        return len(self.offsets) - 1
+
+    def bounds(self, machine: int) -> Tuple[int, int]:
+        """[start, end) of `machine` in the flat task array"""
+        if not 0 <= machine < len(self.offsets) - 1:
+            raise KeyError(machine)
+        return self.offsets[machine], self.offsets[machine + 1]
+
+    def copy(self) -> "FlatSchedule":
+        return FlatSchedule(self.tasks[:], self.offsets[:])
+
+    def __copy__(self) -> "FlatSchedule":
+        return self.copy()
+
+    def __deepcopy__(self, memo) -> "FlatSchedule":
+        return self.copy()
+
+    def key(self) -> bytes:
+        """Raw bytes of the schedule, equal for equal schedules"""
+        return self.offsets.tobytes() + self.tasks.tobytes()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __eq__(self, other):
+        if isinstance(other, FlatSchedule):
+            return self.offsets == other.offsets and self.tasks == other.tasks
+        if isinstance(other, dict):
+            return self.to_dict() == {
+                machine: list(sequence) for machine, sequence in other.items()
+            }
+        return NotImplemented
+
+    # Dict-like interface
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self)))
+
+    def __contains__(self, machine) -> bool:
+        return isinstance(machine, int) and 0 <= machine < len(self)
+
+    def keys(self) -> range:
+        return range(len(self))
+
+    def values(self) -> List[List[int]]:
+        return [self._slice(machine).tolist() for machine in range(len(self))]
+
+    def items(self) -> List[Tuple[int, List[int]]]:
+        return [(machine, self._slice(machine).tolist()) for machine in range(len(self))]
+
+    def get(self, machine: int, default=None):
+        return MachineSequence(self, machine) if machine in self else default
+
+    def __getitem__(self, machine: int) -> "MachineSequence":
+        self.bounds(machine)
+        return MachineSequence(self, machine)
+
+    def __setitem__(self, machine: int, sequence: Iterable[int]):
+        start, end = self.bounds(machine)
+        # Materialise first, `sequence` may be a view of this schedule
+        sequence = array("q", sequence)
+        self.tasks[start:end] = sequence
+        self._shift(machine, len(sequence) - (end - start))
+
+    def __repr__(self):
+        return f"FlatSchedule({self.to_dict()})"
+
+    def _slice(self, machine: int) -> array:
+        return self.tasks[self.offsets[machine] : self.offsets[machine + 1]]
+
+    def _shift(self, machine: int, delta: int):
+        if delta != 0:
+            for idx in range(machine + 1, len(self.offsets)):
+                self.offsets[idx] += delta
+
+
+class MachineSequence(MutableSequence):
+    """Live list-like view of one machine of a `FlatSchedule`, slicing returns lists"""
+
+    __slots__ = ("schedule", "machine")
+
+    def __init__(self, schedule: FlatSchedule, machine: int):
+        self.schedule = schedule
+        self.machine = machine
+
+    def __len__(self) -> int:
+        start, end = self.schedule.bounds(self.machine)
+        return end - start
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.schedule._slice(self.machine))
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.schedule._slice(self.machine)[idx].tolist()
+        return self.schedule.tasks[self._position(idx)]
+
+    def __setitem__(self, idx, task):
+        if isinstance(idx, slice):
+            sequence = list(self)
+            sequence[idx] = task
+            self.schedule[self.machine] = sequence
+            return
+        self.schedule.tasks[self._position(idx)] = task
+
+    def __delitem__(self, idx):
+        if isinstance(idx, slice):
+            sequence = list(self)
+            del sequence[idx]
+            self.schedule[self.machine] = sequence
+            return
+        del self.schedule.tasks[self._position(idx)]
+        self.schedule._shift(self.machine, -1)
+
+    def insert(self, idx: int, task: int):
+        start, end = self.schedule.bounds(self.machine)
+        # Same clamping as list.insert
+        length = end - start
+        if idx < 0:
+            idx = max(0, length + idx)
+        self.schedule.tasks.insert(start + min(idx, length), task)
+        self.schedule._shift(self.machine, 1)
+
+    def pop(self, idx: int = -1) -> int:
+        task = self.schedule.tasks.pop(self._position(idx))
+        self.schedule._shift(self.machine, -1)
+        return task
+
+    def index(self, task: int, start: int = 0, stop: int = None) -> int:
+        begin, end = self.schedule.bounds(self.machine)
+        stop = end - begin if stop is None else stop
+        try:
+            return self.schedule.tasks.index(task, begin + start, begin + stop) - begin
+        except ValueError:
+            raise ValueError(f"{task} is not in machine {self.machine}") from None
+
+    def __eq__(self, other):
+        if isinstance(other, (MachineSequence, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.schedule._slice(self.machine).tolist(), dtype=dtype)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def _position(self, idx: int) -> int:
+        start, end = self.schedule.bounds(self.machine)
+        if idx < 0:
+            idx += end - start
+        if not 0 <= idx < end - start:
+            raise IndexError("machine sequence index out of range")
+        return start + idx
+
 
 class Task:
     def __init__(self, task_id, process_times, resource, weight=1, task_type="normal"):
@@ -28,4 +245,141 @@ class Machine:
         self.machine_id = machine_id
     
     def __repr__(self):
-        return f"Machine({self.machine_id})"
\ No newline at end of file
+        return f"Machine({self.machine_id})"
+
+
+class ProblemInstance:
+    """Array-backed representation of the problem, compiled once from the environment.
+
+    Task ids must be ``0..n_tasks-1`` (as produced by ``generate_environment``) so that
+    they can be used directly as row indices.
+    """
+
+    def __init__(
+        self,
+        tasks: Dict[int, Any],
+        setups: Dict[Tuple[int, int], int],
+        n_machines: int = None,
+        precedences: Dict[int, Any] = None,
+        energy_constraint: Dict[str, Any] = None,
+        total_resource: int = None,
+    ):
+        n_tasks = len(tasks)
+        if sorted(tasks.keys()) != list(range(n_tasks)):
+            raise ValueError("Task ids must be consecutive integers starting from 0")
+
+        if n_machines is None:
+            n_machines = len(tasks[0]["process_times"]) if n_tasks > 0 else 0
+
+        self.n_tasks = n_tasks
+        self.n_machines = n_machines
+
+        # (n_tasks, n_machines): process time of a task on each machine
+        self.process_times = np.zeros((n_tasks, n_machines), dtype=np.float64)
+        # (n_tasks,): resource needed / weight of each task
+        self.resources = np.zeros(n_tasks, dtype=np.float64)
+        self.weights = np.ones(n_tasks, dtype=np.float64)
+        for task, properties in tasks.items():
+            self.process_times[task] = properties["process_times"][:n_machines]
+            self.resources[task] = properties.get("resource", 0)
+            self.weights[task] = properties.get("weight", 1)
+
+        # (n_tasks, n_machines): weighted load of a task on each machine
+        self.task_loads = self.process_times * self.weights[:, None]
+
+        # (n_tasks, n_tasks): setup time from task a -> task b
+        self.setup_times = np.zeros((n_tasks, n_tasks), dtype=np.float64)
+        for (task_a, task_b), setup_time in setups.items():
+            self.setup_times[task_a, task_b] = setup_time
+
+        self.precedences = precedences or None
+
+        # Precedence graph in CSR form, successors of task t:
+        # precedence_indices[precedence_indptr[t]:precedence_indptr[t + 1]]
+        # precedence_order: tasks of the precedence graph in topological order
+        self.precedence_indptr = np.zeros(n_tasks + 1, dtype=np.intp)
+        self.precedence_indices = np.zeros(0, dtype=np.intp)
+        self.precedence_order = np.zeros(0, dtype=np.intp)
+        # (pre, post) edges grouped by pre in topological order, for Python loops
+        self.precedence_edges: List[Tuple[int, int]] = []
+        if self.precedences is not None:
+            self._compile_precedences()
+
+        # (n_tasks, n_machines): energy usage of a task on each machine
+        self.energy_constraint = energy_constraint or None
+        self.energy_cap: float = None
+        self.energy_usages = None
+        if self.energy_constraint is not None:
+            self.energy_cap = energy_constraint["energy_cap"]
+            self.energy_usages = np.zeros((n_tasks, n_machines), dtype=np.float64)
+            for task in range(n_tasks):
+                self.energy_usages[task] = energy_constraint["energy_usages"][task][
+                    :n_machines
+                ]
+
+        self.total_resource = total_resource or None
+
+    def _compile_precedences(self):
+        """Compiles the precedence dict into CSR arrays and a topological order"""
+        successors: List[List[int]] = [[] for _ in range(self.n_tasks)]
+        for pre, posts in self.precedences.items():
+            # Drop duplicated edges, keep the given order
+            successors[pre] = list(dict.fromkeys(posts))
+
+        self.precedence_indptr[1:] = np.cumsum([len(posts) for posts in successors])
+        self.precedence_indices = np.fromiter(
+            (post for posts in successors for post in posts),
+            dtype=np.intp,
+            count=int(self.precedence_indptr[-1]),
+        )
+        self.precedence_order = np.asarray(
+            topological_order(self.precedences), dtype=np.intp
+        )
+        self.precedence_edges = [
+            (pre, post) for pre in self.precedence_order.tolist() for post in successors[pre]
+        ]
+
+    @classmethod
+    def from_environment(
+        cls, environment: Dict[str, Any], total_resource: int = None
+    ) -> "ProblemInstance":
+        """Builds an instance from the output of ``generate_environment``"""
+        return cls(
+            tasks=environment["tasks"],
+            setups=environment.get("setups", {}),
+            n_machines=environment.get("n_machines"),
+            precedences=environment.get("precedences"),
+            energy_constraint=environment.get("energy_constraint"),
+            total_resource=(
+                total_resource
+                if total_resource is not None
+                else environment.get("total_resource")
+            ),
+        )
+
+    def __repr__(self):
+        return f"ProblemInstance(n_tasks={self.n_tasks}, n_machines={self.n_machines})"
+
+
+def topological_order(precedences: Dict[Hashable, Any]) -> List[Hashable]:
+    """Kahn's algorithm over the precedence graph {pre: [post, ...]}. Raises ValueError on cycles"""
+    in_degree: Dict[Hashable, int] = {}
+    for pre, posts in precedences.items():
+        in_degree.setdefault(pre, 0)
+        for post in dict.fromkeys(posts):
+            in_degree[post] = in_degree.get(post, 0) + 1
+
+    queue = deque(node for node, degree in in_degree.items() if degree == 0)
+    order: List[Hashable] = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for post in dict.fromkeys(precedences.get(node, ())):
+            in_degree[post] -= 1
+            if in_degree[post] == 0:
+                queue.append(post)
+
+    if len(order) < len(in_degree):
+        raise ValueError("Precedence constraints contain a cycle")
+
+    return order
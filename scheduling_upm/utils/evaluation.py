@@ -1,13 +1,48 @@
-import copy
+import heapq
+import bisect
 import numpy as np
 from typing import List, Tuple, Dict, Any
-from collections import defaultdict
+from .entities import ProblemInstance, topological_order
+from .kernels import jit_enabled, compiled_objective_terms
+from .profiling import profiled
 
 
+# Returned by `objective_function` when the cost is known to reach `upper_bound`.
+# Compares greater than any real cost, so "candidate < threshold" checks just fail.
+BOUND_EXCEEDED = float("inf")
+
+
+class TaskMilestones:
+    """Array-backed milestones, indexed by task id. Produced when evaluating with a `ProblemInstance`,
+    every task of the instance is expected to be scheduled"""
+
+    __slots__ = (
+        "start_setup",
+        "start_process",
+        "complete_time",
+        "machine",
+        "idx_on_machine",
+    )
+
+    def __init__(self, n_tasks: int):
+        self.start_setup = np.zeros(n_tasks, dtype=np.float64)
+        self.start_process = np.zeros(n_tasks, dtype=np.float64)
+        self.complete_time = np.zeros(n_tasks, dtype=np.float64)
+        self.machine = np.zeros(n_tasks, dtype=np.intp)
+        self.idx_on_machine = np.zeros(n_tasks, dtype=np.intp)
+
+    def __deepcopy__(self, memo):
+        milestones = TaskMilestones.__new__(TaskMilestones)
+        for attr in TaskMilestones.__slots__:
+            setattr(milestones, attr, getattr(self, attr).copy())
+        return milestones
+
+
+@profiled("objective.total")
 def objective_function(
     schedule: Dict[int, List[int]],
-    tasks: Dict[int, Any],
-    setups: Dict[Tuple[int, int], int],
+    tasks: Dict[int, Any] = None,
+    setups: Dict[Tuple[int, int], int] = None,
     precedences: Dict[int, Any] = None,
     energy_constraint: Dict[str, Any] = None,
     total_resource: int = None,
@@ -15,7 +50,10 @@ def objective_function(
     alpha_load: float = 100.0,  # Soft constraint
     alpha_energy: float = 1.0,  # Energy Exceed (Medium)
     verbose: bool = False,  # Detail để tune
-) -> Dict[str, float]:
+    instance: ProblemInstance = None,
+    breakdown: bool = True,
+    upper_bound: float = None,
+) -> Dict[str, float] | float:
     """Objective: Minimize makespan + penalty
     Guide Tune Alpha:
     1. Chạy random schedules để lấy typical makespan, std_dev
@@ -34,6 +72,18 @@ def objective_function(
         print(f"Energy Penalty (raw): {energy_penalty} -> Weighted: {alpha_energy * energy_penalty}")
         print(f"Total Cost: {cost}")
 
+    Nếu truyền `instance` (ProblemInstance), mọi dữ liệu (tasks, setups, precedences, energy, resource)
+    được lấy từ các mảng NumPy của instance thay vì các dict, các tham số tương ứng bị bỏ qua.
+
+    `breakdown=False`: fast path, chỉ trả về total cost (float), không tạo dict breakdown.
+    Dùng trong vòng lặp của các thuật toán, breakdown chỉ tính lại cho lời giải tốt nhất.
+
+    `upper_bound`: chỉ cần biết candidate có tốt hơn ngưỡng hay không. Dừng sớm và trả về `BOUND_EXCEEDED`
+    ngay khi 1 cận dưới của cost >= upper_bound. Cận dưới tăng dần qua các bước:
+        1. alpha_load * std_dev + alpha_precedence * vi phạm precedence trên cùng máy (chỉ phụ thuộc vị trí)
+        2. + makespan chưa tính delay precedence (delay chỉ làm makespan tăng)
+        3. + makespan sau delay precedence
+
     Giải thích nghĩa
     1. Tune dùng để thí nghiệm & điều chỉnh các tham số để cải thiện performance. Trong trường hợp này, nó sẽ thử nghiệm & chọn best value cho alphas
     --> Đảm bảo các penalties được cân bằng đúng
@@ -41,6 +91,49 @@ def objective_function(
     --> Giúp điều chỉnh các thông số để dubug
     """
     """Objective: Minimize makespan"""
+    if instance is not None:
+        precedences = instance.precedences
+        energy_constraint = instance.energy_constraint
+        total_resource = instance.total_resource
+
+        # Kernel biên dịch bằng numba (nếu có), mô phỏng resource vẫn chạy bằng Python
+        if jit_enabled():
+            makespan, precedence_penalty, std_dev, energy_exceeds_penalty = (
+                compiled_objective_terms(
+                    schedule=schedule,
+                    instance=instance,
+                    task_milestones=(
+                        apply_resource_constraint(schedule=schedule, instance=instance)
+                        if total_resource is not None
+                        else None
+                    ),
+                )
+            )
+            return _objective_result(
+                makespan=makespan,
+                precedence_penalty=precedence_penalty,
+                std_dev=std_dev,
+                energy_exceeds_penalty=energy_exceeds_penalty,
+                alpha_precedence=alpha_precedence,
+                alpha_load=alpha_load,
+                alpha_energy=alpha_energy,
+                verbose=verbose,
+                breakdown=breakdown,
+                upper_bound=upper_bound,
+            )
+
+    # Cận dưới của cost, tính từ các thành phần rẻ nhất trước
+    if upper_bound is not None:
+        std_dev = calculate_load_standard_deviation(
+            schedule, len(schedule), tasks, instance=instance
+        )
+        lower_bound = alpha_load * std_dev
+        if precedences is not None:
+            lower_bound += alpha_precedence * precedence_violations(
+                schedule=schedule, precedences=precedences, instance=instance
+            )
+        if lower_bound >= upper_bound:
+            return BOUND_EXCEEDED
 
     # Áp dụng ràng buộc resource
     task_completion_milestones = (
@@ -49,25 +142,44 @@ def objective_function(
             tasks=tasks,
             setups=setups,
             total_resource=total_resource,
+            instance=instance,
         )
         if total_resource is not None
-        else compute_base_milestones(schedule=schedule, tasks=tasks, setups=setups)
+        else compute_base_milestones(
+            schedule=schedule, tasks=tasks, setups=setups, instance=instance
+        )
     )
+    if (
+        upper_bound is not None
+        and compute_makespan(task_milestones=task_completion_milestones) + lower_bound
+        >= upper_bound
+    ):
+        return BOUND_EXCEEDED
+
     # Áp dụng ràng buộc precedences để tính thời gian hoàn thành thực tế của từng task
     precedence_penalty = 0
     if precedences is not None:
         precedence_penalty, task_completion_milestones = precedence_constraint(
             schedule=schedule,
-            task_completion_milestones=copy.deepcopy(task_completion_milestones),
+            task_completion_milestones=task_completion_milestones,
             setups=setups,
             precedences=precedences,
+            instance=instance,
         )
+        if (
+            upper_bound is not None
+            and compute_makespan(task_milestones=task_completion_milestones)
+            + lower_bound
+            >= upper_bound
+        ):
+            return BOUND_EXCEEDED
         # Energy consumption constraint
     energy_exceeds_penalty = 0
     if energy_constraint is not None:
         energy_exceeds_penalty = energy_consumption_over_time(
             task_milestones=task_completion_milestones,
             energy_constraint=energy_constraint,
+            instance=instance,
         )
 
     # TODO
@@ -75,11 +187,41 @@ def objective_function(
 
     # Makespan, std_dev
     makespan = compute_makespan(task_milestones=task_completion_milestones)
-    std_dev = calculate_load_standard_deviation(schedule, len(schedule), tasks)
+    if upper_bound is None:
+        std_dev = calculate_load_standard_deviation(
+            schedule, len(schedule), tasks, instance=instance
+        )
 
     # TODO
     # Xét thêm những khía cạnh khác, tính cost
 
+    return _objective_result(
+        makespan=makespan,
+        precedence_penalty=precedence_penalty,
+        std_dev=std_dev,
+        energy_exceeds_penalty=energy_exceeds_penalty,
+        alpha_precedence=alpha_precedence,
+        alpha_load=alpha_load,
+        alpha_energy=alpha_energy,
+        verbose=verbose,
+        breakdown=breakdown,
+        upper_bound=upper_bound,
+    )
+
+
+def _objective_result(
+    makespan: float,
+    precedence_penalty: int,
+    std_dev: float,
+    energy_exceeds_penalty: float,
+    alpha_precedence: float,
+    alpha_load: float,
+    alpha_energy: float,
+    verbose: bool,
+    breakdown: bool,
+    upper_bound: float,
+) -> Dict[str, float] | float:
+    """Weighted cost from the raw terms, shared by the Python and compiled paths"""
     # Cost
     cost = (
         makespan + 
@@ -88,6 +230,19 @@ def objective_function(
         alpha_energy * energy_exceeds_penalty
     )
 
+    if verbose:
+        print(f"Makespan: {makespan}")
+        print(f"Precedence Penalty (raw): {precedence_penalty} -> Weighted: {alpha_precedence * precedence_penalty}")
+        print(f"Load Std Dev (raw): {std_dev} -> Weighted Penalty: {alpha_load * std_dev}")
+        print(f"Energy Penalty (raw): {energy_exceeds_penalty} -> Weighted: {alpha_energy * energy_exceeds_penalty}")
+        print(f"Total Cost: {cost}")
+
+    if upper_bound is not None and cost >= upper_bound:
+        return BOUND_EXCEEDED
+
+    if not breakdown:
+        return cost
+
     return {
         "total_cost": cost,
         "makespan": makespan,
@@ -96,17 +251,159 @@ def objective_function(
         "energy_exceeds": alpha_energy * energy_exceeds_penalty,
     }
 
+def total_cost(cost: Dict[str, float] | float) -> float:
+    """Total cost from either a breakdown dict or a fast-path scalar"""
+    return cost["total_cost"] if isinstance(cost, dict) else cost
+
+
+@profiled("objective.batch")
+def evaluate_batch(
+    schedules: List[Dict[int, List[int]]],
+    instance: ProblemInstance,
+    alpha_precedence: float = 10**6,
+    alpha_load: float = 100.0,
+    alpha_energy: float = 1.0,
+    return_breakdown: bool = False,
+) -> np.ndarray | Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Evaluate a whole population at once, same cost as `objective_function` for every schedule.
+    Milestones (resource, precedences) are simulated per schedule, then makespan, load std_dev and
+    energy are computed over (n_schedules, n_tasks) arrays.
+
+    Return: array of total costs, and if `return_breakdown` a dict of arrays with the same keys as
+    `objective_function`'s breakdown
+    """
+    n_schedules = len(schedules)
+    start_times = np.zeros((n_schedules, instance.n_tasks), dtype=np.float64)
+    complete_times = np.zeros((n_schedules, instance.n_tasks), dtype=np.float64)
+    machines = np.zeros((n_schedules, instance.n_tasks), dtype=np.intp)
+    precedence_penalties = np.zeros(n_schedules, dtype=np.float64)
+
+    if jit_enabled():
+        terms = np.array(
+            [
+                compiled_objective_terms(
+                    schedule=schedule,
+                    instance=instance,
+                    task_milestones=(
+                        apply_resource_constraint(schedule=schedule, instance=instance)
+                        if instance.total_resource is not None
+                        else None
+                    ),
+                )
+                for schedule in schedules
+            ],
+            dtype=np.float64,
+        ).reshape(n_schedules, 4)
+        makespans, precedence_penalties, std_devs, energy_penalties = terms.T
+        return _batch_result(
+            makespans=makespans,
+            precedence_penalties=precedence_penalties,
+            std_devs=std_devs,
+            energy_penalties=energy_penalties,
+            alpha_precedence=alpha_precedence,
+            alpha_load=alpha_load,
+            alpha_energy=alpha_energy,
+            return_breakdown=return_breakdown,
+        )
+
+    for row, schedule in enumerate(schedules):
+        task_milestones = (
+            apply_resource_constraint(schedule=schedule, instance=instance)
+            if instance.total_resource is not None
+            else compute_base_milestones(schedule=schedule, instance=instance)
+        )
+        if instance.precedences is not None:
+            precedence_penalties[row], task_milestones = precedence_constraint(
+                schedule=schedule,
+                task_completion_milestones=task_milestones,
+                instance=instance,
+            )
+        start_times[row] = task_milestones.start_setup
+        complete_times[row] = task_milestones.complete_time
+        machines[row] = task_milestones.machine
+
+    task_ids = np.arange(instance.n_tasks)
+    makespans = complete_times.max(axis=1) if instance.n_tasks > 0 else np.zeros(n_schedules)
+
+    # Machine loads: (n_schedules, n_machines), std_dev across machines
+    n_machines = instance.n_machines
+    machine_loads = np.bincount(
+        (np.arange(n_schedules)[:, None] * n_machines + machines).ravel(),
+        weights=instance.task_loads[task_ids, machines].ravel(),
+        minlength=n_schedules * n_machines,
+    ).reshape(n_schedules, n_machines)
+    std_devs = machine_loads.std(axis=1)
+
+    energy_penalties = np.zeros(n_schedules, dtype=np.float64)
+    if instance.energy_constraint is not None:
+        energy_penalties = energy_exceeds_penalty(
+            start_times=start_times,
+            end_times=complete_times,
+            usages=instance.energy_usages[task_ids, machines],
+            energy_cap=instance.energy_cap,
+        )
+
+    return _batch_result(
+        makespans=makespans,
+        precedence_penalties=precedence_penalties,
+        std_devs=std_devs,
+        energy_penalties=energy_penalties,
+        alpha_precedence=alpha_precedence,
+        alpha_load=alpha_load,
+        alpha_energy=alpha_energy,
+        return_breakdown=return_breakdown,
+    )
+
+
+def _batch_result(
+    makespans: np.ndarray,
+    precedence_penalties: np.ndarray,
+    std_devs: np.ndarray,
+    energy_penalties: np.ndarray,
+    alpha_precedence: float,
+    alpha_load: float,
+    alpha_energy: float,
+    return_breakdown: bool,
+) -> np.ndarray | Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    costs = (
+        makespans
+        + alpha_precedence * precedence_penalties
+        + alpha_load * std_devs
+        + alpha_energy * energy_penalties
+    )
+
+    if not return_breakdown:
+        return costs
+
+    return costs, {
+        "total_cost": costs,
+        "makespan": makespans,
+        "precedence_penalty": alpha_precedence * precedence_penalties,
+        "std_dev": alpha_load * std_devs,
+        "energy_exceeds": alpha_energy * energy_penalties,
+    }
+
+
 def compute_makespan(task_milestones: Dict[int, int]) -> Tuple[int, int]:
+    if isinstance(task_milestones, TaskMilestones):
+        return float(task_milestones.complete_time.max())
+
     makespan = max(task["complete_time"] for task in task_milestones.values())
     return makespan
 
 
+@profiled("objective.base_milestones")
 def compute_base_milestones(
     schedule: Dict[int, List[int]],
-    tasks: Dict[int, Any],
-    setups: Dict[Tuple[int, int], int],
+    tasks: Dict[int, Any] = None,
+    setups: Dict[Tuple[int, int], int] = None,
+    instance: ProblemInstance = None,
 ):
     """Calculate base milestone, without constraint"""
+    if instance is not None:
+        return _compute_base_milestones_array(schedule=schedule, instance=instance)
+
     # Lưu trữ thời gian hoàn thành của mỗi task
     task_milestones: Dict[int, int] = {}
 
@@ -143,38 +440,90 @@ def compute_base_milestones(
     return task_milestones
 
 
+def _compute_base_milestones_array(
+    schedule: Dict[int, List[int]], instance: ProblemInstance
+) -> TaskMilestones:
+    """Vectorised `compute_base_milestones`: one cumulative sum per machine"""
+    task_milestones = TaskMilestones(instance.n_tasks)
+
+    for machine, sequence in schedule.items():
+        if len(sequence) == 0:
+            continue
+        write_machine_milestones(
+            task_milestones=task_milestones,
+            machine=machine,
+            sequence=sequence,
+            instance=instance,
+        )
+
+    return task_milestones
+
+
+def write_machine_milestones(
+    task_milestones: TaskMilestones,
+    machine: int,
+    sequence: List[int],
+    instance: ProblemInstance,
+) -> float:
+    """Write base milestones of one machine's sequence into `task_milestones`. Returns the machine's completion time"""
+    sequence = np.asarray(sequence, dtype=np.intp)
+    process_times = instance.process_times[sequence, machine]
+    setup_times = np.zeros(len(sequence), dtype=np.float64)
+    setup_times[1:] = instance.setup_times[sequence[:-1], sequence[1:]]
+
+    complete_times = np.cumsum(process_times + setup_times)
+
+    task_milestones.complete_time[sequence] = complete_times
+    task_milestones.start_process[sequence] = complete_times - process_times
+    task_milestones.start_setup[sequence] = complete_times - process_times - setup_times
+    task_milestones.machine[sequence] = machine
+    task_milestones.idx_on_machine[sequence] = np.arange(len(sequence))
+
+    return float(complete_times[-1]) if len(sequence) > 0 else 0.0
+
+
+@profiled("objective.precedence")
 def precedence_constraint(
     schedule: Dict[int, List[int]],
     task_completion_milestones: Dict[int, int],
-    setups: Dict[Tuple[int, int], int],
+    setups: Dict[Tuple[int, int], int] = None,
     precedences: Dict[int, Any] = None,
+    instance: ProblemInstance = None,
 ):
-    """Overwrites current milestones with respect to precedences"""
-    # Đầu tiên t sẽ check các máy đang làm những task nào, là cơ sở cho pre vs post để check ràng buộc
-    # t cũng tạo 1 bản chép, và bản chép này là để t ghi lại thời gian thực tế nó làm, nhưng vẫn có bản cũ giữ lại thời gian làm
-    # ví dụ task 1 2s, task 2 3s, thì sau khi xong t vẫn có dữ liệu là task 1 2s, task 2 3s và dữ liệu làm thực tế là task 1 2s task 2 5s.
-    task_to_machine = {task: m for m, seq in schedule.items() for task in seq}
-    actual_completion_times = copy.deepcopy(task_completion_milestones)
+    """Overwrites current milestones with respect to precedences
+
+    Các cặp (pre, post) được xét theo thứ tự topo của đồ thị precedence, nên delay của một task
+    được lan truyền tiếp sang các task phụ thuộc nó. `task_completion_milestones` bị ghi đè trực tiếp.
+    """
+    if instance is not None:
+        return _precedence_constraint_array(
+            schedule=schedule,
+            task_completion_milestones=task_completion_milestones,
+            instance=instance,
+        )
+
+    # Vị trí (máy, index) của từng task trong schedule, tính 1 lần cho mọi cặp precedence
+    task_position = {
+        task: (machine, idx)
+        for machine, seq in schedule.items()
+        for idx, task in enumerate(seq)
+    }
+    actual_completion_times = task_completion_milestones
 
     penalty = 0
 
-    # xong phần chuẩn bị r, h t vô thì t sẽ check precedence
     # t giải quyết 2 vấn đề: nếu task k cs ràng buộc, nếu các task trên cùng máy - khác máy
     # nếu cùng, thì cứ cộng bthg, nhưng nếu trái ràng buộc thì cũng cộng bthg r cộng thêm pen
     # nếu khác, t phải cho nó chờ
-    for pre, posts in precedences.items():
-        for post in posts:
-            if pre not in task_to_machine or post not in task_to_machine:
+    for pre in topological_order(precedences):
+        for post in precedences.get(pre, ()):
+            if pre not in task_position or post not in task_position:
                 continue
 
-            machine_pre = task_to_machine[pre]
-            machine_post = task_to_machine[post]
+            machine_pre, idx_pre = task_position[pre]
+            machine_post, idx_post = task_position[post]
 
             if machine_pre == machine_post:
-                seq = schedule[machine_pre]
-                idx_pre = seq.index(pre)
-                idx_post = seq.index(post)
-
                 if (
                     idx_pre > idx_post
                 ):  # chỉnh lại cách tính pen linh hoạt chứ k cố định
@@ -185,7 +534,6 @@ def precedence_constraint(
                 finish_pre = actual_completion_times[pre]["complete_time"]
 
                 seq_post = schedule[machine_post]
-                idx_post = seq_post.index(post)
 
                 if idx_post == 0:
                     start_post = 0
@@ -208,190 +556,332 @@ def precedence_constraint(
     return penalty, actual_completion_times
 
 
+@profiled("objective.precedence_bound")
+def precedence_violations(
+    schedule: Dict[int, List[int]],
+    precedences: Dict[int, Any] = None,
+    instance: ProblemInstance = None,
+) -> int:
+    """Penalty of precedence pairs ordered backwards on the same machine. Only depends on task positions"""
+    task_position = {
+        task: (machine, idx)
+        for machine, seq in schedule.items()
+        for idx, task in enumerate(seq)
+    }
+    edges = (
+        instance.precedence_edges
+        if instance is not None
+        else ((pre, post) for pre, posts in precedences.items() for post in posts)
+    )
+
+    penalty = 0
+    for pre, post in edges:
+        if pre not in task_position or post not in task_position:
+            continue
+        machine_pre, idx_pre = task_position[pre]
+        machine_post, idx_post = task_position[post]
+        if machine_pre == machine_post and idx_pre > idx_post:
+            penalty += idx_pre - idx_post
+
+    return penalty
+
+
+def _precedence_constraint_array(
+    schedule: Dict[int, List[int]],
+    task_completion_milestones: TaskMilestones,
+    instance: ProblemInstance,
+) -> Tuple[int, TaskMilestones]:
+    """`precedence_constraint` over array-backed milestones, using the instance's compiled precedence graph"""
+    complete_times = task_completion_milestones.complete_time
+    # Chỉ số (máy, index) của task đã có sẵn trong milestones
+    machines = task_completion_milestones.machine.tolist()
+    positions = task_completion_milestones.idx_on_machine.tolist()
+
+    penalty = 0
+    for pre, post in instance.precedence_edges:
+        machine_pre = machines[pre]
+        machine_post = machines[post]
+
+        if machine_pre == machine_post:
+            if positions[pre] > positions[post]:
+                penalty += positions[pre] - positions[post]
+            continue
+
+        finish_pre = complete_times[pre]
+        idx_post = positions[post]
+        seq_post = schedule[machine_post]
+
+        if idx_post == 0:
+            start_post = 0
+        else:
+            prev_task = seq_post[idx_post - 1]
+            start_post = complete_times[prev_task] + instance.setup_times[prev_task, post]
+
+        if start_post < finish_pre:
+            delay = finish_pre - start_post
+            delayed_tasks = np.asarray(seq_post[idx_post:], dtype=np.intp)
+            task_completion_milestones.start_setup[delayed_tasks] += delay
+            task_completion_milestones.start_process[delayed_tasks] += delay
+            complete_times[delayed_tasks] += delay
+
+    return penalty, task_completion_milestones
+
+
+@profiled("objective.energy")
 def energy_consumption_over_time(
     task_milestones: Dict[int, Dict[str, Any]],
-    energy_constraint: Dict[str, Any],
-) -> int:
+    energy_constraint: Dict[str, Any] = None,
+    instance: ProblemInstance = None,
+) -> float:
     """Calculate total penalty per energy exceeded in accounts of all machine during processing"""
+    if instance is not None:
+        usages = instance.energy_usages[
+            np.arange(len(task_milestones.machine)), task_milestones.machine
+        ]
+        return float(
+            energy_exceeds_penalty(
+                start_times=task_milestones.start_setup,
+                end_times=task_milestones.complete_time,
+                usages=usages,
+                energy_cap=instance.energy_cap,
+            )
+        )
 
     energy_cap: int = energy_constraint["energy_cap"]
     energy_usages: Dict[int, List[int]] = energy_constraint["energy_usages"]
 
-    # Events log of  time: consume energy / release
-    events_log: Dict[int, int] = defaultdict(int)
+    # Each task consumes its energy usage from start_setup until complete_time
+    start_times = np.fromiter(
+        (properties["start_setup"] for properties in task_milestones.values()),
+        dtype=np.float64,
+        count=len(task_milestones),
+    )
+    end_times = np.fromiter(
+        (properties["complete_time"] for properties in task_milestones.values()),
+        dtype=np.float64,
+        count=len(task_milestones),
+    )
+    usages = np.fromiter(
+        (
+            energy_usages[task][properties["machine"]]
+            for task, properties in task_milestones.items()
+        ),
+        dtype=np.float64,
+        count=len(task_milestones),
+    )
+
+    return float(
+        energy_exceeds_penalty(
+            start_times=start_times,
+            end_times=end_times,
+            usages=usages,
+            energy_cap=energy_cap,
+        )
+    )
 
-    # Populate events lists
-    for task, properties in task_milestones.items():
-        # Get task's energy usage
-        machine: int = properties["machine"]
-        usage: int = energy_usages[task][machine]
 
-        # Add events
-        events_log[properties["start_setup"]] += usage
-        events_log[properties["complete_time"]] -= usage
+def energy_exceeds_penalty(
+    start_times: np.ndarray,
+    end_times: np.ndarray,
+    usages: np.ndarray,
+    energy_cap: float,
+) -> float | np.ndarray:
+    """
+    Vectorised sweep line over energy events. Penalty = sum over time of (usage - cap) * duration while usage > cap
 
-    exceeds_penalty: int = total_penalty_on_violation(
-        events_log=events_log, energy_cap=energy_cap
-    )
+    Arrays are (n_tasks,) for one schedule, or (n_schedules, n_tasks) for a batch, in which case an
+    array of n_schedules penalties is returned.
+    Events sharing the same time are consecutive after sorting, the gaps between them have zero duration
+    so only the usage level after the last of them is ever penalised.
+    """
+    start_times = np.asarray(start_times, dtype=np.float64)
+    batched = start_times.ndim == 2
+    start_times = np.atleast_2d(start_times)
+    end_times = np.atleast_2d(np.asarray(end_times, dtype=np.float64))
+    usages = np.atleast_2d(np.asarray(usages, dtype=np.float64))
 
-    return exceeds_penalty
+    if start_times.shape[1] == 0:
+        penalties = np.zeros(start_times.shape[0], dtype=np.float64)
+        return penalties if batched else float(penalties[0])
 
+    # Events: +usage at start, -usage at end, sorted by time along each schedule
+    event_times = np.concatenate([start_times, end_times], axis=1)
+    event_usages = np.concatenate([usages, -usages], axis=1)
+    order = np.argsort(event_times, axis=1, kind="stable")
+    event_times = np.take_along_axis(event_times, order, axis=1)
+    event_usages = np.take_along_axis(event_usages, order, axis=1)
 
-def total_penalty_on_violation(events_log: Dict[int, int], energy_cap: int) -> int:
+    # Usage level between consecutive events
+    levels = np.cumsum(event_usages, axis=1)[:, :-1]
+    durations = np.diff(event_times, axis=1)
+    penalties = (np.maximum(levels - energy_cap, 0.0) * durations).sum(axis=1)
+
+    return penalties if batched else float(penalties[0])
+
+
+def total_penalty_on_violation(events_log: Dict[int, int], energy_cap: int) -> float:
     """Penalize exceeded usages"""
-    # List of events start time
-    sorted_event_start_times: list[int] = sorted(events_log.keys())
-    current_usages: int = 0
-    exceeds_penalty: int = 0
-
-    for idx in range(len(sorted_event_start_times)):
-        start_time: int = sorted_event_start_times[idx]
-        end_time: int = (
-            sorted_event_start_times[idx + 1]
-            if idx + 1 < len(sorted_event_start_times)
-            else start_time
-        )
-        current_usages += events_log[start_time]
+    if len(events_log) == 0:
+        return 0.0
 
-        # Penalize per unit exceeds * duration
-        if current_usages > energy_cap:
-            duration: int = end_time - start_time
-            penalty_per_unit_time: int = current_usages - energy_cap
-            exceeds_penalty += penalty_per_unit_time * duration
+    # Events sorted by time, usage level holds until the next event
+    event_times = np.fromiter(events_log.keys(), dtype=np.float64, count=len(events_log))
+    event_usages = np.fromiter(
+        events_log.values(), dtype=np.float64, count=len(events_log)
+    )
+    order = np.argsort(event_times)
+    levels = np.cumsum(event_usages[order])[:-1]
+    durations = np.diff(event_times[order])
 
-    return exceeds_penalty
+    return float((np.maximum(levels - energy_cap, 0.0) * durations).sum())
 
 
+@profiled("objective.resource")
 def apply_resource_constraint(
     schedule: Dict[int, List[int]],
-    tasks: Dict[int, Any],
-    setups: Dict[Tuple[int, int], int],
-    total_resource: int,
+    tasks: Dict[int, Any] = None,
+    setups: Dict[Tuple[int, int], int] = None,
+    total_resource: int = None,
+    instance: ProblemInstance = None,
 ) -> Dict[int, Dict[str, Any]]:
-    """Calculate True completion time with respect to resource distribution. Generate milestones on executtion"""
+    """Calculate True completion time with respect to resource distribution. Generate milestones on executtion
+
+    Discrete-event simulation: heap các sự kiện hoàn thành (end, máy, resource) và danh sách các máy đang rảnh
+    (còn task, chưa được cấp resource). Tại mỗi mốc thời gian, các máy rảnh được xét theo thứ tự của schedule
+    và được cấp resource tham lam như cũ, sau đó nhảy tới sự kiện hoàn thành sớm nhất.
+    """
+    if instance is not None and total_resource is None:
+        total_resource = instance.total_resource
+
+    scheduled = [(machine, sequence) for machine, sequence in schedule.items() if len(sequence) > 0]
+    machines = [machine for machine, _ in scheduled]
+    sequences = [sequence for _, sequence in scheduled]
+
+    # Thông tin từng task trên mỗi máy: process time, setup time (từ task trước), resource
+    process_times: List[List[float]] = []
+    setup_times: List[List[float]] = []
+    resources: List[List[float]] = []
+    for machine, sequence in zip(machines, sequences):
+        if instance is not None:
+            sequence = np.asarray(sequence, dtype=np.intp)
+            process_times.append(instance.process_times[sequence, machine].tolist())
+            setup_times.append(
+                [0.0] + instance.setup_times[sequence[:-1], sequence[1:]].tolist()
+            )
+            resources.append(instance.resources[sequence].tolist())
+        else:
+            process_times.append(
+                [tasks[task]["process_times"][machine] for task in sequence]
+            )
+            setup_times.append(
+                [0]
+                + [
+                    setups.get((sequence[idx - 1], sequence[idx]), 0)
+                    for idx in range(1, len(sequence))
+                ]
+            )
+            resources.append([tasks[task]["resource"] for task in sequence])
 
     pool_resource = total_resource  # lượng resource hiện có = tổng resource
-    # Danh sách các task đang chạy sau khi cấp resource
-    running_tasks: List[Dict[str, Any]] = []
     current_time = 0  # Thời gian hiện tại
-    # theo dõi task của mỗi máy
-    current_task_index = {m: 0 for m in schedule.keys()}
-    # lịch trả về
-    final_schedule: Dict[int, List[Dict[str, Any]]] = {m: [] for m in schedule.keys()}
-    current_machine_time = {m: 0 for m in schedule.keys()}  # thời gian rảnh
-
-    total_tasks = sum(len(schedule[m]) for m in schedule)  # đếm tổng số task
-    completed_tasks = 0  # dùng để dừng vòng lặp
-
-    # lặp đến khi hoàn thành tất cả task
-    while completed_tasks < total_tasks:
-        # tìm task đã hoàn thành (current time > end thì task đã xong)
-        finished_tasks = [t for t in running_tasks if t["end"] <= current_time]
-        for t in finished_tasks:
-            pool_resource += t["resource"]  # trả lại resource
-            running_tasks.remove(t)  # xóa task đã xong khỏi danh sách đang chạy
-            completed_tasks += 1  # tăng task đã hoàn thành lên 1
-            current_machine_time[t["machine"]] = t["end"]  # cập nhật thời gian
-
-        # tìm task tiếp theo trên máy có thể chạy
-        ready_tasks = []
-        for m in schedule.keys():
-            idx = current_task_index[m]  # lấy index task hiện tại trên máy m
-            if idx >= len(schedule[m]):  # nếu hết task trên máy thì bỏ qua
+    next_task_index = [0] * len(machines)  # index task tiếp theo của mỗi máy
+    start_times: List[List[float]] = [[] for _ in machines]  # thời điểm bắt đầu setup
+
+    # Heap sự kiện hoàn thành: (end, vị trí máy, resource trả lại)
+    completion_events: List[Tuple[float, int, float]] = []
+    # Các máy rảnh còn task, giữ theo thứ tự máy trong schedule
+    idle_machines: List[int] = list(range(len(machines)))
+
+    while True:
+        # Cấp resource cho các máy rảnh theo thứ tự
+        waiting_machines: List[int] = []
+        for pos in idle_machines:
+            idx = next_task_index[pos]
+            needed_resource = resources[pos][idx]
+            if needed_resource > pool_resource:
+                waiting_machines.append(pos)
                 continue
 
-            # kiểm tra máy m có đang chạy task không
-            if any(rt["machine"] == m for rt in running_tasks):
-                # nếu đang chạy thì bỏ qua
-                continue
-
-            # kiểm tra máy có đang rảnh không
-            if current_machine_time[m] > current_time:
-                continue
+            pool_resource -= needed_resource
+            start_times[pos].append(current_time)
+            task_end = current_time + setup_times[pos][idx] + process_times[pos][idx]
+            next_task_index[pos] += 1
+            heapq.heappush(completion_events, (task_end, pos, needed_resource))
+        idle_machines = waiting_machines
+
+        if not completion_events:
+            if idle_machines:
+                # Không task nào đang chạy mà vẫn không đủ resource: không bao giờ chạy được
+                raise ValueError(
+                    "A task requires more resource than total_resource "
+                    f"({total_resource}), schedule can never complete"
+                )
+            break
+
+        # Nhảy đến thời điểm task sớm nhất kết thúc, trả resource của mọi task kết thúc tại đó
+        current_time = completion_events[0][0]
+        while completion_events and completion_events[0][0] <= current_time:
+            _, pos, released_resource = heapq.heappop(completion_events)
+            pool_resource += released_resource
+            if next_task_index[pos] < len(sequences[pos]):
+                bisect.insort(idle_machines, pos)
+
+    if instance is not None:
+        task_milestones = TaskMilestones(instance.n_tasks)
+        for machine, sequence, starts, setups_, procs in zip(
+            machines, sequences, start_times, setup_times, process_times
+        ):
+            sequence = np.asarray(sequence, dtype=np.intp)
+            start_setup = np.asarray(starts, dtype=np.float64)
+            start_process = start_setup + setups_
+            task_milestones.start_setup[sequence] = start_setup
+            task_milestones.start_process[sequence] = start_process
+            task_milestones.complete_time[sequence] = start_process + procs
+            task_milestones.machine[sequence] = machine
+            task_milestones.idx_on_machine[sequence] = np.arange(len(sequence))
+        return task_milestones
 
-            # lấy thông tin
-            task_id = schedule[m][idx]
-            needed_resource = tasks[task_id]["resource"]
-            proc_time = tasks[task_id]["process_times"][m]
-
-            # tính setup time chuyển đổi từ task trước đó sang task hiện tại
-            setup_time = 0
-            if idx > 0:
-                prev_task = schedule[m][idx - 1]
-                setup_time = setups.get((prev_task, task_id), 0)
-            # thêm task vào danh sách task sẵn sàng
-            ready_tasks.append(
-                {
-                    "machine": m,
-                    "task_id": task_id,
-                    "resource": needed_resource,
-                    "proc_time": proc_time,
-                    "setup_time": setup_time,
-                    "index": idx,
-                }
-            )
-        # biến kiểm tra có task nào được lên lịch trong lần lặp này không
-        scheduled_any = False
-        for task in ready_tasks:  # duyệt qua các task sẵn sàng
-            if task["resource"] <= pool_resource:  # nếu đủ resource để chạy task
-                pool_resource -= task["resource"]  # trừ resource của pool
-                m = task["machine"]  # lấy số máy
-                # tính thời gian bắt đầu và kết thúc
-
-                task_start = max(current_machine_time[m], current_time)
-                setup_start = task_start
-                process_start = task_start + task["setup_time"]
-                task_end = process_start + task["proc_time"]
-
-                final_schedule[task["task_id"]] = {
-                    "start_setup": setup_start,
-                    "start_process": process_start,
-                    "complete_time": task_end,
-                    "machine": m,
-                    "index_on_machine": task["index"],
-                }
-
-                task_info = {  # chưa thông tin task sau khi schedule
-                    "task_id": task["task_id"],
-                    "machine": m,
-                    "end": task_end,
-                    "resource": task["resource"],
-                }
-
-                running_tasks.append(task_info)  # thêm task vào danh sách đang chạy
-                current_task_index[m] += 1  # cập nhật index task trên máy
-                scheduled_any = True  # đánh dấu có task được lên lịch
-
-        # nếu có task đang chạy
-        if running_tasks:
-            # nhảy đến thời điểm task sớm nhất kết thúc
-            current_time = min(t["end"] for t in running_tasks)
-        # nếu không có task đang chạy và không có task nào được lên lịch
-        elif not scheduled_any:
-            next_times = [
-                current_machine_time[m]
-                for m in schedule.keys()  # lấy danh sách thời gian rảnh cua các máy còn task chưa schedule
-                if current_task_index[m] < len(schedule[m])
-            ]
-            if next_times:
-                current_time = min(next_times)  # nhảy đến thời gian rảnh sớm nhất
-            else:
-                break  # Không còn task nào thì đã hoàn thành hết task, thoát vòng lặp
+    # lịch trả về
+    final_schedule: Dict[int, Dict[str, Any]] = {}
+    for machine, sequence, starts, setups_, procs in zip(
+        machines, sequences, start_times, setup_times, process_times
+    ):
+        for idx, task in enumerate(sequence):
+            process_start = starts[idx] + setups_[idx]
+            final_schedule[task] = {
+                "start_setup": starts[idx],
+                "start_process": process_start,
+                "complete_time": process_start + procs[idx],
+                "machine": machine,
+                "index_on_machine": idx,
+            }
 
     return final_schedule
 
-def calculate_machine_loads(schedule, n_machines, tasks):
+
+def calculate_machine_loads(schedule, n_machines, tasks, instance=None):
     """
     Tính tổng load (weighted duration) của mỗi machine
 
     schedule: dict {machine_id: [task_ids]}
     n_machines: số máy
     tasks: dict {task_id: {process_times, resource, weight}}
+    instance: ProblemInstance, nếu có thì dùng mảng process_times * weights
 
     Return list: tổng load của mỗi máy
     """
     machine_loads = [0.0] * n_machines
 
+    if instance is not None:
+        for machine_id, task_list in schedule.items():
+            if len(task_list) == 0:
+                continue
+            task_list = np.asarray(task_list, dtype=np.intp)
+            machine_loads[machine_id] = float(
+                instance.task_loads[task_list, machine_id].sum()
+            )
+        return machine_loads
+
     for machine_id, task_list in schedule.items():
         for task_id in task_list:
             task = tasks[task_id]
@@ -401,7 +891,8 @@ def calculate_machine_loads(schedule, n_machines, tasks):
             machine_loads[machine_id] += process_time * weight
     return machine_loads
     
-def calculate_load_standard_deviation(schedule, n_machines, tasks):
+@profiled("objective.std_dev")
+def calculate_load_standard_deviation(schedule, n_machines, tasks, instance=None):
     """
     Tính std_dev của load các máy
 
@@ -411,5 +902,5 @@ def calculate_load_standard_deviation(schedule, n_machines, tasks):
 
     Return float: std_dev của load
     """
-    loads = calculate_machine_loads(schedule, n_machines, tasks)
+    loads = calculate_machine_loads(schedule, n_machines, tasks, instance=instance)
     return float(np.std(loads))
\ No newline at end of file
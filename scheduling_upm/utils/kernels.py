@@ -0,0 +1,284 @@
+"""
+Optional numba-compiled evaluation kernels over an array-backed `ProblemInstance`.
+
+Covers the hot core of `objective_function`: base milestones, precedence delay propagation, the energy
+sweep and the load std_dev. Selected automatically when numba is importable (`pip install numba`),
+otherwise `objective_function` keeps its NumPy / Python path. `set_jit_enabled` switches between both
+at runtime, e.g. to compare their results.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .entities import ProblemInstance, FlatSchedule
+from .profiling import profiled
+
+try:
+    from numba import njit
+
+    HAS_NUMBA = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in so the kernels below stay importable as plain Python"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
+
+
+_jit_enabled = HAS_NUMBA
+
+
+def jit_enabled() -> bool:
+    return _jit_enabled
+
+
+def set_jit_enabled(enabled: bool):
+    """Use (or stop using) the compiled kernels. Ignored when numba is not installed"""
+    global _jit_enabled
+    _jit_enabled = bool(enabled) and HAS_NUMBA
+
+
+def flatten_schedule(
+    schedule: Dict[int, List[int]], n_machines: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Flat task array + machine offsets: tasks of machine m are flat_tasks[offsets[m]:offsets[m + 1]]"""
+    if isinstance(schedule, FlatSchedule) and schedule.n_machines == n_machines:
+        # Already flat, single buffer copies
+        return (
+            np.frombuffer(schedule.tasks, dtype=np.int64).astype(np.intp),
+            np.frombuffer(schedule.offsets, dtype=np.int64).astype(np.intp),
+        )
+
+    offsets = np.zeros(n_machines + 1, dtype=np.intp)
+    for machine in range(n_machines):
+        offsets[machine + 1] = offsets[machine] + len(schedule.get(machine, ()))
+
+    flat_tasks = np.fromiter(
+        (task for machine in range(n_machines) for task in schedule.get(machine, ())),
+        dtype=np.intp,
+        count=int(offsets[-1]),
+    )
+    return flat_tasks, offsets
+
+
+@profiled("objective.jit")
+def compiled_objective_terms(
+    schedule: Dict[int, List[int]],
+    instance: ProblemInstance,
+    task_milestones=None,
+) -> Tuple[float, int, float, float]:
+    """
+    Raw (makespan, precedence_penalty, std_dev, energy_exceeds_penalty) of a schedule.
+    `task_milestones`: precomputed milestones (e.g. from the resource simulation), copied before delays
+    are applied. Without it, base milestones are computed by the kernel.
+    """
+    flat_tasks, offsets = flatten_schedule(schedule, instance.n_machines)
+    n_tasks = instance.n_tasks
+
+    if task_milestones is None:
+        start_setup = np.zeros(n_tasks, dtype=np.float64)
+        start_process = np.zeros(n_tasks, dtype=np.float64)
+        complete_time = np.zeros(n_tasks, dtype=np.float64)
+        machine_of = np.zeros(n_tasks, dtype=np.intp)
+        position_of = np.zeros(n_tasks, dtype=np.intp)
+        _base_milestones_kernel(
+            flat_tasks,
+            offsets,
+            instance.process_times,
+            instance.setup_times,
+            start_setup,
+            start_process,
+            complete_time,
+            machine_of,
+            position_of,
+        )
+    else:
+        start_setup = task_milestones.start_setup.copy()
+        start_process = task_milestones.start_process.copy()
+        complete_time = task_milestones.complete_time.copy()
+        machine_of = task_milestones.machine
+        position_of = task_milestones.idx_on_machine
+
+    has_energy = instance.energy_constraint is not None
+    return _objective_terms_kernel(
+        flat_tasks,
+        offsets,
+        instance.setup_times,
+        instance.task_loads,
+        instance.precedence_order,
+        instance.precedence_indptr,
+        instance.precedence_indices,
+        instance.energy_usages if has_energy else np.zeros((0, 0), dtype=np.float64),
+        instance.energy_cap if has_energy else 0.0,
+        has_energy,
+        start_setup,
+        start_process,
+        complete_time,
+        machine_of,
+        position_of,
+    )
+
+
+@njit(cache=True)
+def _base_milestones_kernel(
+    flat_tasks,
+    offsets,
+    process_times,
+    setup_times,
+    start_setup,
+    start_process,
+    complete_time,
+    machine_of,
+    position_of,
+):
+    n_machines = len(offsets) - 1
+    for machine in range(n_machines):
+        current_time = 0.0
+        for k in range(offsets[machine], offsets[machine + 1]):
+            task = flat_tasks[k]
+            setup_time = 0.0
+            if k > offsets[machine]:
+                setup_time = setup_times[flat_tasks[k - 1], task]
+
+            start_setup[task] = current_time
+            start_process[task] = current_time + setup_time
+            current_time = current_time + setup_time + process_times[task, machine]
+            complete_time[task] = current_time
+            machine_of[task] = machine
+            position_of[task] = k - offsets[machine]
+
+
+@njit(cache=True)
+def _precedence_kernel(
+    flat_tasks,
+    offsets,
+    setup_times,
+    precedence_order,
+    precedence_indptr,
+    precedence_indices,
+    start_setup,
+    start_process,
+    complete_time,
+    machine_of,
+    position_of,
+):
+    """Same rules as `precedence_constraint`, edges visited by predecessor in topological order"""
+    penalty = 0
+    for pre in precedence_order:
+        for e in range(precedence_indptr[pre], precedence_indptr[pre + 1]):
+            post = precedence_indices[e]
+            machine_pre = machine_of[pre]
+            machine_post = machine_of[post]
+
+            if machine_pre == machine_post:
+                if position_of[pre] > position_of[post]:
+                    penalty += position_of[pre] - position_of[post]
+                continue
+
+            finish_pre = complete_time[pre]
+            k_post = offsets[machine_post] + position_of[post]
+            start_post = 0.0
+            if position_of[post] > 0:
+                prev_task = flat_tasks[k_post - 1]
+                start_post = complete_time[prev_task] + setup_times[prev_task, post]
+
+            if start_post < finish_pre:
+                delay = finish_pre - start_post
+                for k in range(k_post, offsets[machine_post + 1]):
+                    task = flat_tasks[k]
+                    start_setup[task] += delay
+                    start_process[task] += delay
+                    complete_time[task] += delay
+
+    return penalty
+
+
+@njit(cache=True)
+def _energy_kernel(flat_tasks, machine_of, energy_usages, energy_cap, start_setup, complete_time):
+    """Sweep line over +usage / -usage events, same result as `energy_exceeds_penalty`"""
+    n_events = 2 * len(flat_tasks)
+    if n_events == 0:
+        return 0.0
+
+    event_times = np.empty(n_events, dtype=np.float64)
+    event_usages = np.empty(n_events, dtype=np.float64)
+    for k in range(len(flat_tasks)):
+        task = flat_tasks[k]
+        usage = energy_usages[task, machine_of[task]]
+        event_times[2 * k] = start_setup[task]
+        event_usages[2 * k] = usage
+        event_times[2 * k + 1] = complete_time[task]
+        event_usages[2 * k + 1] = -usage
+
+    order = np.argsort(event_times)
+    penalty = 0.0
+    level = 0.0
+    for i in range(n_events - 1):
+        level += event_usages[order[i]]
+        if level > energy_cap:
+            penalty += (level - energy_cap) * (
+                event_times[order[i + 1]] - event_times[order[i]]
+            )
+    return penalty
+
+
+@njit(cache=True)
+def _load_std_kernel(flat_tasks, offsets, task_loads):
+    n_machines = len(offsets) - 1
+    if n_machines == 0:
+        return 0.0
+
+    loads = np.zeros(n_machines, dtype=np.float64)
+    for machine in range(n_machines):
+        for k in range(offsets[machine], offsets[machine + 1]):
+            loads[machine] += task_loads[flat_tasks[k], machine]
+    return np.std(loads)
+
+
+@njit(cache=True)
+def _objective_terms_kernel(
+    flat_tasks,
+    offsets,
+    setup_times,
+    task_loads,
+    precedence_order,
+    precedence_indptr,
+    precedence_indices,
+    energy_usages,
+    energy_cap,
+    has_energy,
+    start_setup,
+    start_process,
+    complete_time,
+    machine_of,
+    position_of,
+):
+    precedence_penalty = _precedence_kernel(
+        flat_tasks,
+        offsets,
+        setup_times,
+        precedence_order,
+        precedence_indptr,
+        precedence_indices,
+        start_setup,
+        start_process,
+        complete_time,
+        machine_of,
+        position_of,
+    )
+
+    makespan = 0.0
+    for k in range(len(flat_tasks)):
+        makespan = max(makespan, complete_time[flat_tasks[k]])
+
+    energy_penalty = 0.0
+    if has_energy:
+        energy_penalty = _energy_kernel(
+            flat_tasks, machine_of, energy_usages, energy_cap, start_setup, complete_time
+        )
+
+    std_dev = _load_std_kernel(flat_tasks, offsets, task_loads)
+    return makespan, precedence_penalty, std_dev, energy_penalty
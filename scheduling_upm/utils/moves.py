@@ -0,0 +1,211 @@
+from collections import ChainMap
+from typing import NamedTuple, Dict, List, Tuple, Union
+
+import numpy as np
+
+
+class Swap(NamedTuple):
+    """Swap task at `idx_a` on `machine_a` with task at `idx_b` on `machine_b`. Both machines can be the same"""
+
+    machine_a: int
+    idx_a: int
+    machine_b: int
+    idx_b: int
+
+    def sequences(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """New sequences of the affected machines, `schedule` is left untouched"""
+        seq_a = list(schedule[self.machine_a])
+        seq_b = seq_a if self.machine_a == self.machine_b else list(schedule[self.machine_b])
+        seq_a[self.idx_a], seq_b[self.idx_b] = seq_b[self.idx_b], seq_a[self.idx_a]
+        return {self.machine_a: seq_a, self.machine_b: seq_b}
+
+    def apply(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """Applies the move in place, returns `schedule`"""
+        seq_a = schedule[self.machine_a]
+        seq_b = schedule[self.machine_b]
+        seq_a[self.idx_a], seq_b[self.idx_b] = seq_b[self.idx_b], seq_a[self.idx_a]
+        return schedule
+
+    def undo(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """Reverts `apply` in place, returns `schedule`"""
+        return self.apply(schedule)
+
+    def load_deltas(
+        self, schedule: Dict[int, List[int]], task_loads: np.ndarray
+    ) -> Dict[int, float]:
+        """Change of each affected machine's load, `task_loads` is (n_tasks, n_machines)"""
+        if self.machine_a == self.machine_b:
+            return {}
+        task_a = schedule[self.machine_a][self.idx_a]
+        task_b = schedule[self.machine_b][self.idx_b]
+        return {
+            self.machine_a: task_loads[task_b, self.machine_a]
+            - task_loads[task_a, self.machine_a],
+            self.machine_b: task_loads[task_a, self.machine_b]
+            - task_loads[task_b, self.machine_b],
+        }
+
+
+class Relocate(NamedTuple):
+    """Pop task at `idx_from` on `machine_from`, then insert it at `idx_to` on `machine_to`"""
+
+    machine_from: int
+    idx_from: int
+    machine_to: int
+    idx_to: int
+
+    def sequences(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """New sequences of the affected machines, `schedule` is left untouched"""
+        seq_from = list(schedule[self.machine_from])
+        seq_to = (
+            seq_from
+            if self.machine_from == self.machine_to
+            else list(schedule[self.machine_to])
+        )
+        seq_to.insert(self.idx_to, seq_from.pop(self.idx_from))
+        return {self.machine_from: seq_from, self.machine_to: seq_to}
+
+    def apply(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """Applies the move in place, returns `schedule`"""
+        task = schedule[self.machine_from].pop(self.idx_from)
+        schedule[self.machine_to].insert(self.idx_to, task)
+        return schedule
+
+    def undo(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """Reverts `apply` in place, returns `schedule`"""
+        task = schedule[self.machine_to].pop(self.idx_to)
+        schedule[self.machine_from].insert(self.idx_from, task)
+        return schedule
+
+    def load_deltas(
+        self, schedule: Dict[int, List[int]], task_loads: np.ndarray
+    ) -> Dict[int, float]:
+        """Change of each affected machine's load, `task_loads` is (n_tasks, n_machines)"""
+        if self.machine_from == self.machine_to:
+            return {}
+        task = schedule[self.machine_from][self.idx_from]
+        return {
+            self.machine_from: -task_loads[task, self.machine_from],
+            self.machine_to: task_loads[task, self.machine_to],
+        }
+
+
+class BlockRelocate(NamedTuple):
+    """Move block [`start`, `end`) of `machine_from` to `idx_to` on another machine `machine_to`"""
+
+    machine_from: int
+    start: int
+    end: int
+    machine_to: int
+    idx_to: int
+
+    def sequences(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """New sequences of the affected machines, `schedule` is left untouched"""
+        seq_from = schedule[self.machine_from]
+        seq_to = schedule[self.machine_to]
+        block = seq_from[self.start : self.end]
+        return {
+            self.machine_from: seq_from[: self.start] + seq_from[self.end :],
+            self.machine_to: seq_to[: self.idx_to] + block + seq_to[self.idx_to :],
+        }
+
+    def apply(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """Applies the move in place, returns `schedule`"""
+        for machine, sequence in self.sequences(schedule).items():
+            schedule[machine] = sequence
+        return schedule
+
+    def undo(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """Reverts `apply` in place, returns `schedule`"""
+        seq_from = schedule[self.machine_from]
+        seq_to = schedule[self.machine_to]
+        block_end = self.idx_to + self.end - self.start
+        block = seq_to[self.idx_to : block_end]
+        schedule[self.machine_to] = seq_to[: self.idx_to] + seq_to[block_end:]
+        schedule[self.machine_from] = (
+            seq_from[: self.start] + block + seq_from[self.start :]
+        )
+        return schedule
+
+    def load_deltas(
+        self, schedule: Dict[int, List[int]], task_loads: np.ndarray
+    ) -> Dict[int, float]:
+        """Change of each affected machine's load, `task_loads` is (n_tasks, n_machines)"""
+        block = schedule[self.machine_from][self.start : self.end]
+        return {
+            self.machine_from: -task_loads[block, self.machine_from].sum(),
+            self.machine_to: task_loads[block, self.machine_to].sum(),
+        }
+
+
+class Rewrite(NamedTuple):
+    """Replace the whole sequence of `machine`, e.g. after a shuffle. Keeps the old sequence for undo"""
+
+    machine: int
+    before: Tuple[int, ...]
+    after: Tuple[int, ...]
+
+    def sequences(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """New sequences of the affected machines, `schedule` is left untouched"""
+        return {self.machine: list(self.after)}
+
+    def load_deltas(
+        self, schedule: Dict[int, List[int]], task_loads: np.ndarray
+    ) -> Dict[int, float]:
+        """Change of each affected machine's load, `task_loads` is (n_tasks, n_machines)"""
+        return {
+            self.machine: task_loads[list(self.after), self.machine].sum()
+            - task_loads[list(self.before), self.machine].sum()
+        }
+
+    def apply(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """Applies the move in place, returns `schedule`"""
+        schedule[self.machine] = list(self.after)
+        return schedule
+
+    def undo(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """Reverts `apply` in place, returns `schedule`"""
+        schedule[self.machine] = list(self.before)
+        return schedule
+
+
+class CompoundMove(NamedTuple):
+    """Moves applied one after another, each one's indices refer to the schedule left by the previous ones"""
+
+    moves: Tuple["Move", ...] = ()
+
+    def sequences(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """New sequences of the affected machines, `schedule` is left untouched"""
+        changed: Dict[int, List[int]] = {}
+        view = ChainMap(changed, schedule)
+        for move in self.moves:
+            changed.update(move.sequences(view))
+        return changed
+
+    def load_deltas(
+        self, schedule: Dict[int, List[int]], task_loads: np.ndarray
+    ) -> Dict[int, float]:
+        """Change of each affected machine's load, `task_loads` is (n_tasks, n_machines)"""
+        changed: Dict[int, List[int]] = {}
+        view = ChainMap(changed, schedule)
+        deltas: Dict[int, float] = {}
+        for move in self.moves:
+            for machine, delta in move.load_deltas(view, task_loads).items():
+                deltas[machine] = deltas.get(machine, 0.0) + delta
+            changed.update(move.sequences(view))
+        return deltas
+
+    def apply(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """Applies the move in place, returns `schedule`"""
+        for move in self.moves:
+            move.apply(schedule)
+        return schedule
+
+    def undo(self, schedule: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        """Reverts `apply` in place, returns `schedule`"""
+        for move in reversed(self.moves):
+            move.undo(schedule)
+        return schedule
+
+
+Move = Union[Swap, Relocate, BlockRelocate, Rewrite, CompoundMove]
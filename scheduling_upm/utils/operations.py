@@ -1,13 +1,24 @@
 import random
 import copy
+from itertools import chain
 from typing import List, Dict, Any, Tuple, Set
-from .evaluation import compute_base_milestones
 
+import numpy as np
 
-def random_move(
+from .entities import ProblemInstance
+from .evaluation import compute_base_milestones, total_cost
+from .moves import Move, Swap, Relocate, BlockRelocate, Rewrite, CompoundMove
+from .profiling import profiled
+
+# `propose_*` functions draw a move for the current schedule without modifying it. The move can be
+# applied in place and undone exactly (see `utils/moves.py`). The plain operators apply their move.
+
+
+@profiled("operator.propose_random_move")
+def propose_random_move(
     schedule: Dict[int, List[Any]],
     specified_task: Dict[str, int] = None,
-) -> Dict[int, List[Any]]:
+) -> Relocate:
     """
     All. Move a task from one machine to another. Dynamically receive a specific task to be moved.
     Specified task must cover "running-machine" and "index on that machine"
@@ -26,56 +37,57 @@ def random_move(
 
         job_idx = random.randrange(len(schedule[current_machine]))
 
-    # Get task
-    task = schedule[current_machine].pop(job_idx)
-    pos = random.randrange(max(1, len(schedule[new_machine])))
-    schedule[new_machine].insert(pos, task)
+    # Position on the new machine, once the task has left its current machine
+    n_positions = len(schedule[new_machine]) - (new_machine == current_machine)
+    pos = random.randrange(max(1, n_positions))
 
-    return schedule
+    return Relocate(current_machine, job_idx, new_machine, pos)
 
 
-def block_move(schedule: Dict[int, Any]) -> Dict[int, List[Any]]:
-    """Explore. Move a block of tasks from one machine to another"""
-    new_schedule = copy.deepcopy(schedule)
+def random_move(
+    schedule: Dict[int, List[Any]],
+    specified_task: Dict[str, int] = None,
+) -> Dict[int, List[Any]]:
+    """All. In place, see `propose_random_move`"""
+    return propose_random_move(schedule=schedule, specified_task=specified_task).apply(
+        schedule
+    )
+
 
+@profiled("operator.propose_block_move")
+def propose_block_move(schedule: Dict[int, Any]) -> Move:
+    """Explore. Move a block of tasks from one machine to another"""
     # Filter out valid machine
     valid_machines: List[int] = [
-        machine for machine in new_schedule.keys() if len(new_schedule[machine]) > 1
+        machine for machine in schedule.keys() if len(schedule[machine]) > 1
     ]
 
     if len(valid_machines) < 2:
-        return random_move(schedule=new_schedule)
+        return propose_random_move(schedule=schedule)
     # Target machine
     move_machine = random.choice(valid_machines)
     # Remove to avoid being pick again
     valid_machines.remove(move_machine)
     receive_machine = random.choice(valid_machines)
 
-    # Target schedule
-    move_schedule = new_schedule[move_machine]
-    receive_schedule = new_schedule[receive_machine]
-
     # Block idx
-    end = random.randrange(1, len(new_schedule[move_machine]) + 1)
+    end = random.randrange(1, len(schedule[move_machine]) + 1)
     start = random.randrange(0, end)
 
     # Position on new machine
-    new_position = random.randrange(0, max(1, len(new_schedule[receive_machine])))
-    targeted_block = move_schedule[start:end]
-    move_schedule = move_schedule[0:start] + move_schedule[end:]
+    new_position = random.randrange(0, max(1, len(schedule[receive_machine])))
 
-    # Insert
-    for task in targeted_block[::-1]:
-        receive_schedule.insert(new_position, task)
+    return BlockRelocate(move_machine, start, end, receive_machine, new_position)
 
-    new_schedule[move_machine] = move_schedule
-    new_schedule[receive_machine] = receive_schedule
 
-    del valid_machines
-    return new_schedule
+def block_move(schedule: Dict[int, Any]) -> Dict[int, List[Any]]:
+    """Explore. On a copy, see `propose_block_move`"""
+    new_schedule = copy.deepcopy(schedule)
+    return propose_block_move(schedule=new_schedule).apply(new_schedule)
 
 
-def inter_machine_swap(schedule: Dict[int, List[int]]):
+@profiled("operator.propose_inter_machine_swap")
+def propose_inter_machine_swap(schedule: Dict[int, List[int]]) -> Move:
     """
     All. Swap tasks between different machines:
     """
@@ -85,7 +97,7 @@ def inter_machine_swap(schedule: Dict[int, List[int]]):
     ]
 
     if len(valid_machines) < 2:
-        return random_move(schedule=schedule)
+        return propose_random_move(schedule=schedule)
 
     machine_a = random.choice(valid_machines)
 
@@ -97,13 +109,12 @@ def inter_machine_swap(schedule: Dict[int, List[int]]):
     task_a = random.randrange(len(schedule[machine_a]))
     task_b = random.randrange(len(schedule[machine_b]))
 
-    schedule[machine_a][task_a], schedule[machine_b][task_b] = (
-        schedule[machine_b][task_b],
-        schedule[machine_a][task_a],
-    )
+    return Swap(machine_a, task_a, machine_b, task_b)
 
-    del valid_machines
-    return schedule
+
+def inter_machine_swap(schedule: Dict[int, List[int]]):
+    """All. In place, see `propose_inter_machine_swap`"""
+    return propose_inter_machine_swap(schedule=schedule).apply(schedule)
 
 
 def generate_schedule(
@@ -120,19 +131,47 @@ def generate_schedule(
     return schedule
 
 
-def shuffle_machine(
+@profiled("operator.propose_generate_schedule")
+def propose_generate_schedule(
+    schedule: Dict[int, List[int]], tasks: Dict[int, Any]
+) -> CompoundMove:
+    """Explore. Rewrite every machine with a whole new schedule"""
+    new_schedule = generate_schedule(tasks=tasks, n_machines=len(schedule.keys()))
+    return CompoundMove(
+        tuple(
+            Rewrite(machine, tuple(schedule[machine]), tuple(new_schedule[machine]))
+            for machine in schedule.keys()
+        )
+    )
+
+
+@profiled("operator.propose_shuffle_machine")
+def propose_shuffle_machine(
     schedule: Dict[int, List[Any]], n_machines: int = 1
-) -> Dict[int, List[Any]]:
+) -> CompoundMove:
     """Explore. Shuffle task order on random machine."""
     machines = random.sample(list(schedule.keys()), n_machines)
+    moves: List[Rewrite] = []
     for machine in machines:
         if len(schedule[machine]) > 0:
-            random.shuffle(schedule[machine])
+            sequence = list(schedule[machine])
+            random.shuffle(sequence)
+            moves.append(Rewrite(machine, tuple(schedule[machine]), tuple(sequence)))
 
-    return schedule
+    return CompoundMove(tuple(moves))
 
 
-def intra_machine_swap(schedule: Dict[int, List[Any]]) -> Dict[int, List[Any]]:
+def shuffle_machine(
+    schedule: Dict[int, List[Any]], n_machines: int = 1
+) -> Dict[int, List[Any]]:
+    """Explore. In place, see `propose_shuffle_machine`"""
+    return propose_shuffle_machine(schedule=schedule, n_machines=n_machines).apply(
+        schedule
+    )
+
+
+@profiled("operator.propose_intra_machine_swap")
+def propose_intra_machine_swap(schedule: Dict[int, List[Any]]) -> Swap:
     """
     All. Swap two tasks within the same machine.
     """
@@ -143,12 +182,62 @@ def intra_machine_swap(schedule: Dict[int, List[Any]]) -> Dict[int, List[Any]]:
 
     task_a, task_b = random.sample(range(len(schedule[machine])), 2)
 
-    schedule[machine][task_a], schedule[machine][task_b] = (
-        schedule[machine][task_b],
-        schedule[machine][task_a],
+    return Swap(machine, task_a, machine, task_b)
+
+
+def intra_machine_swap(schedule: Dict[int, List[Any]]) -> Dict[int, List[Any]]:
+    """All. In place, see `propose_intra_machine_swap`"""
+    return propose_intra_machine_swap(schedule=schedule).apply(schedule)
+
+
+@profiled("operator.propose_lookahead_insertion")
+def propose_lookahead_insertion(
+    schedule: Dict[int, List[int]],
+    obj_function: callable,
+    tasks: Dict[int, Any],
+    setups: Dict[Tuple[int, int], int],
+    energy_constraint: Dict[str, Any] = None,
+    precedences: Dict[int, Set[int]] = None,
+    total_resource: int = None,
+    attempts: int = 10,
+) -> Move:
+    """
+    Exploit. Attempt to find the best position to insert a task in. Candidates are applied, evaluated
+    and undone on `schedule`, an empty `CompoundMove` is returned when none improves
+    """
+    kwargs = {
+        "tasks": tasks,
+        "setups": setups,
+        "precedences": precedences,
+        "energy_constraint": energy_constraint,
+        "total_resource": total_resource,
+    }
+    current_cost: float = obj_function(schedule=schedule, **kwargs)
+
+    machine = random.choice(
+        [machine for machine in schedule.keys() if len(schedule[machine]) > 0]
     )
 
-    return schedule
+    job_idx = random.randrange(len(schedule[machine]))
+
+    for _ in range(attempts):
+        # Randomly move task
+        move = propose_random_move(
+            schedule=schedule,
+            specified_task={"machine": machine, "idx": job_idx},
+        )
+        # Only improvements matter, losing candidates are cut short
+        candidate_cost: float = obj_function(
+            schedule=move.apply(schedule),
+            upper_bound=total_cost(current_cost),
+            **kwargs,
+        )
+        move.undo(schedule)
+
+        if total_cost(candidate_cost) < total_cost(current_cost):
+            return move
+
+    return CompoundMove()
 
 
 def lookahead_insertion(
@@ -161,42 +250,177 @@ def lookahead_insertion(
     total_resource: int = None,
     attempts: int = 10,
 ):
-    """Exploit. Attempt to find the best position to insert a task in"""
+    """Exploit. On a copy, see `propose_lookahead_insertion`"""
     new_schedule = copy.deepcopy(schedule)
-    current_cost: float = obj_function(
+    move = propose_lookahead_insertion(
         schedule=new_schedule,
+        obj_function=obj_function,
         tasks=tasks,
         setups=setups,
-        precedences=precedences,
         energy_constraint=energy_constraint,
+        precedences=precedences,
         total_resource=total_resource,
+        attempts=attempts,
     )
+    return move.apply(new_schedule)
 
-    machine = random.choice(
-        [machine for machine in schedule.keys() if len(new_schedule[machine]) > 0]
-    )
 
-    job_idx = random.randrange(len(new_schedule[machine]))
+@profiled("operator.propose_best_insertion")
+def propose_best_insertion(
+    schedule: Dict[int, List[int]],
+    obj_function: callable,
+    tasks: Dict[int, Any],
+    setups: Dict[Tuple[int, int], int],
+    energy_constraint: Dict[str, Any] = None,
+    precedences: Dict[int, Set[int]] = None,
+    total_resource: int = None,
+    instance: ProblemInstance = None,
+    first_improvement: bool = False,
+) -> Move:
+    """
+    Exploit. Removes a random task and scores its insertion at every position of every machine in one
+    vectorised pass: inserting task t between a and b on machine m lengthens m by
+    setup(a, t) + process(t, m) + setup(t, b) - setup(a, b), other machines are untouched. The
+    position adding the least time on each machine is then evaluated with `obj_function`, machines
+    with the lowest resulting makespan first (n_machines evaluations at most). Returns the best
+    improving relocation, the first one with `first_improvement`, an empty `CompoundMove` when none
+    improves. For makespan + load balance the best position of a machine is exact, with precedences /
+    energy / resource the sweep only ranks positions. `instance` provides the process / setup
+    matrices, built from `tasks` / `setups` on every call when missing (about a millisecond): the
+    optimisers pass their own
+    """
+    if instance is None:
+        instance = ProblemInstance(tasks=tasks, setups=setups, n_machines=len(schedule))
+    kwargs = {
+        "tasks": tasks,
+        "setups": setups,
+        "precedences": precedences,
+        "energy_constraint": energy_constraint,
+        "total_resource": total_resource,
+    }
+    current_cost: float = total_cost(obj_function(schedule=schedule, **kwargs))
+
+    machines = list(schedule.keys())
+    machine_ids = np.asarray(machines, dtype=np.intp)
+    machine = random.choice([machine for machine in machines if len(schedule[machine]) > 0])
+    job_idx = random.randrange(len(schedule[machine]))
+
+    # Sequences once the task has left its machine, flattened machine by machine
+    sequences = [list(schedule[other]) for other in machines]
+    task = sequences[machines.index(machine)].pop(job_idx)
+    lengths = np.array([len(sequence) for sequence in sequences], dtype=np.intp)
+    flat = np.fromiter(chain.from_iterable(sequences), dtype=np.intp, count=int(lengths.sum()))
+    flat_machine = np.repeat(np.arange(len(machines)), lengths)
+    process_times = instance.process_times
+    setup_times = instance.setup_times
+
+    # Completion time of every machine: processing + setups between consecutive tasks
+    consecutive = flat_machine[:-1] == flat_machine[1:]
+    completion = np.bincount(
+        flat_machine,
+        weights=process_times[flat, machine_ids[flat_machine]],
+        minlength=len(machines),
+    )
+    completion += np.bincount(
+        flat_machine[:-1][consecutive],
+        weights=setup_times[flat[:-1], flat[1:]][consecutive],
+        minlength=len(machines),
+    )
 
-    for _ in range(attempts):
-        # Randomly move task
-        candidate = random_move(
-            schedule=copy.deepcopy(new_schedule),
-            specified_task={"machine": machine, "idx": job_idx},
-        )
-        candidate_cost: float = obj_function(
-            schedule=candidate,
-            tasks=tasks,
-            setups=setups,
-            precedences=precedences,
-            energy_constraint=energy_constraint,
-            total_resource=total_resource,
+    # Slot p of a machine sits before its p-th task, len + 1 slots per machine
+    n_slots = lengths + 1
+    slot_machine = np.repeat(np.arange(len(machines)), n_slots)
+    slot_offsets = np.cumsum(n_slots) - n_slots
+    slot_pos = np.arange(len(slot_machine)) - slot_offsets[slot_machine]
+    # Index in `flat` of the task after the slot, padded so that every index is valid
+    next_idx = (np.cumsum(lengths) - lengths)[slot_machine] + slot_pos
+    padded = np.append(flat, task)
+    has_prev = slot_pos > 0
+    has_next = slot_pos < lengths[slot_machine]
+    prev_task = padded[np.where(has_prev, next_idx - 1, len(flat))]
+    next_task = padded[next_idx]
+    added = (
+        process_times[task, machine_ids[slot_machine]]
+        + has_prev * setup_times[prev_task, task]
+        + has_next * setup_times[task, next_task]
+        - (has_prev & has_next) * setup_times[prev_task, next_task]
+    )
+    new_completion = completion[slot_machine] + added
+
+    # Best slot of every machine: first of its group once sorted by machine, then added time
+    best_slots = np.lexsort((added, slot_machine))[slot_offsets]
+    # Makespan and load deviation with the task on each machine
+    top = np.sort(completion)
+    others = np.where(completion == top[-1], top[-2] if len(top) > 1 else 0.0, top[-1])
+    makespans = np.maximum(new_completion[best_slots], others)
+    loads = np.bincount(
+        flat_machine,
+        weights=instance.task_loads[flat, machine_ids[flat_machine]],
+        minlength=len(machines),
+    )
+    task_loads = instance.task_loads[task, machine_ids]
+    n = len(machines)
+    sums = loads.sum() + task_loads
+    squares = (loads**2).sum() + (loads + task_loads) ** 2 - loads**2
+    deviations = np.sqrt(np.maximum(0.0, squares / n - (sums / n) ** 2))
+
+    best_move, best_cost = CompoundMove(), current_cost
+    for target in np.lexsort((deviations, makespans)).tolist():
+        pos = int(slot_pos[best_slots[target]])
+        if machines[target] == machine and pos == job_idx:
+            continue
+        move = Relocate(machine, job_idx, machines[target], pos)
+        candidate_cost = total_cost(
+            obj_function(schedule=move.apply(schedule), upper_bound=best_cost, **kwargs)
         )
+        move.undo(schedule)
 
-        if candidate_cost["total_cost"] < current_cost["total_cost"]:
-            return candidate
+        if candidate_cost < best_cost:
+            best_move, best_cost = move, candidate_cost
+            if first_improvement:
+                break
 
-    return new_schedule
+    return best_move
+
+
+def best_insertion(
+    schedule: Dict[int, List[int]],
+    obj_function: callable,
+    tasks: Dict[int, Any],
+    setups: Dict[Tuple[int, int], int],
+    energy_constraint: Dict[str, Any] = None,
+    precedences: Dict[int, Set[int]] = None,
+    total_resource: int = None,
+    instance: ProblemInstance = None,
+    first_improvement: bool = False,
+):
+    """Exploit. On a copy, see `propose_best_insertion`"""
+    new_schedule = copy.deepcopy(schedule)
+    move = propose_best_insertion(
+        schedule=new_schedule,
+        obj_function=obj_function,
+        tasks=tasks,
+        setups=setups,
+        energy_constraint=energy_constraint,
+        precedences=precedences,
+        total_resource=total_resource,
+        instance=instance,
+        first_improvement=first_improvement,
+    )
+    return move.apply(new_schedule)
+
+
+@profiled("operator.propose_precedence_repair")
+def propose_precedence_repair(
+    schedule: Dict[int, List[int]],
+    tasks: Dict[int, Any],
+    setups: Dict[Tuple[int, int], int],
+    precedences: Dict[int, Set[int]] = None,
+) -> CompoundMove:
+    """Relocations fixing same-machine precedence violations, `schedule` is left untouched"""
+    move = CompoundMove(tuple(_repair_precedences(schedule, tasks, setups, precedences)))
+    move.undo(schedule)
+    return move
 
 
 def partial_precedence_repair(
@@ -206,11 +430,22 @@ def partial_precedence_repair(
     precedences: Dict[int, Set[int]] = None,
 ):
     new_schedule = copy.deepcopy(schedule)
+    _repair_precedences(new_schedule, tasks, setups, precedences)
+    return new_schedule
 
+
+def _repair_precedences(
+    schedule: Dict[int, List[int]],
+    tasks: Dict[int, Any],
+    setups: Dict[Tuple[int, int], int],
+    precedences: Dict[int, Set[int]],
+) -> List[Relocate]:
+    """Repairs `schedule` in place, returns the applied relocations"""
     temp_milestones: Dict[int, Any] = compute_base_milestones(
-        schedule=new_schedule, tasks=tasks, setups=setups
+        schedule=schedule, tasks=tasks, setups=setups
     )
 
+    moves: List[Relocate] = []
     for precedence_task, sequence in precedences.items():
         precedence_machine = temp_milestones[precedence_task]["machine"]
         for posterior_task in sequence:
@@ -218,14 +453,15 @@ def partial_precedence_repair(
                 continue
 
             # Infeasible solution
-            precedence_idx: int = new_schedule[precedence_machine].index(
-                precedence_task
-            )
-            posterior_idx: int = new_schedule[precedence_machine].index(posterior_task)
+            precedence_idx: int = schedule[precedence_machine].index(precedence_task)
+            posterior_idx: int = schedule[precedence_machine].index(posterior_task)
 
             if posterior_idx < precedence_idx:
                 # Move violated precedence up to right before its precedence
-                precedence_task = new_schedule[precedence_machine].pop(precedence_idx)
-                new_schedule[precedence_machine].insert(posterior_idx, precedence_task)
+                move = Relocate(
+                    precedence_machine, precedence_idx, precedence_machine, posterior_idx
+                )
+                move.apply(schedule)
+                moves.append(move)
 
-    return new_schedule
+    return moves
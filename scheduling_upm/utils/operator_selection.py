@@ -0,0 +1,106 @@
+import math
+import random
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+# CPU time of the calling thread, what an operator actually costs
+clock = time.thread_time
+
+
+class OperatorSelector:
+    """
+    UCB credit assignment over operator pools, a drop-in for `random.choice(operation_pool)`.
+
+    Arms are operators, identified by function name so that pools rebuilt on every call (or sharing an
+    operator) map to the same statistics. The value of an arm is its improvement per CPU-second:
+    decayed sum of cost decreases over decayed sum of seconds spent, the decay (`memory` per update)
+    letting the estimate follow the search as it moves from easy to hard improvements. `choice`
+    picks the arm maximising value / best value + `exploration` * sqrt(ln(total plays) / plays),
+    arms never played first. With probability `uniform_share` the pick is uniform instead, so that no
+    operator starves (SA in particular needs its cheap perturbations even when they rarely improve).
+    Operators drawn by `choice` are pending until credited by `reward`.
+    """
+
+    def __init__(self, exploration: float = 0.5, memory: float = 0.99, uniform_share: float = 0.5):
+        if exploration < 0 or not 0 < memory <= 1 or not 0 <= uniform_share <= 1:
+            raise ValueError()
+
+        self.exploration = exploration
+        self.memory = memory
+        self.uniform_share = uniform_share
+        self.plays: Dict[str, int] = {}
+        self.gains: Dict[str, float] = {}
+        self.seconds: Dict[str, float] = {}
+        self.n_plays = 0
+        self.pending: List[str] = []
+
+    def choice(self, operation_pool: Sequence[Tuple[Any, Dict]]) -> Tuple[Any, Dict]:
+        """Picks an (operation, kwargs) entry of the pool"""
+        names = [operation.__name__ for operation, _ in operation_pool]
+        unplayed = [idx for idx, name in enumerate(names) if name not in self.plays]
+        if len(unplayed) > 0:
+            idx = random.choice(unplayed)
+        elif random.random() < self.uniform_share:
+            idx = random.randrange(len(operation_pool))
+        else:
+            values = [self.value(name) for name in names]
+            best_value = max(values)
+            log_plays = math.log(max(1, self.n_plays))
+            scores = [
+                (value / best_value if best_value > 0 else 0.0)
+                + self.exploration * math.sqrt(log_plays / self.plays[name])
+                for name, value in zip(names, values)
+            ]
+            best_score = max(scores)
+            idx = random.choice(
+                [idx for idx, score in enumerate(scores) if score == best_score]
+            )
+
+        self.pending.append(names[idx])
+        return operation_pool[idx]
+
+    def take_pending(self) -> List[str]:
+        """Operators chosen since the last `reward` / `take_pending`, to be credited later"""
+        pending, self.pending = self.pending, []
+        return pending
+
+    def reward(self, improvement: float, seconds: float, arms: List[str] = None):
+        """Credits `arms` (default: the pending operators) with an even share of the cost decrease
+        and of the CPU time it took"""
+        arms = arms if arms is not None else self.take_pending()
+        if len(arms) == 0:
+            return
+        improvement = max(0.0, improvement) / len(arms)
+        seconds = max(0.0, seconds) / len(arms)
+        for name in arms:
+            self.plays[name] = self.plays.get(name, 0) + 1
+            self.gains[name] = self.memory * self.gains.get(name, 0.0) + improvement
+            self.seconds[name] = self.memory * self.seconds.get(name, 0.0) + seconds
+            self.n_plays += 1
+
+    def value(self, name: str) -> float:
+        """Improvement per CPU-second of an operator"""
+        seconds = self.seconds.get(name, 0.0)
+        return self.gains.get(name, 0.0) / seconds if seconds > 0 else 0.0
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "plays": self.plays[name],
+                "improvement_per_second": self.value(name),
+                "share": self.plays[name] / self.n_plays,
+            }
+            for name in self.plays
+        }
+
+    def __repr__(self):
+        return f"OperatorSelector(plays={self.n_plays}, arms={len(self.plays)})"
+
+
+def choose(
+    operation_pool: Sequence[Tuple[Any, Dict]], selector: OperatorSelector = None
+) -> Tuple[Any, Dict]:
+    """`selector.choice` if given, uniform `random.choice` otherwise"""
+    if selector is None:
+        return random.choice(operation_pool)
+    return selector.choice(operation_pool)
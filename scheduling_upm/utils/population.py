@@ -0,0 +1,116 @@
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Hashable, List
+
+import numpy as np
+
+from .entities import FlatSchedule
+from .operations import generate_schedule
+from .recorder import diversity_from_counts
+
+
+class PopulationIndex:
+    """
+    Hash index of the schedules held by a population, one slot per whale.
+
+    Schedules are keyed by `FlatSchedule.key()`, so `schedule in index` tells in O(n_tasks) whether
+    some whale already holds it. Per-task machine counts are kept up to date on every `set`, which
+    makes `diversity()` (mean pairwise share of tasks on different machines, as
+    `assignment_diversity`) O(n_tasks * n_machines) instead of a pass over the whole population.
+    """
+
+    def __init__(self, n_tasks: int, n_machines: int):
+        self.n_tasks = n_tasks
+        self.n_machines = n_machines
+        # counts[task, machine]: number of slots assigning task to machine
+        self.counts = np.zeros((n_tasks, n_machines), dtype=np.int64)
+        self._task_ids = np.arange(n_tasks)
+        self._slot_keys: Dict[Hashable, bytes] = {}
+        self._slot_assignments: Dict[Hashable, np.ndarray] = {}
+        self._key_counts: Counter = Counter()
+
+    def set(self, slot: Hashable, schedule: Any) -> bool:
+        """Stores `schedule` in `slot` (replacing its schedule), returns whether no other slot holds it"""
+        schedule = _as_flat(schedule)
+        if slot in self._slot_keys:
+            self.remove(slot)
+
+        key = schedule.key()
+        assignment = _assignment(schedule, self.n_tasks)
+        self._slot_keys[slot] = key
+        self._slot_assignments[slot] = assignment
+        self._key_counts[key] += 1
+        self.counts[self._task_ids, assignment] += 1
+        return self._key_counts[key] == 1
+
+    def remove(self, slot: Hashable):
+        key = self._slot_keys.pop(slot)
+        self._key_counts[key] -= 1
+        if self._key_counts[key] == 0:
+            del self._key_counts[key]
+        self.counts[self._task_ids, self._slot_assignments.pop(slot)] -= 1
+
+    def duplicates(self) -> List[Hashable]:
+        """Slots holding the same schedule as an earlier slot (insertion order)"""
+        seen = set()
+        duplicates = []
+        for slot, key in self._slot_keys.items():
+            if key in seen:
+                duplicates.append(slot)
+            seen.add(key)
+        return duplicates
+
+    def diversity(self) -> float:
+        return diversity_from_counts(counts=self.counts, n_schedules=len(self._slot_keys))
+
+    def keys(self) -> FrozenSet[bytes]:
+        """Keys of the schedules held, e.g. to check membership in another process"""
+        return frozenset(self._key_counts)
+
+    @property
+    def n_unique(self) -> int:
+        return len(self._key_counts)
+
+    def __contains__(self, schedule: Any) -> bool:
+        key = schedule if isinstance(schedule, bytes) else _as_flat(schedule).key()
+        return key in self._key_counts
+
+    def __len__(self) -> int:
+        return len(self._slot_keys)
+
+    def __repr__(self):
+        return f"PopulationIndex(size={len(self)}, unique={self.n_unique})"
+
+
+def fresh_schedules(
+    n_schedules: int,
+    tasks: Dict[int, Any],
+    n_machines: int,
+    index: PopulationIndex = None,
+    max_tries: int = 10,
+) -> List[FlatSchedule]:
+    """`n_schedules` random schedules, distinct from each other and from those held by `index`"""
+    taken = set()
+    schedules = []
+    for _ in range(n_schedules):
+        for _ in range(max_tries):
+            schedule = FlatSchedule.from_dict(generate_schedule(tasks=tasks, n_machines=n_machines))
+            key = schedule.key()
+            if key not in taken and (index is None or key not in index):
+                break
+        taken.add(key)
+        schedules.append(schedule)
+    return schedules
+
+
+def _as_flat(schedule: Any) -> FlatSchedule:
+    return schedule if isinstance(schedule, FlatSchedule) else FlatSchedule.from_dict(schedule)
+
+
+def _assignment(schedule: FlatSchedule, n_tasks: int) -> np.ndarray:
+    """Machine of every task"""
+    offsets = np.frombuffer(schedule.offsets, dtype=np.int64)
+    assignment = np.empty(n_tasks, dtype=np.intp)
+    assignment[np.frombuffer(schedule.tasks, dtype=np.int64)] = np.repeat(
+        np.arange(len(offsets) - 1), np.diff(offsets)
+    )
+    return assignment
@@ -0,0 +1,198 @@
+import functools
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Wall clock of the sections, includes time spent in nested sections
+clock = time.perf_counter
+
+
+class _ThreadState(threading.local):
+    """Operator nesting depth and pending operators of the calling thread"""
+
+    def __init__(self):
+        self.depth = 0
+        self.pending: List[str] = []
+
+
+class Profiler:
+    """
+    Runtime-switchable counters for the search operators and the objective terms.
+
+    Functions decorated with `profiled` count their calls and (inclusive) wall time while `enabled`.
+    The timing wrapper is always bound and checks `enabled` first, so a disabled profiler costs one
+    attribute read per call and `enable` / `disable` take effect everywhere, including references
+    taken earlier (e.g. the `partial` of `objective_function` in a `FitnessCache`).
+
+    Sections are named `operator.<name>` for the `propose_*` operators of `utils/operations.py` and
+    `objective.<term>` for the parts of an evaluation. Profiling keeps the production path: with the
+    JIT on, milestones / precedence / energy / std_dev run in one kernel timed as a whole
+    (`objective.jit`), `set_jit_enabled(False)` times them separately on the slower Python path. A
+    disabled profiler adds well under 2% to a search (see `tests/test_profiling.py`).
+
+    Operators called outside another operator are also kept `pending` for their thread: the
+    optimiser takes them once its candidate is scored and reports whether it was accepted / improved
+    the current cost with `outcome`. Counts are reset when an optimiser's `optimize` starts, which
+    then ends with `end_run`: the `report` (also exportable with `export_json`), its summary printed
+    when `verbose`.
+
+    The counters live in the process, operators run by worker processes are not seen.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.verbose = True
+        # name -> [calls, seconds]
+        self.sections: Dict[str, List[float]] = {}
+        # operator name -> [candidates, accepted, improved]
+        self.outcomes: Dict[str, List[int]] = {}
+        self._threads = _ThreadState()
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> List[str]:
+        """Operators drawn by the calling thread since its last `take_pending`"""
+        return self._threads.pending
+
+    def enable(self, verbose: bool = True):
+        self.verbose = verbose
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self._threads = _ThreadState()
+
+    def reset(self):
+        with self._lock:
+            self.sections = {}
+            self.outcomes = {}
+        self._threads = _ThreadState()
+
+    def start_run(self):
+        if self.enabled:
+            self.reset()
+
+    def end_run(self) -> Optional[Dict[str, Dict[str, Dict[str, float]]]]:
+        """Report of the run, None when disabled"""
+        if not self.enabled:
+            return None
+        if self.verbose:
+            print(self.summary())
+        return self.report()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            stats = self.sections.get(name)
+            if stats is None:
+                stats = self.sections[name] = [0, 0.0]
+            stats[0] += 1
+            stats[1] += seconds
+
+    def take_pending(self) -> List[str]:
+        """Operators drawn by the calling thread since its last `take_pending`"""
+        state = self._threads
+        pending, state.pending = state.pending, []
+        return pending
+
+    def outcome(self, operators: List[str], accepted: bool, improved: bool):
+        """Credits the operators that built one candidate with its fate"""
+        with self._lock:
+            for name in operators:
+                stats = self.outcomes.get(name)
+                if stats is None:
+                    stats = self.outcomes[name] = [0, 0, 0]
+                stats[0] += 1
+                stats[1] += accepted
+                stats[2] += improved
+
+    def report(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Operators and objective terms with their calls, time and (operators) acceptance /
+        improvement rates, JSON serialisable"""
+        report = {"operators": {}, "objective": {}, "other": {}}
+        with self._lock:
+            sections = sorted((name, tuple(stats)) for name, stats in self.sections.items())
+            outcomes = {name: tuple(stats) for name, stats in self.outcomes.items()}
+        for name, (calls, seconds) in sections:
+            group, _, short_name = name.partition(".")
+            entry = {
+                "calls": calls,
+                "seconds": seconds,
+                "mean_us": 1e6 * seconds / calls if calls > 0 else 0.0,
+            }
+            if group == "operator":
+                candidates, accepted, improved = outcomes.get(short_name, (0, 0, 0))
+                entry["candidates"] = candidates
+                entry["acceptance_rate"] = accepted / candidates if candidates > 0 else None
+                entry["improvement_rate"] = improved / candidates if candidates > 0 else None
+                report["operators"][short_name] = entry
+            elif group == "objective":
+                report["objective"][short_name] = entry
+            else:
+                report["other"][name] = entry
+        return report
+
+    def summary(self) -> str:
+        lines = []
+        for group, entries in self.report().items():
+            if len(entries) == 0:
+                continue
+            lines.append(f"{group}:")
+            for name, entry in sorted(entries.items(), key=lambda item: -item[1]["seconds"]):
+                line = (
+                    f"  {name:<32} {entry['calls']:>9} calls {entry['seconds']:>9.3f}s"
+                    f" {entry['mean_us']:>10.1f}us"
+                )
+                if entry.get("acceptance_rate") is not None:
+                    line += (
+                        f"  accepted {entry['acceptance_rate']:6.1%}"
+                        f"  improved {entry['improvement_rate']:6.1%}"
+                    )
+                lines.append(line)
+        return "\n".join(lines)
+
+    def export_json(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def __repr__(self):
+        return f"Profiler(enabled={self.enabled}, sections={len(self.sections)})"
+
+
+# Shared by the whole package, `PROFILER.enable()` to start counting
+PROFILER = Profiler()
+
+
+def profiled(name: str) -> Callable[[Callable], Callable]:
+    """Times the decorated function as section `name` of `PROFILER` while it is enabled"""
+    _, _, operator_name = name.partition(".")
+    is_operator = name.startswith("operator.")
+
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs) -> Any:
+            if not PROFILER.enabled:
+                return function(*args, **kwargs)
+
+            if not is_operator:
+                started = clock()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    PROFILER.record(name, clock() - started)
+
+            # Operators falling back on / retrying another one only credit the outer one
+            state = PROFILER._threads
+            if state.depth == 0:
+                state.pending.append(operator_name)
+            state.depth += 1
+            started = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                PROFILER.record(name, clock() - started)
+                state.depth -= 1
+
+        return wrapper
+
+    return decorator
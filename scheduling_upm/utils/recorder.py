@@ -0,0 +1,347 @@
+import json
+import os
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .entities import FlatSchedule
+
+MODES = ("every", "improvements", "ring")
+
+
+class HistoryRecorder:
+    """
+    Bounded convergence history of a single-solution search (e.g. `SimulatedAnnealing.history`).
+
+    Records are dicts with keys iteration, iter_cost, iter_schedule, best_schedule, best_cost. Which
+    iterations are recorded depends on `mode`:
+    - "every": every `every`-th iteration
+    - "improvements" (default): iterations where the best cost improved
+    - "ring": every iteration, only the last `capacity` are kept
+    The first iteration is always recorded. Schedules are copied into every kept record, so "ring" and
+    `every=1` pay an O(n_tasks) copy per iteration and hold n_tasks * capacity task ids. At most
+    `capacity` records are kept in memory (None for unbounded, not allowed for "ring"). With `path`,
+    every recorded iteration is also streamed to disk:
+    ".jsonl" writes one JSON line per record, ".npz" writes chunks of `chunk_size` records to
+    `<stem>_<chunk>.npz`. Read them back with `load_history`.
+    """
+
+    def __init__(
+        self,
+        mode: str = "improvements",
+        every: int = 1,
+        capacity: Optional[int] = 10_000,
+        path: str = None,
+        chunk_size: int = 1_000,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown recorder mode {mode!r}, expected one of {MODES}")
+        if mode == "ring" and capacity is None:
+            raise ValueError("Ring buffer mode needs a capacity")
+        if every < 1 or chunk_size < 1:
+            raise ValueError("every and chunk_size must be positive")
+
+        self.mode = mode
+        self.every = every
+        self.capacity = capacity
+        self.path = path
+        self.chunk_size = chunk_size
+        self.fmt = _stream_format(path)
+
+        self.records: deque = deque(maxlen=capacity)
+        self.n_recorded = 0
+        self._best_seen = float("inf")
+        # Best schedule rarely changes, its copy is shared by consecutive records
+        self._best_copy: FlatSchedule = None
+
+        self._file = None
+        self._chunk: List[Dict[str, Any]] = []
+        self._n_chunks = 0
+
+    def record(
+        self,
+        iteration: int,
+        iter_cost: float,
+        iter_schedule,
+        best_schedule,
+        best_cost: float,
+    ) -> bool:
+        """Records the iteration if the mode keeps it, schedules are copied only then"""
+        improved = best_cost < self._best_seen
+        self._best_seen = min(self._best_seen, best_cost)
+        if not self._keeps(iteration, improved):
+            return False
+
+        if self._best_copy is None or self._best_copy != best_schedule:
+            self._best_copy = FlatSchedule.from_schedule(best_schedule)
+
+        entry = {
+            "iteration": iteration,
+            "iter_cost": iter_cost,
+            "iter_schedule": FlatSchedule.from_schedule(iter_schedule),
+            "best_schedule": self._best_copy,
+            "best_cost": best_cost,
+        }
+        self.records.append(entry)
+        self.n_recorded += 1
+
+        if self.fmt == "jsonl":
+            self._write_jsonl(entry)
+        elif self.fmt == "npz":
+            self._chunk.append(entry)
+            if len(self._chunk) >= self.chunk_size:
+                self._write_npz_chunk()
+        return True
+
+    def flush(self):
+        if self.fmt == "npz" and len(self._chunk) > 0:
+            self._write_npz_chunk()
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.records)
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        return self.records[idx]
+
+    def __repr__(self):
+        return (
+            f"HistoryRecorder(mode={self.mode!r}, in_memory={len(self.records)}, "
+            f"recorded={self.n_recorded})"
+        )
+
+    def _keeps(self, iteration: int, improved: bool) -> bool:
+        if self.n_recorded == 0:
+            return True
+        if self.mode == "every":
+            return iteration % self.every == 0
+        if self.mode == "improvements":
+            return improved
+        return True
+
+    def _write_jsonl(self, entry: Dict[str, Any]):
+        if self._file is None:
+            self._file = open(self.path, "w" if self.n_recorded <= 1 else "a")
+        self._file.write(
+            json.dumps(
+                {
+                    "iteration": entry["iteration"],
+                    "iter_cost": float(entry["iter_cost"]),
+                    "iter_schedule": entry["iter_schedule"].to_dict(),
+                    "best_schedule": entry["best_schedule"].to_dict(),
+                    "best_cost": float(entry["best_cost"]),
+                }
+            )
+            + "\n"
+        )
+
+    def _write_npz_chunk(self):
+        stem = os.path.splitext(self.path)[0]
+        np.savez(
+            f"{stem}_{self._n_chunks:05d}.npz",
+            iteration=np.array([entry["iteration"] for entry in self._chunk]),
+            iter_cost=np.array([entry["iter_cost"] for entry in self._chunk], dtype=float),
+            best_cost=np.array([entry["best_cost"] for entry in self._chunk], dtype=float),
+            **_stack_schedules("iter", [entry["iter_schedule"] for entry in self._chunk]),
+            **_stack_schedules("best", [entry["best_schedule"] for entry in self._chunk]),
+        )
+        self._n_chunks += 1
+        self._chunk = []
+
+
+class PopulationTelemetry:
+    """
+    Per-iteration statistics of a population search (e.g. `WhaleOptimizationAlgorithm.history`), in
+    NumPy arrays: best / mean / worst cost, diversity (mean pairwise share of tasks assigned to
+    different machines, see `assignment_diversity`) and number of accepted candidates. The arrays
+    start at `min(n_iterations, initial_capacity)` entries and double when full, so a large (or None,
+    time-bounded search) `n_iterations` costs nothing up front; `as_dict` trims them to `n_recorded`.
+    With `snapshot_every`, a copy of the population and its costs is also kept every `snapshot_every`
+    iterations, the last `max_snapshots` of them.
+    """
+
+    def __init__(
+        self,
+        n_iterations: Optional[int] = None,
+        snapshot_every: int = None,
+        max_snapshots: Optional[int] = 100,
+        initial_capacity: int = 1024,
+    ):
+        capacity = max(1, min(n_iterations or initial_capacity, initial_capacity))
+        self.best_cost = np.full(capacity, np.nan)
+        self.mean_cost = np.full(capacity, np.nan)
+        self.worst_cost = np.full(capacity, np.nan)
+        self.diversity = np.full(capacity, np.nan)
+        self.n_accepted = np.zeros(capacity, dtype=np.int64)
+        self.n_recorded = 0
+        self.snapshot_every = snapshot_every
+        self.snapshots: deque = deque(maxlen=max_snapshots)
+
+    def record(
+        self,
+        iteration: int,
+        costs: Sequence[float],
+        schedules: Sequence[Any],
+        n_accepted: int = 0,
+        diversity: float = None,
+    ):
+        """`diversity`: if already known (e.g. from a `PopulationIndex`), else computed from `schedules`"""
+        if iteration >= len(self.best_cost):
+            self._grow(max(2 * len(self.best_cost), iteration + 1))
+        costs = np.asarray(costs, dtype=float)
+        self.best_cost[iteration] = costs.min()
+        self.mean_cost[iteration] = costs.mean()
+        self.worst_cost[iteration] = costs.max()
+        self.diversity[iteration] = (
+            diversity if diversity is not None else assignment_diversity(schedules)
+        )
+        self.n_accepted[iteration] = n_accepted
+        self.n_recorded = max(self.n_recorded, iteration + 1)
+
+        if self.snapshot_every is not None and iteration % self.snapshot_every == 0:
+            self.snapshots.append(
+                {
+                    "iteration": iteration,
+                    "schedules": [FlatSchedule.from_schedule(s) for s in schedules],
+                    "costs": costs,
+                }
+            )
+
+    def _grow(self, capacity: int):
+        for name in ("best_cost", "mean_cost", "worst_cost", "diversity"):
+            grown = np.full(capacity, np.nan)
+            grown[: len(getattr(self, name))] = getattr(self, name)
+            setattr(self, name, grown)
+        n_accepted = np.zeros(capacity, dtype=np.int64)
+        n_accepted[: len(self.n_accepted)] = self.n_accepted
+        self.n_accepted = n_accepted
+
+    def as_dict(self) -> Dict[str, np.ndarray]:
+        """Statistics of the recorded iterations"""
+        n = self.n_recorded
+        return {
+            "best_cost": self.best_cost[:n],
+            "mean_cost": self.mean_cost[:n],
+            "worst_cost": self.worst_cost[:n],
+            "diversity": self.diversity[:n],
+            "n_accepted": self.n_accepted[:n],
+        }
+
+    def __len__(self) -> int:
+        return self.n_recorded
+
+    def __repr__(self):
+        return f"PopulationTelemetry(recorded={self.n_recorded}, snapshots={len(self.snapshots)})"
+
+
+def assignment_matrix(schedules: Sequence[Any]) -> np.ndarray:
+    """(n_schedules, n_tasks): machine each task is assigned to, task ids must be 0..n_tasks-1"""
+    n_tasks = len(FlatSchedule.from_schedule(schedules[0]).tasks) if len(schedules) > 0 else 0
+    assignments = np.empty((len(schedules), n_tasks), dtype=np.int64)
+    for row, schedule in enumerate(schedules):
+        if not isinstance(schedule, FlatSchedule):
+            schedule = FlatSchedule.from_dict(schedule)
+        offsets = np.array(schedule.offsets, dtype=np.int64)
+        tasks = np.array(schedule.tasks, dtype=np.int64)
+        assignments[row, tasks] = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    return assignments
+
+
+def assignment_diversity(schedules: Sequence[Any]) -> float:
+    """Mean pairwise Hamming distance of task-to-machine assignments, normalised to [0, 1]"""
+    if len(schedules) < 2:
+        return 0.0
+    assignments = assignment_matrix(schedules)
+    n_schedules, n_tasks = assignments.shape
+    if n_tasks == 0:
+        return 0.0
+
+    n_machines = int(assignments.max()) + 1
+    counts = np.zeros((n_tasks, n_machines), dtype=np.int64)
+    np.add.at(counts, (np.tile(np.arange(n_tasks), n_schedules), assignments.ravel()), 1)
+    return diversity_from_counts(counts=counts, n_schedules=n_schedules)
+
+
+def diversity_from_counts(counts: np.ndarray, n_schedules: int) -> float:
+    """`assignment_diversity` from counts[task, machine] = number of schedules assigning task to machine"""
+    n_tasks = counts.shape[0]
+    if n_schedules < 2 or n_tasks == 0:
+        return 0.0
+    # Per task, pairs of schedules agreeing = sum over machines of C(count, 2)
+    n_pairs = n_schedules * (n_schedules - 1) // 2
+    agreeing = (counts * (counts - 1) // 2).sum()
+    return float(1.0 - agreeing / (n_pairs * n_tasks))
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    """Reads back the records streamed by a `HistoryRecorder` to `path`"""
+    fmt = _stream_format(path)
+    records: List[Dict[str, Any]] = []
+    if fmt == "jsonl":
+        with open(path) as file:
+            for line in file:
+                entry = json.loads(line)
+                for key in ("iter_schedule", "best_schedule"):
+                    entry[key] = {
+                        int(machine): sequence for machine, sequence in entry[key].items()
+                    }
+                records.append(entry)
+        return records
+
+    stem = os.path.splitext(path)[0]
+    n_chunks = 0
+    while os.path.exists(f"{stem}_{n_chunks:05d}.npz"):
+        with np.load(f"{stem}_{n_chunks:05d}.npz") as chunk:
+            for idx in range(len(chunk["iteration"])):
+                records.append(
+                    {
+                        "iteration": int(chunk["iteration"][idx]),
+                        "iter_cost": float(chunk["iter_cost"][idx]),
+                        "iter_schedule": _unstack_schedule(chunk, "iter", idx),
+                        "best_schedule": _unstack_schedule(chunk, "best", idx),
+                        "best_cost": float(chunk["best_cost"][idx]),
+                    }
+                )
+        n_chunks += 1
+    return records
+
+
+def _stream_format(path: Optional[str]) -> Optional[str]:
+    if path is None:
+        return None
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in (".jsonl", ".npz"):
+        raise ValueError(f"Unsupported history file {path!r}, use .jsonl or .npz")
+    return extension[1:]
+
+
+def _stack_schedules(prefix: str, schedules: List[FlatSchedule]) -> Dict[str, np.ndarray]:
+    # Every schedule holds all tasks, so flat arrays of a chunk have the same length
+    return {
+        f"{prefix}_tasks": np.stack(
+            [np.frombuffer(schedule.tasks, dtype=np.int64) for schedule in schedules]
+        ),
+        f"{prefix}_offsets": np.stack(
+            [np.frombuffer(schedule.offsets, dtype=np.int64) for schedule in schedules]
+        ),
+    }
+
+
+def _unstack_schedule(chunk, prefix: str, idx: int) -> Dict[int, List[int]]:
+    tasks = chunk[f"{prefix}_tasks"][idx]
+    offsets = chunk[f"{prefix}_offsets"][idx]
+    return {
+        machine: tasks[offsets[machine] : offsets[machine + 1]].tolist()
+        for machine in range(len(offsets) - 1)
+    }
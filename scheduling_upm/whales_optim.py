@@ -1,18 +1,57 @@
+import math
+import os
 import random
 import copy
-from typing import Dict, Any, List, Set
-from .utils.operations import generate_schedule
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from typing import Container, Dict, Any, FrozenSet, List, Optional, Set, Tuple
 from .strategies.woa_strategy import (
-    random_explore,
+    explore_move,
     discrete_shrinking_mechanism,
-    discrete_spiral_update,
+    spiral_move,
 )
-from .utils.evaluation import objective_function
-from .utils.entities import Schedule
+from .utils.moves import Move
+from .utils.evaluation import objective_function, evaluate_batch, BOUND_EXCEEDED
+from .utils.entities import Schedule, ProblemInstance, FlatSchedule
+from .utils.cache import FitnessCache, schedule_key
+from .utils.recorder import PopulationTelemetry
+from .utils.population import PopulationIndex, fresh_schedules
+from .utils.operator_selection import OperatorSelector, clock
+from .utils.profiling import PROFILER
+from .utils.budget import SearchBudget, ImprovementCallback
+
+EXECUTORS = ("serial", "thread", "process")
+
+# Pod of the current worker process, built once by `_init_worker`
+_pod: "WhaleOptimizationAlgorithm" = None
+
 
 class WhaleOptimizationAlgorithm:
     """
     Whale Optimization Algorithm
+
+    Stops after `n_iterations`, `time_limit` seconds, at `deadline` (`time.time()` timestamp) or after
+    `patience` iterations without improvement. With a time budget, `a` decreases with the elapsed
+    fraction of it, `n_iterations=None` leaves time / deadline / patience as the only stopping rules.
+    `on_improvement(iteration, best)` is called on every new best (see `SearchBudget`).
+
+    `executor`: how the whales are moved within an iteration. The pod is split into `max_workers`
+    chunks, each generating and batch-evaluating its candidates with its own RNG stream (seeded from
+    `random` every iteration), "serially", in a "thread" pool or in a "process" pool. The best whale
+    is updated once every chunk is done. For a given `max_workers` the result doesn't depend on the
+    executor. Threads share the operators' RNG and cache, so only evaluation runs concurrently in them:
+    use processes for speedup.
+
+    Whales are kept distinct: with `deduplicate`, candidates already held by a whale are rejected
+    without being evaluated, and whales converging onto the same schedule within an iteration are
+    re-seeded. When the pod's diversity (see `PopulationIndex.diversity`) falls below `min_diversity`,
+    the worst `restart_fraction` of the whales are re-seeded with random schedules.
+
+    `adaptive_operators`: the explore and shrinking operators are picked by an `OperatorSelector`
+    (`self.selector`, one per worker process) crediting them with the cost decrease of their
+    candidate per CPU-second, instead of uniformly.
     """
 
     def __init__(
@@ -21,13 +60,27 @@ class WhaleOptimizationAlgorithm:
         setups: Dict[tuple[int, int], int],
         n_machines: int,
         n_schedules: int = 10,
-        n_iterations: int = 1000,
+        n_iterations: Optional[int] = 1000,
         precedences: Dict[int, Set] = None,
         total_resource: int = None,
-        energy_constraint: Dict[str, Any] = None
+        energy_constraint: Dict[str, Any] = None,
+        cache_size: int = 10_000,
+        snapshot_every: int = None,
+        time_limit: float = None,
+        deadline: float = None,
+        patience: int = None,
+        on_improvement: ImprovementCallback = None,
+        executor: str = "serial",
+        max_workers: int = None,
+        deduplicate: bool = True,
+        min_diversity: float = 0.02,
+        restart_fraction: float = 0.5,
+        adaptive_operators: bool = False,
     ):
         if n_machines <= 0 or n_schedules <= 0:
             raise ValueError()
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor {executor!r}, expected one of {EXECUTORS}")
 
         self.tasks = tasks
         self.setups = setups
@@ -37,107 +90,408 @@ class WhaleOptimizationAlgorithm:
         self.precedences = precedences or None
         self.energy_constraint = energy_constraint or None
         self.total_resource = total_resource or None
+        self.executor = executor
+        self.deduplicate = deduplicate
+        self.min_diversity = min_diversity
+        self.restart_fraction = restart_fraction
+        self.max_workers = min(
+            n_schedules,
+            max_workers or (1 if executor == "serial" else os.cpu_count() or 1),
+        )
+        # Everything a worker process needs to build its own pod
+        self.problem: Dict[str, Any] = {
+            "tasks": tasks,
+            "setups": setups,
+            "n_machines": n_machines,
+            "n_schedules": n_schedules,
+            "n_iterations": 1,
+            "precedences": precedences,
+            "total_resource": total_resource,
+            "energy_constraint": energy_constraint,
+            "cache_size": cache_size,
+            "adaptive_operators": adaptive_operators,
+        }
+        self.instance = ProblemInstance(
+            tasks=tasks,
+            setups=setups,
+            n_machines=n_machines,
+            precedences=self.precedences,
+            energy_constraint=self.energy_constraint,
+            total_resource=self.total_resource,
+        )
+        # Memoised objective, shared with the exploit operators
+        self.fitness_cache = FitnessCache(
+            partial(
+                objective_function,
+                instance=self.instance,
+                alpha_load=50.0,
+                breakdown=False,
+            ),
+            maxsize=cache_size,
+        )
         self.schedules: List[Schedule] = []
         self.best_schedule: Schedule = None
-        self.history = []
+        # Schedules held by the whales, slot = whale index
+        self.index = PopulationIndex(n_tasks=self.instance.n_tasks, n_machines=n_machines)
+        self.n_restarts = 0
+        self.selector = OperatorSelector() if adaptive_operators else None
+        # Report of the last run when `PROFILER` is enabled (operators of the process executor's
+        # workers are not counted)
+        self.profile = None
+        # Per-iteration population statistics, optional population snapshots
+        self.history = PopulationTelemetry(
+            n_iterations=n_iterations, snapshot_every=snapshot_every
+        )
+        self.budget = SearchBudget(
+            n_iterations=n_iterations,
+            time_limit=time_limit,
+            deadline=deadline,
+            patience=patience,
+            on_improvement=on_improvement,
+        )
 
     def initialize_population(self):
         """Initializes the pod of whales"""
-        for _ in range(self.n_schedules):
-            schedule = generate_schedule(tasks=self.tasks, n_machines=self.n_machines)
-            cost = objective_function(
-                schedule=schedule,
-                tasks=self.tasks,
-                setups=self.setups,
-                precedences=self.precedences,
-                energy_constraint=self.energy_constraint,
-                alpha_load=50.0,
-                verbose=True
-            )
+        schedules = fresh_schedules(
+            n_schedules=self.n_schedules, tasks=self.tasks, n_machines=self.n_machines
+        )
+        costs = evaluate_batch(
+            schedules=schedules, instance=self.instance, alpha_load=50.0
+        )
+        for idx, (schedule, cost) in enumerate(zip(schedules, costs.tolist())):
             self.schedules.append(Schedule(schedule=schedule, cost=cost))
+            self.index.set(idx, schedule)
 
         self.best_schedule = copy.deepcopy(
-            min(self.schedules, key=lambda schedule: schedule.cost["total_cost"])
+            min(self.schedules, key=lambda schedule: schedule.cost)
         )
 
     def optimize(self):
+        budget = self.budget.start()
+        PROFILER.start_run()
         self.initialize_population()
+        budget.update(iteration=0, best=self.best_schedule)
+
+        # Contiguous chunks of whales, one RNG stream each
+        bounds = [
+            round(k * self.n_schedules / self.max_workers)
+            for k in range(self.max_workers + 1)
+        ]
+        chunks = [range(lo, hi) for lo, hi in zip(bounds, bounds[1:])]
+        pool = self._make_executor()
+        # Threads share the module RNG and the cache
+        lock = threading.Lock() if self.executor == "thread" else None
+
+        try:
+            iter = 0
+            while not budget.exhausted(iter):
+                a = self.linearly_decrement(progress=budget.progress(iter))
+                seeds = [random.getrandbits(64) for _ in chunks]
+                best_schedule = self.best_schedule.schedule
+
+                # Schedules already held, candidates equal to one of them are rejected unevaluated
+                taken = None
+                if self.deduplicate:
+                    taken = self.index.keys() if self.executor == "process" else self.index
+
+                moved: List[int] = []
+                if self.executor == "process":
+                    results = pool.map(
+                        _move_whales,
+                        [
+                            [
+                                (self.schedules[idx].schedule, self.schedules[idx].cost)
+                                for idx in chunk
+                            ]
+                            for chunk in chunks
+                        ],
+                        [best_schedule] * len(chunks),
+                        [a] * len(chunks),
+                        seeds,
+                        [taken] * len(chunks),
+                    )
+                    for chunk, (chunk_moved, whales) in zip(chunks, results):
+                        moved.extend(chunk[position] for position in chunk_moved)
+                        for idx, (schedule, cost) in zip(chunk, whales):
+                            self.schedules[idx].update(new_schedule=schedule, new_cost=cost)
+                else:
+                    args = [
+                        ([self.schedules[idx] for idx in chunk], best_schedule, a, seed, taken, lock)
+                        for chunk, seed in zip(chunks, seeds)
+                    ]
+                    results = (
+                        pool.map(self.move_whales, *zip(*args))
+                        if pool is not None
+                        else [self.move_whales(*chunk_args) for chunk_args in args]
+                    )
+                    for chunk, chunk_moved in zip(chunks, results):
+                        moved.extend(chunk[position] for position in chunk_moved)
 
-        for iter in range(self.n_iterations):
-            a = self.linearly_decrement(iter=iter)
-
-            for agent_schedule in self.schedules:
-                A = 2 * a * random.random() - a
-                # C = 2 * random.random()
-                possibility = random.random()
-
-                if possibility < 0.5:
-                    if abs(A) <= 1:
-                        # Exploitation: Shrinking encircling mechanism
-                        candidate_schedule = discrete_shrinking_mechanism(
-                            best_schedule=self.best_schedule.schedule,
-                            n_moves=random.randint(1, max(1, int(a * 10 + 1))),
-                            **{
-                                "precedences": self.precedences,
-                                "energy_constraint": self.energy_constraint,
-                                "total_resource": self.total_resource,
-                                "setups": self.setups,
-                                "obj_function": objective_function,
-                                "tasks": self.tasks,
-                            },
+                # Whales that moved onto the same schedule in this iteration are re-seeded
+                duplicates = [
+                    idx for idx in moved if not self.index.set(idx, self.schedules[idx].schedule)
+                ]
+                if self.deduplicate and len(duplicates) > 0:
+                    self.reseed(duplicates)
+
+                # Best whale is only updated once every chunk is done
+                for agent_schedule in self.schedules:
+                    if agent_schedule.cost < self.best_schedule.cost:
+                        self.best_schedule.update(
+                            new_schedule=agent_schedule.schedule.copy(),
+                            new_cost=agent_schedule.cost,
                         )
+
+                diversity = self.index.diversity()
+                self.history.record(
+                    iteration=iter,
+                    costs=[agent_schedule.cost for agent_schedule in self.schedules],
+                    schedules=[agent_schedule.schedule for agent_schedule in self.schedules],
+                    n_accepted=len(moved),
+                    diversity=diversity,
+                )
+                budget.update(iteration=iter + 1, best=self.best_schedule)
+
+                if self.min_diversity is not None and diversity < self.min_diversity:
+                    self.restart()
+
+                iter += 1
+                # early stop when a got too small
+                if a < 1e-8:
+                    break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        # Cost breakdown is only computed for the final best solution
+        self.best_schedule.breakdown = objective_function(
+            schedule=self.best_schedule.schedule,
+            instance=self.instance,
+            alpha_load=50.0,
+        )
+        self.profile = PROFILER.end_run()
+        return self.best_schedule, self.history
+
+    def move_whales(
+        self,
+        whales: List[Schedule],
+        best_schedule: FlatSchedule,
+        a: float,
+        seed: int,
+        taken: Container[bytes] = None,
+        lock: threading.Lock = None,
+    ) -> List[int]:
+        """
+        One WOA update of `whales` (in place) towards `best_schedule`, operators draw from `random`
+        seeded with `seed`. Candidates whose key is in `taken` are rejected without evaluation.
+        Returns the positions of the whales that moved
+        """
+        # Every whale moves with respect to the best whale of the previous iteration,
+        # candidates are then evaluated in one batch. Moves are applied to the whale in place
+        # and undone if rejected
+        candidate_schedules: List[Dict[int, List[int]]] = []
+        candidate_moves: List[Move] = []
+        # Operators drawn for every candidate and CPU time spent generating it
+        candidate_credits: List[Tuple[List[str], float]] = []
+        # Operators drawn for every candidate, for the profiler
+        candidate_operators: List[List[str]] = []
+        with lock if lock is not None else nullcontext():
+            caller_state = random.getstate()
+            random.seed(seed)
+            if PROFILER.enabled:
+                PROFILER.take_pending()
+            try:
+                for agent_schedule in whales:
+                    started = clock()
+                    A = 2 * a * random.random() - a
+                    # C = 2 * random.random()
+                    possibility = random.random()
+                    move = None
+
+                    if possibility < 0.5:
+                        if abs(A) <= 1:
+                            # Exploitation: Shrinking encircling mechanism
+                            candidate_schedule = discrete_shrinking_mechanism(
+                                best_schedule=best_schedule,
+                                n_moves=random.randint(1, max(1, int(a * 10 + 1))),
+                                **{
+                                    "precedences": self.precedences,
+                                    "energy_constraint": self.energy_constraint,
+                                    "total_resource": self.total_resource,
+                                    "setups": self.setups,
+                                    "obj_function": self.fitness_cache,
+                                    "tasks": self.tasks,
+                                },
+                                selector=self.selector,
+                                instance=self.instance,
+                            )
+                        else:
+                            # Exploration: Search for prey
+                            move = explore_move(
+                                tasks=self.tasks,
+                                schedule=agent_schedule.schedule,
+                                selector=self.selector,
+                            )
                     else:
-                        # Exploration: Search for prey
-                        candidate_schedule = random_explore(
-                            tasks=self.tasks, schedule=agent_schedule.schedule
+                        # Exploitation: Spiral updating
+                        move = spiral_move(
+                            schedule=agent_schedule.schedule,
+                            best_schedule=best_schedule,
                         )
-                else:
-                    # Exploitation: Spiral updating
-                    candidate_schedule = discrete_spiral_update(
-                        schedule=agent_schedule.schedule,
-                        best_schedule=self.best_schedule.schedule,
+
+                    if move is not None:
+                        candidate_schedule = move.apply(agent_schedule.schedule)
+
+                    candidate_schedules.append(candidate_schedule)
+                    candidate_moves.append(move)
+                    if self.selector is not None:
+                        candidate_credits.append(
+                            (self.selector.take_pending(), clock() - started)
+                        )
+                    if PROFILER.enabled:
+                        candidate_operators.append(PROFILER.take_pending())
+            finally:
+                random.setstate(caller_state)
+
+        evaluation_started = clock()
+        if taken is None:
+            candidate_costs = self.evaluate_candidates(candidate_schedules, lock=lock)
+        else:
+            candidate_costs = [BOUND_EXCEEDED] * len(candidate_schedules)
+            fresh = [
+                position
+                for position, schedule in enumerate(candidate_schedules)
+                if schedule_key(schedule) not in taken
+            ]
+            for position, cost in zip(
+                fresh,
+                self.evaluate_candidates(
+                    [candidate_schedules[position] for position in fresh], lock=lock
+                ),
+            ):
+                candidate_costs[position] = cost
+        # The batch evaluation is shared evenly between the candidates
+        evaluation_share = (clock() - evaluation_started) / max(1, len(whales))
+
+        if self.selector is not None:
+            with lock if lock is not None else nullcontext():
+                for agent_schedule, (arms, seconds), candidate_cost in zip(
+                    whales, candidate_credits, candidate_costs
+                ):
+                    self.selector.reward(
+                        improvement=agent_schedule.cost - candidate_cost,
+                        seconds=seconds + evaluation_share,
+                        arms=arms,
                     )
 
-                candidate_cost = objective_function(
-                    schedule=candidate_schedule,
-                    tasks=self.tasks,
-                    setups=self.setups,
-                    precedences=self.precedences,
-                    energy_constraint=self.energy_constraint,
-                    total_resource=self.total_resource,
-                    alpha_load=50.0,
-                    verbose=True
-                )
+        if PROFILER.enabled:
+            with lock if lock is not None else nullcontext():
+                # Greedy replacement: accepted iff improved
+                for agent_schedule, operators, candidate_cost in zip(
+                    whales, candidate_operators, candidate_costs
+                ):
+                    improved = candidate_cost < agent_schedule.cost
+                    PROFILER.outcome(operators, accepted=improved, improved=improved)
 
-                if candidate_cost["total_cost"] < agent_schedule.cost["total_cost"]:
+        moved: List[int] = []
+        for position, (agent_schedule, candidate_schedule, move, candidate_cost) in enumerate(
+            zip(whales, candidate_schedules, candidate_moves, candidate_costs)
+        ):
+            if candidate_cost < agent_schedule.cost:
+                moved.append(position)
+                if move is None:
                     agent_schedule.update(
-                        new_schedule=copy.deepcopy(candidate_schedule),
+                        new_schedule=FlatSchedule.from_schedule(candidate_schedule),
                         new_cost=candidate_cost,
                     )
+                else:
+                    agent_schedule.cost = candidate_cost
+            elif move is not None:
+                move.undo(agent_schedule.schedule)
 
-                if (
-                    agent_schedule.cost["total_cost"]
-                    < self.best_schedule.cost["total_cost"]
-                ):
-                    self.best_schedule.update(
-                        new_schedule=copy.deepcopy(agent_schedule.schedule),
-                        new_cost=agent_schedule.cost,
-                    )
-                self.history.append(
-                    {
-                        "iteration": iter,
-                        # "iter_cost": self.current_schedule.cost,
-                        "iter_schedule": self.schedules,
-                        "best_schedule": self.best_schedule.schedule,
-                        "best_cost": self.best_schedule.cost,
-                    }
-                )
+        return moved
 
-            # early stop when a got too small
-            if a < 1e-8:
-                break
+    def reseed(self, slots: List[int]):
+        """Replaces the whales in `slots` with random schedules no whale holds"""
+        schedules = fresh_schedules(
+            n_schedules=len(slots),
+            tasks=self.tasks,
+            n_machines=self.n_machines,
+            index=self.index,
+        )
+        costs = evaluate_batch(schedules=schedules, instance=self.instance, alpha_load=50.0)
+        for idx, schedule, cost in zip(slots, schedules, costs.tolist()):
+            self.schedules[idx].update(new_schedule=schedule, new_cost=cost)
+            self.index.set(idx, schedule)
+
+    def restart(self):
+        """Re-seeds the worst `restart_fraction` of the whales, the best one is always kept"""
+        n_restarted = min(
+            self.n_schedules - 1, math.ceil(self.restart_fraction * self.n_schedules)
+        )
+        if n_restarted <= 0:
+            return
+        ranking = sorted(range(self.n_schedules), key=lambda idx: self.schedules[idx].cost)
+        self.reseed(ranking[-n_restarted:])
+        self.n_restarts += 1
+
+    def evaluate_candidates(
+        self,
+        candidate_schedules: List[Dict[int, List[int]]],
+        lock: threading.Lock = None,
+    ) -> List[float]:
+        """Total costs of the candidates, cache misses are evaluated in one batch (outside `lock`)"""
+        lock = lock if lock is not None else nullcontext()
+        with lock:
+            candidate_costs = [
+                self.fitness_cache.get(schedule) for schedule in candidate_schedules
+            ]
+        misses = [idx for idx, cost in enumerate(candidate_costs) if cost is None]
+        if len(misses) == 0:
+            return candidate_costs
+
+        costs = evaluate_batch(
+            schedules=[candidate_schedules[idx] for idx in misses],
+            instance=self.instance,
+            alpha_load=50.0,
+        )
+        with lock:
+            for idx, cost in zip(misses, costs.tolist()):
+                candidate_costs[idx] = cost
+                self.fitness_cache.put(candidate_schedules[idx], cost)
+
+        return candidate_costs
+
+    def linearly_decrement(self, progress: float):
+        return 2 - 2 * progress
+
+    def _make_executor(self) -> Executor:
+        if self.executor == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.problem,),
+            )
+        if self.executor == "thread" and self.max_workers > 1:
+            return ThreadPoolExecutor(max_workers=self.max_workers)
+        return None
+
+
+def _init_worker(problem: Dict[str, Any]):
+    global _pod
+    _pod = WhaleOptimizationAlgorithm(**problem)
 
-        return self.best_schedule, self.history
 
-    def linearly_decrement(self, iter: int):
-        return 2 - 2 * (iter / self.n_iterations)
\ No newline at end of file
+def _move_whales(
+    whales: List[Tuple[FlatSchedule, float]],
+    best_schedule: FlatSchedule,
+    a: float,
+    seed: int,
+    taken: FrozenSet[bytes] = None,
+) -> Tuple[List[int], List[Tuple[FlatSchedule, float]]]:
+    """`move_whales` in a worker process: (positions moved, (schedule, cost) of every whale)"""
+    whales = [Schedule(schedule=schedule, cost=cost) for schedule, cost in whales]
+    moved = _pod.move_whales(
+        whales=whales, best_schedule=best_schedule, a=a, seed=seed, taken=taken
+    )
+    return moved, [(whale.schedule, whale.cost) for whale in whales]
@@ -0,0 +1,86 @@
+import random
+import time
+
+import pytest
+
+from scheduling_upm.simulated_annealing import SimulatedAnnealing
+from scheduling_upm.utils.budget import SearchBudget
+from scheduling_upm.utils.entities import Schedule
+from scheduling_upm.utils.environment import generate_environment
+from scheduling_upm.whales_optim import WhaleOptimizationAlgorithm
+
+
+def test_anytime_budget_needs_a_stopping_rule():
+    with pytest.raises(ValueError):
+        SearchBudget(n_iterations=None)
+    with pytest.raises(ValueError):
+        SearchBudget(n_iterations=0)
+
+
+def test_anytime_budget_stops_on_time():
+    budget = SearchBudget(n_iterations=None, time_limit=0.05).start()
+    assert budget.progress(10**9) < 1.0
+    assert not budget.exhausted(10**9)
+    time.sleep(0.06)
+    assert budget.progress(0) == 1.0
+    assert budget.exhausted(0)
+    assert budget.stop_reason == "time"
+
+
+def test_anytime_budget_stops_on_stagnation():
+    budget = SearchBudget(n_iterations=None, patience=3).start()
+    best = Schedule(schedule={0: [0]}, cost=1.0)
+    assert budget.update(iteration=0, best=best)
+    for iteration in range(1, 4):
+        assert not budget.exhausted(iteration)
+        budget.update(iteration=iteration, best=best)
+    assert budget.exhausted(4)
+    assert budget.stop_reason == "stagnation"
+    # With patience only, progress follows the stagnation and ends at 1
+    assert budget.progress(4) == 1.0
+
+
+def test_patience_only_progress_never_decreases():
+    budget = SearchBudget(n_iterations=None, patience=10).start()
+    best = Schedule(schedule={0: [0]}, cost=10.0)
+    budget.update(iteration=0, best=best)
+    for iteration in range(1, 5):
+        budget.update(iteration=iteration, best=best)
+    assert budget.progress(5) == pytest.approx(0.4)
+
+    # An improvement resets the stagnation, not the progress
+    best = Schedule(schedule={0: [0]}, cost=1.0)
+    budget.update(iteration=5, best=best)
+    assert budget.progress(6) == pytest.approx(0.4)
+
+
+class RecordingAnnealing(SimulatedAnnealing):
+    def step(self, temperature, progress):
+        self.temperatures.append(temperature)
+        return super().step(temperature=temperature, progress=progress)
+
+
+class RecordingWOA(WhaleOptimizationAlgorithm):
+    def linearly_decrement(self, progress):
+        a = super().linearly_decrement(progress=progress)
+        self.a_values.append(a)
+        return a
+
+
+def test_patience_only_search_cools_down():
+    env = generate_environment(n_tasks=12, n_machines=3, seed=0)
+    kwargs = dict(tasks=env["tasks"], setups=env["setups"], n_machines=3)
+
+    random.seed(0)
+    annealing = RecordingAnnealing(n_iterations=None, patience=100, reheat_factor=1, **kwargs)
+    annealing.temperatures = []
+    annealing.optimize()
+    assert annealing.budget.stop_reason == "stagnation"
+    assert annealing.temperatures[-1] < 0.1 * annealing.temperatures[0]
+
+    random.seed(0)
+    woa = RecordingWOA(n_iterations=None, patience=10, n_schedules=4, **kwargs)
+    woa.a_values = []
+    woa.optimize()
+    assert woa.a_values[0] == 2.0
+    assert woa.a_values[-1] < 1.0
@@ -0,0 +1,87 @@
+import copy
+
+import numpy as np
+import pytest
+
+from scheduling_upm.utils.cache import schedule_key
+from scheduling_upm.utils.entities import FlatSchedule
+from scheduling_upm.utils.population import PopulationIndex
+
+SCHEDULE = {0: [3, 1], 1: [], 2: [0, 4, 2]}
+
+
+def test_flat_schedule_round_trip():
+    flat = FlatSchedule.from_schedule(SCHEDULE)
+    assert flat.to_dict() == SCHEDULE
+    assert flat == SCHEDULE
+    assert list(flat.tasks) == [3, 1, 0, 4, 2]
+    assert list(flat.offsets) == [0, 2, 2, 5]
+    assert flat.n_machines == len(flat) == 3
+    assert dict(flat.items()) == SCHEDULE
+    assert FlatSchedule.from_schedule(flat) == flat
+
+    with pytest.raises(ValueError):
+        FlatSchedule.from_dict({0: [0], 2: [1]})
+    with pytest.raises(KeyError):
+        flat[3]
+
+
+def test_flat_schedule_copies_are_independent():
+    flat = FlatSchedule.from_schedule(SCHEDULE)
+    duplicates = [
+        flat.copy(),
+        copy.copy(flat),
+        copy.deepcopy(flat),
+        FlatSchedule.from_schedule(flat),
+    ]
+    for duplicate in duplicates:
+        duplicate[0][0] = 9
+        duplicate[1].append(7)
+        assert flat.to_dict() == SCHEDULE
+        assert duplicate.to_dict() == {0: [9, 1], 1: [7], 2: [0, 4, 2]}
+
+
+def test_flat_schedule_equality_and_hash():
+    flat = FlatSchedule.from_schedule(SCHEDULE)
+    same = FlatSchedule.from_schedule(copy.deepcopy(SCHEDULE))
+    # Same tasks, another split between the machines
+    other = FlatSchedule.from_schedule({0: [3], 1: [1], 2: [0, 4, 2]})
+
+    assert flat == same and hash(flat) == hash(same) and flat.key() == same.key()
+    assert flat != other and flat.key() != other.key()
+    assert schedule_key(SCHEDULE) == flat.key()
+    assert len({flat, same, other}) == 2
+
+    index = PopulationIndex(n_tasks=5, n_machines=3)
+    assert index.set(0, flat)
+    assert not index.set(1, SCHEDULE)
+    assert index.set(2, other)
+    assert SCHEDULE in index and same in index and other in index
+    assert index.duplicates() == [1]
+
+
+def test_machine_sequence_mutates_the_schedule():
+    flat = FlatSchedule.from_schedule(SCHEDULE)
+    machine = flat[2]
+    machine[0] = 5
+    assert flat.to_dict() == {0: [3, 1], 1: [], 2: [5, 4, 2]}
+
+    flat[1].insert(0, machine.pop(1))
+    assert flat.to_dict() == {0: [3, 1], 1: [4], 2: [5, 2]}
+    assert list(flat.offsets) == [0, 2, 3, 5]
+
+    del flat[0][0]
+    flat[0].insert(-1, 6)
+    assert flat.to_dict() == {0: [6, 1], 1: [4], 2: [5, 2]}
+
+    flat[2][0:2] = [8, 7, 0]
+    assert flat[2] == [8, 7, 0]
+    assert flat[2][1:] == [7, 0]
+    assert flat[2].index(0) == 2
+    assert np.asarray(flat[2]).tolist() == [8, 7, 0]
+
+    # Assigning a view of the same schedule
+    flat[0] = flat[2]
+    assert flat.to_dict() == {0: [8, 7, 0], 1: [4], 2: [8, 7, 0]}
+    with pytest.raises(IndexError):
+        flat[1][1]
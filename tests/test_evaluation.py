@@ -0,0 +1,184 @@
+import pytest
+
+from scheduling_upm.utils.entities import ProblemInstance
+from scheduling_upm.utils.environment import generate_environment
+from scheduling_upm.utils.evaluation import (
+    apply_resource_constraint,
+    compute_base_milestones,
+    objective_function,
+    precedence_constraint,
+)
+from scheduling_upm.utils.kernels import jit_enabled, set_jit_enabled
+
+# Two machines sharing 10 units of resource: task 1 waits for task 0 to release its 6 units
+TASKS = {
+    0: {"process_times": [4, 4], "resource": 6, "weight": 1},
+    1: {"process_times": [3, 3], "resource": 6, "weight": 1},
+    2: {"process_times": [2, 2], "resource": 3, "weight": 1},
+    3: {"process_times": [5, 5], "resource": 4, "weight": 1},
+}
+SETUPS = {(0, 2): 1, (1, 3): 2}
+SCHEDULE = {0: [0, 2], 1: [1, 3]}
+# task -> (start_setup, start_process, complete_time)
+MILESTONES = {0: (0, 0, 4), 1: (4, 4, 7), 2: (4, 5, 7), 3: (7, 9, 14)}
+
+# Chain 0 -> 1 -> 2 over three machines, listed against the topological order: task 1 waits for
+# task 0 (4), then task 2 for task 1 (7) after task 3 and its setup
+CHAIN_TASKS = {
+    0: {"process_times": [4, 4, 4], "resource": 1, "weight": 1},
+    1: {"process_times": [3, 3, 3], "resource": 1, "weight": 1},
+    2: {"process_times": [5, 5, 5], "resource": 1, "weight": 1},
+    3: {"process_times": [2, 2, 2], "resource": 1, "weight": 1},
+}
+CHAIN_SETUPS = {(3, 2): 1}
+CHAIN_PRECEDENCES = {1: [2], 0: [1]}
+CHAIN_SCHEDULE = {0: [0], 1: [1], 2: [3, 2]}
+CHAIN_MILESTONES = {0: (0, 0, 4), 1: (4, 4, 7), 2: (6, 7, 12), 3: (0, 0, 2)}
+
+# Schedules of `generate_environment(n_tasks=10, n_machines=3, seed)` with total_resource=150 and
+# their start / completion times and total cost, as computed by the time-stepping simulation the
+# event heap replaced
+RESOURCE_CASES = [
+    (
+        0,
+        {0: [7, 5, 2, 6], 1: [8, 3, 0], 2: [1, 4, 9]},
+        [88, 0, 55, 24, 97, 22, 88, 0, 0, 126],
+        [97, 16, 88, 49, 126, 55, 99, 22, 24, 155],
+        25588.093052600234,
+    ),
+    (
+        1,
+        {0: [6, 7, 0, 2], 1: [8, 5, 4], 2: [9, 3, 1]},
+        [44, 29, 67, 12, 66, 44, 0, 5, 12, 0],
+        [67, 41, 95, 18, 89, 66, 5, 29, 44, 12],
+        9647.079471100638,
+    ),
+    (
+        2,
+        {0: [5, 4, 2, 0], 1: [9, 6, 8], 2: [3, 7, 1]},
+        [60, 139, 27, 92, 6, 0, 26, 111, 73, 0],
+        [73, 154, 60, 111, 27, 6, 51, 139, 92, 26],
+        11344.869294007305,
+    ),
+]
+
+
+def test_resource_constraint_delays_tasks_until_released():
+    milestones = apply_resource_constraint(
+        schedule=SCHEDULE, tasks=TASKS, setups=SETUPS, total_resource=10
+    )
+    for task, (start_setup, start_process, complete_time) in MILESTONES.items():
+        assert milestones[task]["start_setup"] == start_setup
+        assert milestones[task]["start_process"] == start_process
+        assert milestones[task]["complete_time"] == complete_time
+
+    instance = ProblemInstance(tasks=TASKS, setups=SETUPS, n_machines=2, total_resource=10)
+    task_milestones = apply_resource_constraint(schedule=SCHEDULE, instance=instance)
+    for task, (start_setup, start_process, complete_time) in MILESTONES.items():
+        assert task_milestones.start_setup[task] == start_setup
+        assert task_milestones.start_process[task] == start_process
+        assert task_milestones.complete_time[task] == complete_time
+
+
+@pytest.mark.parametrize("seed, schedule, start_setups, complete_times, cost", RESOURCE_CASES)
+def test_resource_constraint_matches_reference(
+    seed, schedule, start_setups, complete_times, cost
+):
+    env = generate_environment(n_tasks=10, n_machines=3, seed=seed)
+    milestones = apply_resource_constraint(
+        schedule=schedule, tasks=env["tasks"], setups=env["setups"], total_resource=150
+    )
+    assert [milestones[task]["start_setup"] for task in range(10)] == start_setups
+    assert [milestones[task]["complete_time"] for task in range(10)] == complete_times
+
+    instance = ProblemInstance(
+        tasks=env["tasks"], setups=env["setups"], n_machines=3, total_resource=150
+    )
+    task_milestones = apply_resource_constraint(schedule=schedule, instance=instance)
+    assert task_milestones.start_setup.tolist() == start_setups
+    assert task_milestones.complete_time.tolist() == complete_times
+
+    assert objective_function(
+        schedule=schedule, tasks=env["tasks"], setups=env["setups"], total_resource=150
+    )["total_cost"] == pytest.approx(cost)
+    assert objective_function(schedule=schedule, instance=instance)["total_cost"] == pytest.approx(
+        cost
+    )
+
+
+def test_resource_requirement_above_total_raises():
+    with pytest.raises(ValueError):
+        apply_resource_constraint(
+            schedule=SCHEDULE, tasks=TASKS, setups=SETUPS, total_resource=5
+        )
+    instance = ProblemInstance(tasks=TASKS, setups=SETUPS, n_machines=2, total_resource=5)
+    with pytest.raises(ValueError):
+        objective_function(schedule=SCHEDULE, instance=instance)
+
+
+@pytest.mark.parametrize("compiled", [False, True], ids=["python", "jit"])
+def test_precedence_delays_follow_the_chain(compiled):
+    milestones = compute_base_milestones(
+        schedule=CHAIN_SCHEDULE, tasks=CHAIN_TASKS, setups=CHAIN_SETUPS
+    )
+    penalty, milestones = precedence_constraint(
+        schedule=CHAIN_SCHEDULE,
+        task_completion_milestones=milestones,
+        setups=CHAIN_SETUPS,
+        precedences=CHAIN_PRECEDENCES,
+    )
+    assert penalty == 0
+    for task, (start_setup, start_process, complete_time) in CHAIN_MILESTONES.items():
+        assert milestones[task]["start_setup"] == start_setup
+        assert milestones[task]["start_process"] == start_process
+        assert milestones[task]["complete_time"] == complete_time
+
+    instance = ProblemInstance(
+        tasks=CHAIN_TASKS, setups=CHAIN_SETUPS, n_machines=3, precedences=CHAIN_PRECEDENCES
+    )
+    penalty, task_milestones = precedence_constraint(
+        schedule=CHAIN_SCHEDULE,
+        task_completion_milestones=compute_base_milestones(
+            schedule=CHAIN_SCHEDULE, instance=instance
+        ),
+        instance=instance,
+    )
+    assert penalty == 0
+    for task, (start_setup, start_process, complete_time) in CHAIN_MILESTONES.items():
+        assert task_milestones.start_setup[task] == start_setup
+        assert task_milestones.start_process[task] == start_process
+        assert task_milestones.complete_time[task] == complete_time
+
+    previous = jit_enabled()
+    set_jit_enabled(compiled)
+    try:
+        cost = objective_function(schedule=CHAIN_SCHEDULE, instance=instance)
+    finally:
+        set_jit_enabled(previous)
+    assert cost["makespan"] == 12
+    assert cost == objective_function(
+        schedule=CHAIN_SCHEDULE,
+        tasks=CHAIN_TASKS,
+        setups=CHAIN_SETUPS,
+        precedences=CHAIN_PRECEDENCES,
+    )
+
+
+def test_cyclic_precedences_raise():
+    cycle = {0: [1], 1: [2], 2: [1]}
+    with pytest.raises(ValueError):
+        ProblemInstance(tasks=CHAIN_TASKS, setups=CHAIN_SETUPS, n_machines=3, precedences=cycle)
+    milestones = compute_base_milestones(
+        schedule=CHAIN_SCHEDULE, tasks=CHAIN_TASKS, setups=CHAIN_SETUPS
+    )
+    with pytest.raises(ValueError):
+        precedence_constraint(
+            schedule=CHAIN_SCHEDULE,
+            task_completion_milestones=milestones,
+            setups=CHAIN_SETUPS,
+            precedences=cycle,
+        )
+    with pytest.raises(ValueError):
+        objective_function(
+            schedule=CHAIN_SCHEDULE, tasks=CHAIN_TASKS, setups=CHAIN_SETUPS, precedences=cycle
+        )
@@ -0,0 +1,86 @@
+import multiprocessing
+import queue
+import random
+
+import pytest
+
+from scheduling_upm.hybrid_woa_sa import hybrid_woa_sa
+from scheduling_upm.island_model import IslandModel, _run_island
+from scheduling_upm.utils.environment import generate_environment
+from scheduling_upm.utils.operations import generate_schedule
+
+
+def problem(seed=0):
+    env = generate_environment(n_tasks=12, n_machines=3, seed=seed)
+    return {
+        "tasks": env["tasks"],
+        "setups": env["setups"],
+        "precedences": env["precedences"],
+        "n_machines": 3,
+        "n_schedules": 4,
+        "sa_local_iters": 2,
+        "verbose": False,
+    }
+
+
+def drain(channel):
+    items = []
+    while True:
+        try:
+            items.append(channel.get(timeout=0.5))
+        except queue.Empty:
+            return items
+
+
+def test_island_takes_in_better_migrants_and_sends_its_best():
+    kwargs = {**problem(), "n_iterations": 6, "migration_interval": 2}
+    random.seed(0)
+    migrant = generate_schedule(tasks=kwargs["tasks"], n_machines=3)
+    inbox, outbox, results = (multiprocessing.Queue() for _ in range(3))
+    # Cheaper than any real schedule, must replace the worst whale and become the best
+    inbox.put((migrant, -1.0))
+
+    _run_island(0, kwargs, 1, inbox, outbox, results)
+    (report,) = drain(results)
+    assert "error" not in report
+    assert report["n_received"] == 1
+    assert report["best"].cost == -1.0
+    assert report["best"].schedule == migrant
+
+    sent = drain(outbox)
+    assert len(sent) == report["n_sent"] >= 1
+    # Only improvements are sent
+    costs = [cost for _, cost in sent]
+    assert costs == sorted(costs, reverse=True) and len(set(costs)) == len(costs)
+
+
+def test_islands_exchange_through_the_ring():
+    random.seed(0)
+    model = IslandModel(n_islands=3, migration_interval=2, n_iterations=8, **problem())
+    best, stats = model.optimize()
+    assert best.cost == min(stats["island_costs"])
+    assert all(n_sent >= 1 for n_sent in stats["n_sent"])
+    # A migrant is received at most once, and only if it was sent
+    assert sum(stats["n_received"]) <= sum(stats["n_sent"])
+
+    with pytest.raises(ValueError):
+        IslandModel(n_islands=2, migration_interval=0, **problem())
+
+
+@pytest.mark.parametrize("migration_interval", [None, 0])
+def test_hybrid_without_migration(migration_interval):
+    sent = []
+    random.seed(0)
+    hybrid_woa_sa(
+        **problem(),
+        n_iterations=6,
+        migration_interval=migration_interval,
+        emigrate=sent.append,
+        immigrate=lambda: pytest.fail("no migration expected"),
+    )
+    assert sent == []
+
+
+def test_hybrid_rejects_negative_migration_interval():
+    with pytest.raises(ValueError):
+        hybrid_woa_sa(**problem(), n_iterations=2, migration_interval=-1)
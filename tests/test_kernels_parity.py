@@ -0,0 +1,129 @@
+import random
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+from scheduling_upm.utils.entities import ProblemInstance
+from scheduling_upm.utils.environment import generate_environment
+from scheduling_upm.utils.evaluation import (
+    BOUND_EXCEEDED,
+    evaluate_batch,
+    objective_function,
+)
+from scheduling_upm.utils.kernels import jit_enabled, set_jit_enabled
+from scheduling_upm.utils.operations import generate_schedule
+
+TERMS = ("total_cost", "makespan", "precedence_penalty", "std_dev", "energy_exceeds")
+CONSTRAINTS = [
+    pytest.param({}, id="plain"),
+    pytest.param({"precedences": True}, id="precedences"),
+    pytest.param({"energy_constraint": True}, id="energy"),
+    pytest.param({"total_resource": 200}, id="resource"),
+    pytest.param(
+        {"precedences": True, "energy_constraint": True, "total_resource": 200},
+        id="all",
+    ),
+]
+
+
+@contextmanager
+def jit_mode(enabled):
+    """Evaluates with (or without) the compiled kernels, restores the previous mode afterwards"""
+    if enabled:
+        pytest.importorskip("numba")
+    previous = jit_enabled()
+    set_jit_enabled(enabled)
+    try:
+        yield
+    finally:
+        set_jit_enabled(previous)
+
+
+def make_instance(constraints, n_tasks=25, n_machines=4, seed=0):
+    env = generate_environment(n_tasks=n_tasks, n_machines=n_machines, seed=seed)
+    instance = ProblemInstance(
+        tasks=env["tasks"],
+        setups=env["setups"],
+        n_machines=n_machines,
+        precedences=env["precedences"] if constraints.get("precedences") else None,
+        energy_constraint=(
+            env["energy_constraint"] if constraints.get("energy_constraint") else None
+        ),
+        total_resource=constraints.get("total_resource"),
+    )
+    random.seed(seed)
+    schedules = [generate_schedule(tasks=env["tasks"], n_machines=n_machines) for _ in range(8)]
+    return instance, schedules
+
+
+def breakdowns(instance, schedules):
+    return [objective_function(schedule=schedule, instance=instance) for schedule in schedules]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("constraints", CONSTRAINTS)
+def test_objective_function_parity(constraints, seed):
+    instance, schedules = make_instance(constraints, seed=seed)
+    with jit_mode(False):
+        expected = breakdowns(instance, schedules)
+    with jit_mode(True):
+        actual = breakdowns(instance, schedules)
+
+    for expected_cost, actual_cost in zip(expected, actual):
+        for term in TERMS:
+            assert actual_cost[term] == pytest.approx(expected_cost[term], rel=1e-9, abs=1e-6)
+
+
+@pytest.mark.parametrize("constraints", CONSTRAINTS)
+@pytest.mark.parametrize("compiled", [False, True])
+def test_evaluate_batch_matches_objective_function(constraints, compiled):
+    instance, schedules = make_instance(constraints)
+    with jit_mode(compiled):
+        expected = breakdowns(instance, schedules)
+        costs, breakdown = evaluate_batch(
+            schedules=schedules, instance=instance, return_breakdown=True
+        )
+
+    np.testing.assert_allclose(costs, [cost["total_cost"] for cost in expected], rtol=1e-9)
+    for term in TERMS:
+        np.testing.assert_allclose(
+            breakdown[term], [cost[term] for cost in expected], rtol=1e-9, atol=1e-6
+        )
+
+
+@pytest.mark.parametrize("constraints", CONSTRAINTS)
+def test_evaluate_batch_parity(constraints):
+    instance, schedules = make_instance(constraints, seed=3)
+    with jit_mode(False):
+        _, expected = evaluate_batch(
+            schedules=schedules, instance=instance, return_breakdown=True
+        )
+    with jit_mode(True):
+        _, actual = evaluate_batch(schedules=schedules, instance=instance, return_breakdown=True)
+
+    for term in TERMS:
+        np.testing.assert_allclose(actual[term], expected[term], rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+@pytest.mark.parametrize("constraints", CONSTRAINTS)
+def test_upper_bound(constraints, compiled):
+    instance, schedules = make_instance(constraints, seed=4)
+    with jit_mode(compiled):
+        for schedule in schedules:
+            cost = objective_function(schedule=schedule, instance=instance, breakdown=False)
+            # A bound above the cost changes nothing, at or below it the evaluation is cut short
+            assert objective_function(
+                schedule=schedule, instance=instance, breakdown=False, upper_bound=cost + 1
+            ) == pytest.approx(cost)
+            for upper_bound in (cost, cost / 2):
+                assert (
+                    objective_function(
+                        schedule=schedule,
+                        instance=instance,
+                        breakdown=False,
+                        upper_bound=upper_bound,
+                    )
+                    == BOUND_EXCEEDED
+                )
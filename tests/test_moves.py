@@ -0,0 +1,142 @@
+import copy
+import random
+
+import pytest
+
+from scheduling_upm.utils.delta_evaluation import EvaluationState
+from scheduling_upm.utils.entities import FlatSchedule, ProblemInstance
+from scheduling_upm.utils.environment import generate_environment
+from scheduling_upm.utils.evaluation import BOUND_EXCEEDED, objective_function
+from scheduling_upm.utils.moves import BlockRelocate, CompoundMove, Relocate, Rewrite, Swap
+from scheduling_upm.utils.operations import generate_schedule
+
+N_TASKS = 20
+N_MACHINES = 4
+MOVE_TYPES = ["swap", "relocate", "block_relocate", "rewrite", "compound"]
+CONSTRAINTS = [
+    pytest.param({}, id="plain"),
+    pytest.param({"precedences": True}, id="precedences"),
+    pytest.param({"energy_constraint": True}, id="energy"),
+    pytest.param({"total_resource": 200}, id="resource"),
+    pytest.param(
+        {"precedences": True, "energy_constraint": True, "total_resource": 200},
+        id="all",
+    ),
+]
+
+
+def make_instance(constraints, seed=0):
+    env = generate_environment(n_tasks=N_TASKS, n_machines=N_MACHINES, seed=seed)
+    return env, ProblemInstance(
+        tasks=env["tasks"],
+        setups=env["setups"],
+        n_machines=N_MACHINES,
+        precedences=env["precedences"] if constraints.get("precedences") else None,
+        energy_constraint=(
+            env["energy_constraint"] if constraints.get("energy_constraint") else None
+        ),
+        total_resource=constraints.get("total_resource"),
+    )
+
+
+def random_move(schedule, kind, rng):
+    """A valid move of type `kind` on `schedule`, which is left untouched"""
+    busy = [machine for machine in schedule if len(schedule[machine]) > 0]
+    if kind == "swap":
+        machine_a, machine_b = rng.choice(busy), rng.choice(busy)
+        return Swap(
+            machine_a,
+            rng.randrange(len(schedule[machine_a])),
+            machine_b,
+            rng.randrange(len(schedule[machine_b])),
+        )
+    if kind == "relocate":
+        machine_from, machine_to = rng.choice(busy), rng.randrange(len(schedule))
+        length_to = len(schedule[machine_to]) - (machine_from == machine_to)
+        return Relocate(
+            machine_from,
+            rng.randrange(len(schedule[machine_from])),
+            machine_to,
+            rng.randint(0, length_to),
+        )
+    if kind == "block_relocate":
+        machine_from = rng.choice(busy)
+        machine_to = rng.choice([machine for machine in schedule if machine != machine_from])
+        start = rng.randrange(len(schedule[machine_from]))
+        end = rng.randint(start + 1, len(schedule[machine_from]))
+        return BlockRelocate(
+            machine_from, start, end, machine_to, rng.randint(0, len(schedule[machine_to]))
+        )
+    if kind == "rewrite":
+        machine = rng.choice(busy)
+        before = tuple(schedule[machine])
+        return Rewrite(machine, before, tuple(rng.sample(before, len(before))))
+
+    # Each move is drawn on the schedule left by the previous ones
+    scratch = {machine: list(sequence) for machine, sequence in schedule.items()}
+    moves = []
+    for _ in range(rng.randint(2, 4)):
+        move = random_move(scratch, rng.choice(MOVE_TYPES[:-1]), rng)
+        move.apply(scratch)
+        moves.append(move)
+    return CompoundMove(tuple(moves))
+
+
+def as_dict(schedule):
+    return {machine: list(sequence) for machine, sequence in schedule.items()}
+
+
+@pytest.mark.parametrize("flat", [False, True], ids=["dict", "flat"])
+@pytest.mark.parametrize("kind", MOVE_TYPES)
+def test_apply_then_undo_restores_the_schedule(kind, flat):
+    env = generate_environment(n_tasks=N_TASKS, n_machines=N_MACHINES, seed=0)
+    rng = random.Random(kind)
+    random.seed(0)
+    for _ in range(50):
+        original = generate_schedule(tasks=env["tasks"], n_machines=N_MACHINES)
+        schedule = FlatSchedule.from_schedule(original) if flat else copy.deepcopy(original)
+        move = random_move(schedule, kind, rng)
+
+        expected = {**original, **move.sequences(original)}
+        assert as_dict(move.apply(schedule)) == expected
+        assert sorted(task for sequence in schedule.values() for task in sequence) == list(
+            range(N_TASKS)
+        )
+        assert as_dict(move.undo(schedule)) == original
+
+
+@pytest.mark.parametrize("flat", [False, True], ids=["dict", "flat"])
+@pytest.mark.parametrize("constraints", CONSTRAINTS)
+def test_delta_evaluation_matches_objective_function(constraints, flat):
+    env, instance = make_instance(constraints)
+    rng = random.Random(1)
+    random.seed(1)
+    for _ in range(5):
+        schedule = generate_schedule(tasks=env["tasks"], n_machines=N_MACHINES)
+        if flat:
+            schedule = FlatSchedule.from_schedule(schedule)
+        state = EvaluationState(schedule=schedule, instance=instance)
+        assert state.cost == pytest.approx(
+            objective_function(schedule=schedule, instance=instance, breakdown=False)
+        )
+
+        for kind in MOVE_TYPES * 4:
+            move = random_move(schedule, kind, rng)
+            cost = objective_function(
+                schedule=move.apply(schedule), instance=instance, breakdown=False
+            )
+            move.undo(schedule)
+
+            assert state.evaluate(move) == pytest.approx(cost)
+            assert state.evaluate(move, upper_bound=cost + 1) == pytest.approx(cost)
+            assert state.evaluate(move, upper_bound=cost) == BOUND_EXCEEDED
+            assert state.evaluate(move, upper_bound=cost / 2) == BOUND_EXCEEDED
+
+        # The state follows committed moves
+        move = random_move(schedule, "compound", rng)
+        state.commit(move)
+        move.apply(schedule)
+        assert state.cost == pytest.approx(
+            objective_function(schedule=schedule, instance=instance, breakdown=False)
+        )
+        assert state.evaluate(CompoundMove()) == pytest.approx(state.cost)
@@ -0,0 +1,30 @@
+import copy
+import random
+from functools import partial
+
+from scheduling_upm.utils.entities import ProblemInstance
+from scheduling_upm.utils.environment import generate_environment
+from scheduling_upm.utils.evaluation import objective_function
+from scheduling_upm.utils.operations import generate_schedule, propose_best_insertion
+
+
+def test_best_insertion_without_instance():
+    env = generate_environment(n_tasks=20, n_machines=3, seed=5)
+    instance = ProblemInstance(tasks=env["tasks"], setups=env["setups"], n_machines=3)
+    evaluate = partial(objective_function, instance=instance, breakdown=False)
+    random.seed(0)
+    schedule = generate_schedule(tasks=env["tasks"], n_machines=3)
+
+    def propose(seed, **kwargs):
+        random.seed(seed)
+        return propose_best_insertion(
+            schedule=schedule,
+            obj_function=evaluate,
+            tasks=env["tasks"],
+            setups=env["setups"],
+            **kwargs,
+        )
+
+    for seed in range(10):
+        expected = propose(seed, instance=instance).apply(copy.deepcopy(schedule))
+        assert propose(seed).apply(copy.deepcopy(schedule)) == expected
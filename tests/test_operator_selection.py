@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from scheduling_upm.utils.operator_selection import OperatorSelector, choose
+
+
+def fast():
+    pass
+
+
+def slow():
+    pass
+
+
+def useless():
+    pass
+
+
+POOL = [(fast, {"n": 1}), (slow, {"n": 2}), (useless, {"n": 3})]
+
+
+def test_reward_bookkeeping():
+    selector = OperatorSelector(memory=0.5)
+    selector.pending = ["fast", "slow"]
+    # Shared evenly between the pending operators, decreases below zero count as none
+    selector.reward(improvement=4.0, seconds=2.0)
+    assert selector.pending == []
+    assert selector.plays == {"fast": 1, "slow": 1}
+    assert selector.gains == {"fast": 2.0, "slow": 2.0}
+    assert selector.seconds == {"fast": 1.0, "slow": 1.0}
+
+    selector.reward(improvement=-3.0, seconds=1.0, arms=["fast"])
+    assert selector.gains["fast"] == pytest.approx(1.0)
+    assert selector.seconds["fast"] == pytest.approx(1.5)
+    assert selector.value("fast") == pytest.approx(1.0 / 1.5)
+    assert selector.value("useless") == 0.0
+    assert selector.n_plays == 3
+
+    stats = selector.stats()
+    assert stats["fast"]["plays"] == 2
+    assert stats["fast"]["share"] == pytest.approx(2 / 3)
+
+    # Nothing pending, nothing credited
+    selector.reward(improvement=1.0, seconds=1.0)
+    assert selector.n_plays == 3
+
+
+def test_unplayed_operators_come_first():
+    random.seed(0)
+    selector = OperatorSelector(uniform_share=0.0)
+    drawn = set()
+    for _ in range(3):
+        operation, kwargs = selector.choice(POOL)
+        drawn.add(operation.__name__)
+        selector.reward(improvement=0.0, seconds=1.0)
+    assert drawn == {"fast", "slow", "useless"}
+
+
+def test_ucb_favours_improvement_per_second():
+    random.seed(0)
+    selector = OperatorSelector(exploration=0.1, memory=1.0, uniform_share=0.0)
+    gains = {"fast": (1.0, 0.001), "slow": (1.0, 0.01), "useless": (0.0, 0.001)}
+    for _ in range(300):
+        operation, kwargs = selector.choice(POOL)
+        assert kwargs == dict(POOL)[operation]
+        selector.reward(*gains[operation.__name__])
+
+    plays = selector.plays
+    assert plays["fast"] > plays["slow"] > 0
+    assert plays["fast"] > plays["useless"] > 0
+    assert sum(plays.values()) == selector.n_plays == 300
+
+
+def test_uniform_share_keeps_every_operator_alive():
+    random.seed(0)
+    selector = OperatorSelector(exploration=0.0, memory=1.0, uniform_share=1.0)
+    for _ in range(300):
+        operation, _ = selector.choice(POOL)
+        selector.reward(improvement=1.0 if operation is fast else 0.0, seconds=1.0)
+    assert all(plays > 70 for plays in selector.plays.values())
+
+    with pytest.raises(ValueError):
+        OperatorSelector(uniform_share=1.5)
+    assert choose(POOL[:1]) == POOL[0]
@@ -0,0 +1,95 @@
+import copy
+import math
+import random
+
+import numpy as np
+import pytest
+
+from scheduling_upm.parallel_tempering import ParallelTempering, geometric_ladder, replica_exchange
+from scheduling_upm.utils.entities import ProblemInstance
+from scheduling_upm.utils.environment import generate_environment
+from scheduling_upm.utils.evaluation import objective_function
+
+
+def scaled_environment(scale, seed=0):
+    env = generate_environment(n_tasks=15, n_machines=3, seed=seed)
+    tasks = copy.deepcopy(env["tasks"])
+    for task in tasks.values():
+        task["process_times"] = [time * scale for time in task["process_times"]]
+    setups = {pair: time * scale for pair, time in env["setups"].items()}
+    return tasks, setups, env["precedences"]
+
+
+def test_ladder_follows_the_cost_scale():
+    ladders = []
+    for scale in (1, 10):
+        tasks, setups, precedences = scaled_environment(scale)
+        random.seed(0)
+        tempering = ParallelTempering(
+            n_machines=3,
+            tasks=tasks,
+            setups=setups,
+            precedences=precedences,
+            n_iterations=100,
+            max_workers=1,
+        )
+        tempering.optimize()
+        ladders.append(np.array(tempering.temperatures))
+
+    assert np.all(np.diff(ladders[0]) > 0)
+    np.testing.assert_allclose(ladders[1], 10 * ladders[0], rtol=1e-6)
+    assert geometric_ladder(t_min=1.0, t_max=100.0, n_chains=3) == pytest.approx([1, 10, 100])
+    assert geometric_ladder(t_min=1.0, t_max=100.0, n_chains=1) == [100.0]
+
+
+def test_replica_exchange_rule(monkeypatch):
+    temperatures = [1.0, 2.0, 4.0]
+    attempts = np.zeros(2, dtype=np.int64)
+    accepts = np.zeros(2, dtype=np.int64)
+
+    # A colder chain holding a worse state always swaps it up
+    states = [("a", 10.0), ("b", 5.0), ("c", 1.0)]
+    replica_exchange(states, temperatures, parity=0, swap_attempts=attempts, swap_accepts=accepts)
+    assert states == [("b", 5.0), ("a", 10.0), ("c", 1.0)]
+    assert attempts.tolist() == [1, 0] and accepts.tolist() == [1, 0]
+
+    # Otherwise with probability exp((1/T_k - 1/T_k+1) * (E_k - E_k+1))
+    states = [("a", 1.0), ("b", 5.0), ("c", 6.0)]
+    probability = math.exp((1 / 2.0 - 1 / 4.0) * (5.0 - 6.0))
+    monkeypatch.setattr(random, "random", lambda: probability + 1e-9)
+    replica_exchange(states, temperatures, parity=1, swap_attempts=attempts, swap_accepts=accepts)
+    assert states == [("a", 1.0), ("b", 5.0), ("c", 6.0)]
+    monkeypatch.setattr(random, "random", lambda: probability - 1e-9)
+    replica_exchange(states, temperatures, parity=1, swap_attempts=attempts, swap_accepts=accepts)
+    assert states == [("a", 1.0), ("c", 6.0), ("b", 5.0)]
+    assert attempts.tolist() == [1, 2] and accepts.tolist() == [1, 1]
+
+
+def test_best_schedule_is_tracked_across_replicas():
+    tasks, setups, precedences = scaled_environment(1, seed=3)
+    runs = []
+    for _ in range(2):
+        random.seed(5)
+        tempering = ParallelTempering(
+            n_machines=3,
+            tasks=tasks,
+            setups=setups,
+            precedences=precedences,
+            n_chains=3,
+            n_iterations=200,
+            swap_interval=20,
+            max_workers=1,
+        )
+        runs.append(tempering.optimize())
+
+    (best, stats), (other_best, other_stats) = runs
+    assert best.cost == other_best.cost and stats["best_costs"] == other_stats["best_costs"]
+
+    assert len(stats["best_costs"]) == 10
+    assert np.all(np.diff(stats["best_costs"]) <= 0)
+    assert best.cost == stats["best_costs"][-1] <= min(stats["chain_costs"])
+    instance = ProblemInstance(tasks=tasks, setups=setups, n_machines=3, precedences=precedences)
+    assert objective_function(
+        schedule=best.schedule, instance=instance, alpha_load=50.0, breakdown=False
+    ) == pytest.approx(best.cost)
+    assert stats["swap_attempts"].tolist() == [5, 5]
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from scheduling_upm.hybrid_woa_sa import restart_population
+from scheduling_upm.utils.entities import FlatSchedule, ProblemInstance, Schedule
+from scheduling_upm.utils.environment import generate_environment
+from scheduling_upm.utils.operations import generate_schedule
+from scheduling_upm.utils.population import PopulationIndex, fresh_schedules
+from scheduling_upm.utils.recorder import assignment_diversity
+
+
+def test_index_tracks_duplicates_across_updates():
+    index = PopulationIndex(n_tasks=3, n_machines=2)
+    assert index.set(0, {0: [0, 1], 1: [2]})
+    assert index.set(1, {0: [1, 0], 1: [2]})
+    assert not index.set(2, {0: [0, 1], 1: [2]})
+    assert index.duplicates() == [2]
+    assert len(index) == 3 and index.n_unique == 2
+
+    # Replacing a slot's schedule drops the old one
+    assert index.set(0, {0: [], 1: [0, 1, 2]})
+    assert index.duplicates() == []
+    assert {0: [0, 1], 1: [2]} in index
+    assert FlatSchedule.from_dict({0: [0, 1], 1: [2]}).key() in index.keys()
+
+    index.remove(2)
+    assert {0: [0, 1], 1: [2]} not in index
+    assert len(index) == 2
+
+
+def test_index_diversity_matches_a_full_pass():
+    env = generate_environment(n_tasks=12, n_machines=3, seed=0)
+    random.seed(0)
+    schedules = [generate_schedule(tasks=env["tasks"], n_machines=3) for _ in range(6)]
+    index = PopulationIndex(n_tasks=12, n_machines=3)
+    for slot, schedule in enumerate(schedules):
+        index.set(slot, schedule)
+    assert index.diversity() == pytest.approx(assignment_diversity(schedules))
+
+    for slot in range(3):
+        schedules[slot] = schedules[5]
+        index.set(slot, schedules[5])
+    assert index.diversity() == pytest.approx(assignment_diversity(schedules))
+
+    # A converged population has no diversity left
+    for slot in range(6):
+        index.set(slot, schedules[5])
+    assert index.diversity() == 0.0
+
+
+def test_fresh_schedules_avoid_the_index():
+    env = generate_environment(n_tasks=4, n_machines=2, seed=0)
+    random.seed(1)
+    index = PopulationIndex(n_tasks=4, n_machines=2)
+    for slot, schedule in enumerate(
+        fresh_schedules(n_schedules=5, tasks=env["tasks"], n_machines=2)
+    ):
+        index.set(slot, schedule)
+    assert index.n_unique == 5
+
+    schedules = fresh_schedules(n_schedules=5, tasks=env["tasks"], n_machines=2, index=index)
+    keys = {schedule.key() for schedule in schedules}
+    assert len(keys) == 5
+    assert not keys & index.keys()
+
+
+def test_restart_keeps_the_best_and_refreshes_the_worst():
+    env = generate_environment(n_tasks=10, n_machines=3, seed=0)
+    instance = ProblemInstance(tasks=env["tasks"], setups=env["setups"], n_machines=3)
+    random.seed(2)
+    converged = FlatSchedule.from_dict(generate_schedule(tasks=env["tasks"], n_machines=3))
+    population = [Schedule(schedule=converged.copy(), cost=float(k)) for k in range(4)]
+    index = PopulationIndex(n_tasks=10, n_machines=3)
+    for slot, whale in enumerate(population):
+        index.set(slot, whale.schedule)
+    assert index.diversity() == 0.0
+
+    n_restarted = restart_population(
+        population=population,
+        index=index,
+        restart_fraction=0.5,
+        tasks=env["tasks"],
+        n_machines=3,
+        instance=instance,
+    )
+    assert n_restarted == 2
+    assert population[0].schedule == converged and population[1].schedule == converged
+    assert index.duplicates() == [1]
+    assert index.n_unique == 3
+    assert index.diversity() > 0.0
@@ -0,0 +1,193 @@
+import json
+import random
+import threading
+import timeit
+from functools import partial
+
+import pytest
+
+from scheduling_upm.hybrid_woa_sa import hybrid_woa_sa
+from scheduling_upm.simulated_annealing import SimulatedAnnealing
+from scheduling_upm.utils.entities import ProblemInstance
+from scheduling_upm.utils.environment import generate_environment
+from scheduling_upm.utils.evaluation import evaluate_batch, objective_function
+from scheduling_upm.utils.kernels import jit_enabled, set_jit_enabled
+from scheduling_upm.utils.operations import generate_schedule
+from scheduling_upm.utils.profiling import PROFILER, profiled
+
+
+@profiled("operator.outer")
+def outer(x):
+    return inner(x) + 1
+
+
+@profiled("operator.inner")
+def inner(x):
+    return x * 2
+
+
+@profiled("objective.term")
+def term(x):
+    return x - 1
+
+
+@pytest.fixture
+def profiler():
+    PROFILER.enable(verbose=False)
+    PROFILER.reset()
+    yield PROFILER
+    PROFILER.disable()
+    PROFILER.reset()
+
+
+def test_disabled_profiler_records_nothing():
+    PROFILER.disable()
+    PROFILER.reset()
+    assert outer(1) == 3
+    assert PROFILER.sections == {}
+    assert PROFILER.take_pending() == []
+    assert PROFILER.end_run() is None
+
+
+def test_references_taken_before_enable_are_timed():
+    bound = partial(term, 3)
+    PROFILER.enable(verbose=False)
+    try:
+        PROFILER.reset()
+        assert bound() == 2
+        assert PROFILER.sections["objective.term"][0] == 1
+    finally:
+        PROFILER.disable()
+
+    # Disabling stops the counting everywhere
+    bound()
+    assert PROFILER.sections["objective.term"][0] == 1
+    PROFILER.reset()
+
+
+def test_nested_operators_only_credit_the_outer_one(profiler):
+    outer(1)
+    assert profiler.take_pending() == ["outer"]
+    assert profiler.sections["operator.inner"][0] == 1
+
+    profiler.outcome(["outer"], accepted=True, improved=False)
+    report = profiler.report()
+    assert report["operators"]["outer"]["acceptance_rate"] == 1.0
+    assert report["operators"]["outer"]["improvement_rate"] == 0.0
+    assert report["operators"]["inner"]["candidates"] == 0
+    json.dumps(report)
+
+
+def test_pending_operators_are_per_thread(profiler):
+    taken = {}
+
+    def run(name, n_calls):
+        for _ in range(n_calls):
+            outer(1)
+        taken[name] = profiler.take_pending()
+
+    threads = [threading.Thread(target=run, args=(k, 50 + k)) for k in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {name: len(pending) for name, pending in taken.items()} == {
+        k: 50 + k for k in range(4)
+    }
+    assert profiler.take_pending() == []
+    assert profiler.sections["operator.outer"][0] == sum(50 + k for k in range(4))
+
+
+def evaluate_constrained(compiled):
+    env = generate_environment(n_tasks=20, n_machines=3, seed=0)
+    instance = ProblemInstance(
+        tasks=env["tasks"],
+        setups=env["setups"],
+        n_machines=3,
+        precedences=env["precedences"],
+        energy_constraint=env["energy_constraint"],
+    )
+    schedule = generate_schedule(tasks=env["tasks"], n_machines=3)
+    previous = jit_enabled()
+    set_jit_enabled(compiled)
+    try:
+        objective_function(schedule=schedule, instance=instance, breakdown=False)
+        evaluate_batch(schedules=[schedule], instance=instance)
+    finally:
+        set_jit_enabled(previous)
+    return PROFILER.report()
+
+
+def test_profiled_objective_keeps_the_jit_path(profiler):
+    pytest.importorskip("numba")
+    report = evaluate_constrained(compiled=True)
+    assert report["objective"]["jit"]["calls"] == 2
+    assert "precedence" not in report["objective"]
+    json.dumps(report)
+
+
+def test_profiled_objective_times_every_term_without_jit(profiler):
+    report = evaluate_constrained(compiled=False)
+    assert "jit" not in report["objective"]
+    for term in ("total", "batch", "precedence", "energy", "std_dev"):
+        assert report["objective"][term]["calls"] >= 1
+
+
+def test_disabled_profiler_overhead():
+    """Cost of the disabled wrappers over a search, below 2% of its time"""
+    env = generate_environment(n_tasks=30, n_machines=4, seed=0)
+    kwargs = dict(
+        tasks=env["tasks"],
+        setups=env["setups"],
+        n_machines=4,
+        precedences=env["precedences"],
+        energy_constraint=env["energy_constraint"],
+        n_iterations=300,
+    )
+
+    def search():
+        random.seed(0)
+        SimulatedAnnealing(**kwargs).optimize()
+
+    search()  # Compiles the kernels
+    PROFILER.disable()
+    seconds = min(timeit.repeat(search, number=1, repeat=3))
+
+    # Number of profiled calls made by the same search
+    PROFILER.enable(verbose=False)
+    try:
+        search()
+        n_calls = sum(calls for calls, _ in PROFILER.sections.values())
+    finally:
+        PROFILER.disable()
+        PROFILER.reset()
+
+    def noop():
+        pass
+
+    wrapped = profiled("other.noop")(noop)
+    per_call = (
+        min(timeit.repeat(wrapped, number=100_000, repeat=5))
+        - min(timeit.repeat(noop, number=100_000, repeat=5))
+    ) / 100_000
+    assert n_calls > 0
+    assert n_calls * per_call < 0.02 * seconds
+
+
+def test_hybrid_returns_its_profile(profiler):
+    env = generate_environment(n_tasks=12, n_machines=3, seed=1)
+    best, _, profile = hybrid_woa_sa(
+        tasks=env["tasks"],
+        setups=env["setups"],
+        precedences=env["precedences"],
+        n_machines=3,
+        n_schedules=4,
+        n_iterations=3,
+        sa_local_iters=2,
+        verbose=False,
+        return_profile=True,
+    )
+    assert profile["objective"]["total"]["calls"] >= 1
+    assert sum(entry["candidates"] for entry in profile["operators"].values()) > 0
+    json.dumps(profile)
@@ -0,0 +1,59 @@
+import random
+
+import numpy as np
+import pytest
+
+from scheduling_upm.random_key_woa import RandomKeyWOA, decode_keys
+from scheduling_upm.utils.entities import ProblemInstance
+from scheduling_upm.utils.environment import generate_environment
+from scheduling_upm.utils.evaluation import objective_function
+
+
+def test_decoded_schedules_follow_the_keys():
+    n_tasks, n_machines = 30, 4
+    keys = np.random.default_rng(0).random((50, 2 * n_tasks))
+    # Keys at the edges of [0, 1)
+    keys[0, :n_tasks] = 0.0
+    keys[1, :n_tasks] = np.nextafter(1.0, 0.0)
+
+    for row, schedule in zip(keys, decode_keys(keys=keys, n_machines=n_machines)):
+        assert schedule.n_machines == n_machines
+        assert sorted(schedule.tasks) == list(range(n_tasks))
+        for machine, sequence in schedule.items():
+            assert all(int(row[task] * n_machines) == machine for task in sequence)
+            priorities = [row[n_tasks + task] for task in sequence]
+            assert priorities == sorted(priorities)
+
+    schedules = decode_keys(keys=keys[:2], n_machines=n_machines)
+    assert schedules[0].to_dict() == {
+        0: sorted(range(n_tasks), key=lambda task: keys[0, n_tasks + task]),
+        1: [],
+        2: [],
+        3: [],
+    }
+    assert len(schedules[1][n_machines - 1]) == n_tasks
+
+
+def test_random_key_woa_costs_match_its_schedules():
+    env = generate_environment(n_tasks=15, n_machines=3, seed=2)
+    random.seed(0)
+    woa = RandomKeyWOA(
+        tasks=env["tasks"],
+        setups=env["setups"],
+        n_machines=3,
+        precedences=env["precedences"],
+        n_schedules=20,
+        n_iterations=10,
+    )
+    best, telemetry = woa.optimize()
+
+    instance = ProblemInstance(
+        tasks=env["tasks"], setups=env["setups"], n_machines=3, precedences=env["precedences"]
+    )
+    assert best.schedule == decode_keys(keys=woa.best_keys[None, :], n_machines=3)[0]
+    assert objective_function(
+        schedule=best.schedule, instance=instance, alpha_load=50.0, breakdown=False
+    ) == pytest.approx(best.cost)
+    assert best.cost == pytest.approx(woa.costs.min())
+    assert np.all((woa.keys >= 0) & (woa.keys < 1))
+    assert np.all(np.diff(telemetry.as_dict()["best_cost"]) <= 0)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from scheduling_upm.utils.recorder import PopulationTelemetry
+
+
+def test_population_telemetry_grows_on_demand():
+    telemetry = PopulationTelemetry(n_iterations=10**7, initial_capacity=16)
+    assert len(telemetry.best_cost) == 16
+
+    for iteration in range(100):
+        telemetry.record(
+            iteration=iteration,
+            costs=[iteration, iteration + 2.0],
+            schedules=[],
+            n_accepted=iteration % 3,
+            diversity=0.5,
+        )
+
+    history = telemetry.as_dict()
+    assert len(telemetry) == 100
+    assert len(telemetry.best_cost) < 1000
+    np.testing.assert_array_equal(history["best_cost"], np.arange(100))
+    np.testing.assert_array_equal(history["mean_cost"], np.arange(100) + 1.0)
+    np.testing.assert_array_equal(history["n_accepted"], np.arange(100) % 3)
+
+
+def test_population_telemetry_without_iteration_count():
+    telemetry = PopulationTelemetry(n_iterations=None, initial_capacity=4)
+    telemetry.record(iteration=9, costs=[1.0], schedules=[], diversity=0.0)
+    assert len(telemetry) == 10
+    assert telemetry.as_dict()["best_cost"][9] == 1.0
@@ -0,0 +1,44 @@
+import random
+
+import numpy as np
+import pytest
+
+from scheduling_upm.utils.environment import generate_environment
+from scheduling_upm.whales_optim import WhaleOptimizationAlgorithm
+
+
+def run(executor, seed=3):
+    env = generate_environment(n_tasks=20, n_machines=4, seed=7)
+    random.seed(seed)
+    woa = WhaleOptimizationAlgorithm(
+        tasks=env["tasks"],
+        setups=env["setups"],
+        n_machines=4,
+        precedences=env["precedences"],
+        energy_constraint=env["energy_constraint"],
+        n_schedules=8,
+        n_iterations=6,
+        executor=executor,
+        max_workers=2,
+    )
+    return woa.optimize()
+
+
+def test_executors_give_the_same_search():
+    best, telemetry = run("serial")
+    history = telemetry.as_dict()
+    for executor in ("thread", "process"):
+        other_best, other_telemetry = run(executor)
+        assert other_best.cost == best.cost
+        assert other_best.schedule == best.schedule
+        other_history = other_telemetry.as_dict()
+        for name in ("best_cost", "mean_cost", "n_accepted"):
+            np.testing.assert_array_equal(other_history[name], history[name])
+
+
+def test_unknown_executor_is_rejected():
+    env = generate_environment(n_tasks=5, n_machines=2, seed=0)
+    with pytest.raises(ValueError):
+        WhaleOptimizationAlgorithm(
+            tasks=env["tasks"], setups=env["setups"], n_machines=2, executor="gpu"
+        )